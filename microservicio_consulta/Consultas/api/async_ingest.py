@@ -0,0 +1,460 @@
+"""
+Motor de ingesta asíncrono (asyncio + httpx) para start.gg.
+
+Descarga torneos completos (detalles, páginas de participantes, sets y
+standings de cada evento) lanzando todas las peticiones de forma concurrente,
+con un límite global de peticiones en vuelo (STARTGG_ASYNC_CONCURRENCY).
+Comparte con startgg_client la URL, las cabeceras, los timeouts, el limitador
+de peticiones (rate_limiter) y la caché persistente (response_cache), así que
+convive con las vistas síncronas sin superar el presupuesto de start.gg.
+
+Las vistas y comandos de gestión usan run_ingestion(), que envuelve el motor
+en asyncio.run() (o en un hilo aparte si ya hay un event loop en marcha), y
+persist_ingestion() para guardar lo descargado con los mismos upserts que el
+rastreo de torneos y las cargas de archivos.
+El limitador y la caché guardan su estado en SQLite (BEGIN IMMEDIATE con
+espera de hasta 30 s si otro proceso tiene el bloqueo): sus llamadas se hacen
+con asyncio.to_thread para no detener el event loop.
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from . import startgg_client
+from .circuit_breaker import CircuitOpenError, get_circuit_breaker, is_failure_status
+from .rate_limiter import get_rate_limiter
+from .response_cache import get_response_cache, ttl_for_tournament, ttl_for_event
+from .upstream_metrics import CallRecord
+from .setByTournament import EVENT_SETS_QUERY, SETS_PER_PAGE, entrant_player_map, set_from_node
+
+# peticiones a start.gg en vuelo a la vez (sumando todos los torneos)
+STARTGG_ASYNC_CONCURRENCY = int(os.environ.get('STARTGG_ASYNC_CONCURRENCY', 8))
+PARTICIPANTS_PER_PAGE = 100
+STANDINGS_PER_PAGE = 100
+
+TOURNAMENT_QUERY = """
+query IngestTournament($id: ID!, $perPage: Int!) {
+    tournament(id: $id) {
+        id
+        name
+        slug
+        city
+        countryCode
+        startAt
+        endAt
+        numAttendees
+        events {
+            id
+            name
+            state
+            numEntrants
+        }
+        participants(query: {perPage: $perPage, page: 1}) {
+            pageInfo {
+                total
+                totalPages
+            }
+            nodes {
+                id
+                gamerTag
+                player {
+                    id
+                }
+                user {
+                    slug
+                }
+                entrants {
+                    id
+                }
+            }
+        }
+    }
+}
+"""
+
+PARTICIPANTS_QUERY = """
+query IngestParticipants($id: ID!, $perPage: Int!, $page: Int!) {
+    tournament(id: $id) {
+        participants(query: {perPage: $perPage, page: $page}) {
+            nodes {
+                id
+                gamerTag
+                player {
+                    id
+                }
+                user {
+                    slug
+                }
+                entrants {
+                    id
+                }
+            }
+        }
+    }
+}
+"""
+
+STANDINGS_QUERY = """
+query IngestStandings($eventId: ID!, $perPage: Int!, $page: Int!) {
+    event(id: $eventId) {
+        standings(query: {perPage: $perPage, page: $page}) {
+            pageInfo {
+                total
+                totalPages
+            }
+            nodes {
+                placement
+                entrant {
+                    id
+                    name
+                }
+            }
+        }
+    }
+}
+"""
+
+
+class IngestionError(Exception):
+    """Respuesta de start.gg inutilizable (errores GraphQL o estructura inesperada)."""
+
+
+class AsyncStartggClient:
+    """
+    Cliente httpx asíncrono con las mismas reglas que startgg_client.execute():
+    limitador compartido antes de cada intento, el mismo circuit breaker,
+    reintentos ante 429 y caché opcional por TTL. `transport` permite inyectar un servidor local en tests.
+    """
+
+    def __init__(self, concurrency=None, url=None, transport=None, limiter=None):
+        self.concurrency = concurrency or STARTGG_ASYNC_CONCURRENCY
+        self.url = url or startgg_client.get_base_url()
+        self.limiter = limiter or get_rate_limiter()
+        self.requests = 0
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._client = httpx.AsyncClient(
+            headers=startgg_client.default_headers(),
+            timeout=httpx.Timeout(startgg_client.STARTGG_READ_TIMEOUT, connect=startgg_client.STARTGG_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            transport=transport,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    async def _acquire(self):
+        """Espera turno en el limitador; devuelve los segundos esperados."""
+        # el limitador es síncrono: se pregunta en un hilo y se espera con asyncio.sleep
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self.limiter.try_acquire)
+            if wait <= 0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    async def post(self, query, variables=None, record=None):
+        own_record = record is None
+        if own_record:
+            record = CallRecord(query, client='async')
+        try:
+            return await self._post(query, variables, record)
+        finally:
+            if own_record:
+                record.log()
+
+    async def _post(self, query, variables, record):
+        payload = {'query': query, 'variables': variables or {}}
+        request_bytes = len(json.dumps(payload))
+        attempt = 0
+        breaker = get_circuit_breaker()
+        async with self._semaphore:
+            while True:
+                if breaker is not None:
+                    try:
+                        breaker.before_call()
+                    except CircuitOpenError:
+                        record.mark_rejected()
+                        raise
+                try:
+                    waited = await self._acquire()
+                    self.requests += 1
+                    started = time.monotonic()
+                    try:
+                        response = await self._client.post(self.url, json=payload)
+                    except httpx.HTTPError as e:
+                        record.attempt(None, time.monotonic() - started, request_bytes, 0, waited)
+                        record.error = type(e).__name__
+                        if breaker is not None:
+                            breaker.record_failure()
+                        raise
+                    record.attempt(response.status_code, time.monotonic() - started, request_bytes,
+                                   len(response.content), waited)
+                except BaseException:
+                    # incluye asyncio.CancelledError: no dejar ocupada la llamada de prueba
+                    if breaker is not None:
+                        breaker.release_trial()
+                    raise
+                if breaker is not None:
+                    if is_failure_status(response.status_code):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                if response.status_code != 429 or attempt >= startgg_client.STARTGG_MAX_RETRIES:
+                    startgg_client.record_response(query, variables, response.status_code, response.text)
+                    return response
+                wait = startgg_client._retry_after_seconds(response, attempt)
+                print(f"start.gg devolvió 429; reintento {attempt + 1}/{startgg_client.STARTGG_MAX_RETRIES} en {wait:.1f}s")
+                await asyncio.to_thread(self.limiter.penalize, wait)
+                attempt += 1
+
+    async def execute(self, query, variables=None, cache_ttl=None):
+        """Equivalente asíncrono de startgg_client.execute(); lanza httpx.HTTPStatusError si no es 2xx."""
+        record = CallRecord(query, client='async')
+        try:
+            cache = get_response_cache() if cache_ttl is not None else None
+            key = None
+            if cache is not None:
+                key = cache.make_key(query, variables)
+                cached = await asyncio.to_thread(cache.get, key)
+                if cached is not None:
+                    record.cache_result('hit')
+                    return cached
+                record.cache_result('miss')
+
+            response = await self.post(query, variables, record=record)
+            response.raise_for_status()
+            data = response.json()
+
+            if cache is not None and isinstance(data, dict) and 'errors' not in data:
+                ttl = cache_ttl(data) if callable(cache_ttl) else cache_ttl
+                await asyncio.to_thread(cache.set, key, data, ttl)
+            return data
+        except Exception as e:
+            record.error = record.error or type(e).__name__
+            raise
+        finally:
+            record.log()
+
+
+def _connection(data, *path):
+    """Sigue data['data'][path...]; lanza IngestionError si hay errores GraphQL o falta algún nivel."""
+    if not isinstance(data, dict) or data.get('errors'):
+        raise IngestionError((data or {}).get('errors') if isinstance(data, dict) else data)
+    node = data.get('data')
+    for name in path:
+        if not isinstance(node, dict) or node.get(name) is None:
+            raise IngestionError(f"Respuesta sin '{name}': {data}")
+        node = node[name]
+    return node
+
+
+async def _fetch_pages(client, query, variables, path, pages, cache_ttl):
+    """Pide las páginas indicadas a la vez y devuelve sus nodes concatenados en orden de página."""
+    async def one(page):
+        data = await client.execute(query, dict(variables, page=page), cache_ttl=cache_ttl)
+        return _connection(data, *path).get('nodes') or []
+
+    results = await asyncio.gather(*(one(page) for page in pages))
+    return [node for nodes in results for node in nodes]
+
+
+async def _fetch_paginated(client, query, variables, path, cache_ttl):
+    """Primera página para conocer totalPages y el resto en paralelo."""
+    data = await client.execute(query, dict(variables, page=1), cache_ttl=cache_ttl)
+    conn = _connection(data, *path)
+    nodes = conn.get('nodes') or []
+    total_pages = (conn.get('pageInfo') or {}).get('totalPages') or 1
+    return nodes + await _fetch_pages(client, query, variables, path, range(2, total_pages + 1), cache_ttl)
+
+
+async def fetch_event_sets(client, event_id, cache_ttl=None):
+    return await _fetch_paginated(
+        client, EVENT_SETS_QUERY, {'eventId': event_id, 'perPage': SETS_PER_PAGE}, ('event', 'sets'), cache_ttl
+    )
+
+
+async def fetch_event_standings(client, event_id, cache_ttl=None):
+    return await _fetch_paginated(
+        client, STANDINGS_QUERY, {'eventId': event_id, 'perPage': STANDINGS_PER_PAGE}, ('event', 'standings'), cache_ttl
+    )
+
+
+async def fetch_tournament(client, tournament_id, include_sets=True, include_standings=True):
+    """
+    Descarga un torneo completo. Tras la primera consulta (detalles, eventos y
+    primera página de participantes) se lanzan a la vez el resto de páginas de
+    participantes y los sets/standings de cada evento.
+    """
+    data = await client.execute(
+        TOURNAMENT_QUERY, {'id': tournament_id, 'perPage': PARTICIPANTS_PER_PAGE}, cache_ttl=ttl_for_tournament
+    )
+    tournament = dict(_connection(data, 'tournament'))
+    participants_conn = tournament.pop('participants', None) or {}
+    events = tournament.pop('events', None) or []
+    total_pages = (participants_conn.get('pageInfo') or {}).get('totalPages') or 1
+
+    participants_task = _fetch_pages(
+        client, PARTICIPANTS_QUERY, {'id': tournament_id, 'perPage': PARTICIPANTS_PER_PAGE},
+        ('tournament', 'participants'), range(2, total_pages + 1), ttl_for_tournament(data)
+    )
+    event_tasks = []
+    for event in events:
+        event_ttl = ttl_for_event({'data': {'event': event}})
+        event_tasks.append(asyncio.gather(
+            fetch_event_sets(client, event['id'], event_ttl) if include_sets else _empty(),
+            fetch_event_standings(client, event['id'], event_ttl) if include_standings else _empty(),
+        ))
+    more_participants, *event_results = await asyncio.gather(participants_task, *event_tasks)
+
+    return {
+        'tournament': tournament,
+        'participants': (participants_conn.get('nodes') or []) + more_participants,
+        'events': [
+            dict(event, sets=sets, standings=standings)
+            for event, (sets, standings) in zip(events, event_results)
+        ],
+    }
+
+
+async def _empty():
+    return []
+
+
+async def ingest_tournaments(tournament_ids, concurrency=None, include_sets=True, include_standings=True,
+                             transport=None, url=None):
+    """
+    Descarga varios torneos a la vez bajo un único límite de concurrencia.
+    Un torneo que falla no detiene a los demás: se reporta en 'errors'.
+    """
+    async with AsyncStartggClient(concurrency=concurrency, url=url, transport=transport) as client:
+        results = await asyncio.gather(
+            *(fetch_tournament(client, tid, include_sets, include_standings) for tid in tournament_ids),
+            return_exceptions=True
+        )
+        summary = {'tournaments': [], 'errors': [], 'requests': client.requests}
+
+    for tid, result in zip(tournament_ids, results):
+        if isinstance(result, Exception):
+            print(f"Error ingiriendo torneo {tid}: {result}")
+            summary['errors'].append({'tournament_id': tid, 'error': str(result)})
+        else:
+            summary['tournaments'].append(result)
+    return summary
+
+
+def run_ingestion(tournament_ids, **kwargs):
+    """
+    Envoltorio síncrono de ingest_tournaments() para vistas y comandos de gestión.
+    Si el hilo actual ya tiene un event loop en marcha, se ejecuta en otro hilo.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(ingest_tournaments(tournament_ids, **kwargs))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(lambda: asyncio.run(ingest_tournaments(tournament_ids, **kwargs))).result()
+
+
+def _tournament_node(result):
+    """Torneo descargado -> nodo con la forma que espera tournament_crawler.tournament_row."""
+    events = [
+        dict(event, standings={'nodes': [s for s in event.get('standings') or [] if s.get('placement') == 1][:1]})
+        for event in result['events']
+    ]
+    return dict(result['tournament'], events=events)
+
+
+def _set_records(result, entrant_to_player):
+    """Sets de todos los eventos del torneo -> filas con los encabezados del Excel de sets."""
+    tournament_id = str(result['tournament']['id'])
+    records = []
+    for event in result['events']:
+        for node in event.get('sets') or []:
+            try:
+                s = set_from_node(node, entrant_to_player)
+            except (KeyError, IndexError, TypeError) as e:
+                print(f"Set {node.get('id')} del torneo {tournament_id} sin datos suficientes: {e}")
+                continue
+            records.append({
+                'ID Torneo': tournament_id,
+                'ID Set': s['id'],
+                'ID Jugador 1': s['player1_id'],
+                'Jugador 1': s['player1_name'],
+                'Puntuación Jugador 1': s['player1_score'],
+                'ID Jugador 2': s['player2_id'],
+                'Jugador 2': s['player2_name'],
+                'Puntuación Jugador 2': s['player2_score'],
+                'Phase': s['phase_name'],
+                'Event Name': s['event_name'],
+                'Tournament Name': s['tournament_name'],
+                'Player 1 Characters': ', '.join(str(c) for c in s['player1_characters']),
+                'Player 2 Characters': ', '.join(str(c) for c in s['player2_characters']),
+                # start.gg no da la ronda en esta consulta: sin la heurística de rondas finales
+                'Ronda': None,
+            })
+    return records
+
+
+def persist_ingestion(summary):
+    """
+    Guarda en la BD lo descargado por ingest_tournaments():
+    - torneos en Colombia_Tournament (tournament_crawler.upsert_tournaments: no toca Tier);
+    - jugadores nuevos (ID, GamerTag y slug de los participantes) en Colombia_Players, sin
+      sobrescribir los que ya existen;
+    - sets en Colombia_Sets con upload_ingest.import_sets (upsert sobre la clave natural).
+    Devuelve los conteos por tabla.
+    """
+    import pandas as pd
+    from django.db import transaction
+    from Consultas.models import Player
+    from Consultas.upload_ingest import PLAYER_FIELDS, SET_COLUMNS, bulk_upsert, import_sets
+    from .player_index import mark_player_index_stale
+    from .tournament_crawler import tournament_row, upsert_tournaments
+
+    results = summary.get('tournaments') or []
+    created, updated = upsert_tournaments([tournament_row(_tournament_node(r)) for r in results])
+
+    players = {}
+    set_records = []
+    for result in results:
+        for participant in result['participants']:
+            player_id = (participant.get('player') or {}).get('id')
+            if player_id is not None:
+                slug = (participant.get('user') or {}).get('slug') or 'N/A'
+                players[int(player_id)] = (participant.get('gamerTag'), slug)
+        set_records += _set_records(result, entrant_player_map(result['participants']))
+
+    fields = {f.name: f.column for f in Player._meta.fields}
+    columns = [fields[name] for name in PLAYER_FIELDS.values()]
+    rows = []
+    for i, (player_id, (tag, slug)) in enumerate(players.items(), start=1):
+        # el resto de datos del perfil se completan al sincronizar el jugador (player_jobs)
+        record = dict.fromkeys(PLAYER_FIELDS, 'N/A')
+        record.update({'ID': player_id, 'GamerTag': tag, 'Slug': slug})
+        rows.append(tuple(record[k] for k in PLAYER_FIELDS) + (i,))
+    with transaction.atomic():
+        players_inserted, players_existing, player_errors = bulk_upsert(
+            Player._meta.db_table, columns, [fields['id']], rows
+        )
+    if players_inserted:
+        mark_player_index_stale()
+
+    sets = import_sets([pd.DataFrame(set_records, columns=list(SET_COLUMNS))]) if set_records else None
+    return {
+        'tournaments': {'created': created, 'updated': updated},
+        'players': {'inserted': players_inserted, 'existing': players_existing, 'errors': player_errors},
+        'sets': {
+            'inserted': sets['inserted'] if sets else 0,
+            'updated': sets['updated'] if sets else 0,
+            'errors': sets['errors'] if sets else [],
+        },
+    }
+
@@ -0,0 +1,163 @@
+"""
+Circuit breaker para las llamadas a start.gg.
+
+Cuando start.gg está degradado cada petición bloquea a su worker hasta el
+timeout de lectura. El breaker lleva la cuenta de los últimos
+STARTGG_BREAKER_WINDOW resultados (error = excepción de red/timeout o HTTP 5xx)
+y, si la tasa de errores llega a STARTGG_BREAKER_ERROR_RATE con al menos
+STARTGG_BREAKER_MIN_CALLS llamadas, se abre durante STARTGG_BREAKER_OPEN_SECONDS:
+
+- abierto: las llamadas fallan al momento con CircuitOpenError (startgg_client
+  sirve la copia vencida de la caché si la hay).
+- semiabierto (tras la espera): se deja pasar una sola llamada de prueba; si va
+  bien el circuito se cierra y si falla vuelve a abrirse. Si el intento acaba
+  con otra excepción (limitador, cancelación) la prueba se libera con
+  release_trial() y la siguiente llamada vuelve a probar.
+
+El estado es por proceso y se consulta con stats() (vista upstream-status/).
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+
+STARTGG_BREAKER_ENABLED = str(os.environ.get('STARTGG_BREAKER_ENABLED', '1')).lower() in ['1', 'true', 'yes']
+STARTGG_BREAKER_WINDOW = int(os.environ.get('STARTGG_BREAKER_WINDOW', 20))
+STARTGG_BREAKER_MIN_CALLS = int(os.environ.get('STARTGG_BREAKER_MIN_CALLS', 10))
+STARTGG_BREAKER_ERROR_RATE = float(os.environ.get('STARTGG_BREAKER_ERROR_RATE', 0.5))
+STARTGG_BREAKER_OPEN_SECONDS = float(os.environ.get('STARTGG_BREAKER_OPEN_SECONDS', 30))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """start.gg no se consulta porque el circuito está abierto."""
+
+
+class CircuitBreaker:
+    def __init__(self, window=STARTGG_BREAKER_WINDOW, min_calls=STARTGG_BREAKER_MIN_CALLS,
+                 error_rate=STARTGG_BREAKER_ERROR_RATE, open_seconds=STARTGG_BREAKER_OPEN_SECONDS, clock=time.time):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        # True = error, False = éxito
+        self._results = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = None
+        self._trial_in_flight = False
+        self.rejected = 0
+        self.opened = 0
+        self.stale_served = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self.opened += 1
+        print(f"Circuito de start.gg abierto durante {self.open_seconds:.0f}s")
+
+    def before_call(self):
+        """Lanza CircuitOpenError si la llamada no debe salir hacia start.gg."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self._opened_at + self.open_seconds - self.clock()) if state == OPEN else 0.0
+            raise CircuitOpenError(f"start.gg no disponible (circuito {state}); reintentar en {retry_in:.0f}s")
+
+    def release_trial(self):
+        """
+        Libera la llamada de prueba del estado semiabierto cuando el intento
+        termina sin resultado (excepción del limitador, cancelación...); si no,
+        el breaker rechazaría todas las llamadas hasta reiniciar el proceso.
+        """
+        with self._lock:
+            if self._current_state() == HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self._current_state() == HALF_OPEN:
+                print("Circuito de start.gg cerrado de nuevo")
+                self._state = CLOSED
+                self._results.clear()
+            self._results.append(False)
+
+    def record_failure(self):
+        with self._lock:
+            state = self._current_state()
+            self._results.append(True)
+            if state == HALF_OPEN:
+                self._open()
+                return
+            if state == CLOSED and len(self._results) >= self.min_calls:
+                if sum(self._results) / len(self._results) >= self.error_rate:
+                    self._open()
+
+    def record_stale(self):
+        with self._lock:
+            self.stale_served += 1
+
+    def stats(self):
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._results)
+            failures = sum(self._results)
+            retry_in = max(0.0, self._opened_at + self.open_seconds - self.clock()) if state == OPEN else 0.0
+            return {
+                'state': state,
+                'calls': calls,
+                'failures': failures,
+                'error_rate': round(failures / calls, 3) if calls else 0.0,
+                'threshold': self.error_rate,
+                'retry_in': round(retry_in, 1),
+                'opened': self.opened,
+                'rejected': self.rejected,
+                'stale_served': self.stale_served,
+            }
+
+
+def is_failure_status(status_code):
+    """Los 5xx cuentan como fallo de start.gg; los 4xx (incluido 429) no."""
+    return isinstance(status_code, int) and status_code >= 500
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """Devuelve el breaker compartido del proceso, o None si está desactivado."""
+    global _breaker
+    if _breaker is None and STARTGG_BREAKER_ENABLED:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker()
+    return _breaker
+
+
+def set_circuit_breaker(breaker):
+    """Sustituye el breaker compartido (tests o configuración explícita)."""
+    global _breaker
+    with _breaker_lock:
+        _breaker = breaker
@@ -6,122 +6,127 @@ from datetime import datetime  # Importar datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 import requests
-from dotenv import load_dotenv
-from Consultas.api.location_mapping import get_department_by_city, get_zone_by_department
-
-# Cargar la clave de la API desde el archivo .env
-load_dotenv()
-
-startgg_url = "https://api.start.gg/gql/alpha"
-startgg_key = "204bdde1bb958e691497fa76febad15d"
-
-if not startgg_key:
-    raise ValueError('La clave de la API de Start.gg no está configurada. Verifica tu archivo .env')
-
-def get_event_info(event_id):
-    query = """
-    query EventInfo($eventId: ID!) {
-        event(id: $eventId) {
+from Consultas.api import startgg_client
+from Consultas.api.response_cache import ttl_for_event
+from Consultas.api.location_mapping import get_department_by_city, get_zone_by_department, get_region_by_department
+
+EVENT_SUMMARY_QUERY = """
+query EventSummary($eventId: ID!) {
+    event(id: $eventId) {
+        id
+        name
+        slug
+        startAt
+        state
+        numEntrants
+        tournament {
             id
             name
-            startAt
-            tournament {
-                name
-                slug
-                city
-                countryCode
+            slug
+            city
+            countryCode
+            numAttendees
+            participants(query: {perPage: 1}) {
+                pageInfo {
+                    total
+                }
             }
-            standings(query: {perPage: 1}) {
-                nodes {
-                    placement
-                    entrant {
-                        name
-                    }
+        }
+        standings(query: {perPage: 1, page: 1}) {
+            nodes {
+                placement
+                entrant {
+                    name
                 }
             }
         }
     }
+}
+"""
+
+def _format_start_date(start_at):
+    if not start_at:
+        return None
+    try:
+        ts = int(start_at)
+        if ts > 10**12:
+            ts = ts / 1000
+        return datetime.utcfromtimestamp(int(ts)).strftime('%Y-%m-%d')
+    except Exception:
+        return None
+
+def get_event_summary(event_id):
+    """
+    Resumen del evento en una sola petición (cacheada según el estado del evento):
+    nombre, fecha, ubicación, ganador, numEntrants y total de participantes del torneo.
+    No trae la lista de asistentes (ver getTournamentDetails.get_tournament_details).
+    Devuelve None si el evento no existe; lanza Exception si start.gg devuelve errores.
     """
-    variables = {'eventId': event_id}
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {startgg_key}'
+    data = startgg_client.execute(EVENT_SUMMARY_QUERY, {'eventId': event_id}, cache_ttl=ttl_for_event)
+    if 'errors' in data:
+        print(f"Error en respuesta de start.gg: {data['errors']}")
+        raise Exception('Error al obtener la información del evento desde start.gg')
+
+    event = (data.get('data') or {}).get('event')
+    if not event:
+        print("No se encontró el evento con ese ID.")
+        return None
+    tournament = event.get('tournament') or {}
+
+    standings = (event.get('standings') or {}).get('nodes') or []
+    winner_full_name = ((standings[0] or {}).get('entrant') or {}).get('name') if standings else None
+    winner_full_name = winner_full_name or 'N/A'
+    city = tournament.get('city') or None
+    department = get_department_by_city(city) if city else None
+    participants_total = ((tournament.get('participants') or {}).get('pageInfo') or {}).get('total')
+
+    return {
+        'event_id': event.get('id', event_id),
+        'name': event.get('name'),
+        'event_slug': event.get('slug'),
+        'state': event.get('state'),
+        'start_date': _format_start_date(event.get('startAt')),
+        'num_entrants': event.get('numEntrants'),
+        'tournament_id': tournament.get('id'),
+        'tournament_name': tournament.get('name'),
+        'tournament_slug': tournament.get('slug'),
+        'num_attendees': tournament.get('numAttendees'),
+        'participants_total': participants_total,
+        'city': city,
+        'country_code': tournament.get('countryCode'),
+        'department': department,
+        'region': get_region_by_department(department) if department else None,
+        'zone': get_zone_by_department(department),
+        'winner_full_name': winner_full_name,
+        # nombre del jugador sin el sponsor
+        'winner': winner_full_name.split('|')[-1].strip() if '|' in winner_full_name else winner_full_name,
     }
 
+def get_event_info(event_id):
     try:
-        response = requests.post(startgg_url, json={'query': query, 'variables': variables}, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-
-        # Manejo robusto de errores y datos faltantes
-        if 'errors' in data:
-            print(f"Error en respuesta de start.gg: {data['errors']}")
-            raise Exception('Error al obtener la información del evento desde start.gg')
-
-        event = data.get('data', {}).get('event')
-        if not event:
-            print("No se encontró el evento con ese ID.")
+        summary = get_event_summary(event_id)
+        if summary is None:
             raise Exception('No se encontró el evento con ese ID.')
 
-        tournament = event.get('tournament')
-        if not tournament:
-            print("No se encontró el torneo asociado al evento.")
-            raise Exception('No se encontró el torneo asociado al evento.')
-
-        tournament_slug = tournament.get('slug', '')
-        tournament_url = f"https://www.start.gg/{tournament_slug}/event/{event['name'].replace(' ', '-').lower()}"
-
-        # Consulta para obtener el número de asistentes
-        attendees_query = """
-        query AttendeeCount($tourneySlug: String!) {
-          tournament(slug: $tourneySlug) {
-            participants(query: {}) {
-              pageInfo {
-                total
-              }
-            }
-          }
-        }
-        """
-        attendees_variables = {'tourneySlug': tournament_slug}
-        attendees_response = requests.post(startgg_url, json={'query': attendees_query, 'variables': attendees_variables}, headers=headers)
-        attendees_response.raise_for_status()
-        attendees_data = attendees_response.json()
-
-        if 'errors' in attendees_data:
-            print(f"Error en respuesta de asistentes: {attendees_data['errors']}")
-            raise Exception('Error al obtener asistentes del torneo desde start.gg')
-
-        attendees_count = attendees_data.get('data', {}).get('tournament', {}).get('participants', {}).get('pageInfo', {}).get('total', 'N/A')
-
-        city = tournament.get('city', 'N/A')
-        department = get_department_by_city(city)
-        zone = get_zone_by_department(department)
-        standings = event.get('standings', {}).get('nodes', [])
-        winner_full_name = standings[0]['entrant']['name'] if standings else 'N/A'
-        winner_name = winner_full_name.split('|')[-1].strip() if '|' in winner_full_name else winner_full_name
-
-        start_date_unix = event.get('startAt')
-        start_date = None
-        if start_date_unix:
-            from datetime import datetime
-            start_date = datetime.utcfromtimestamp(start_date_unix).strftime('%Y-%m-%d')
-        else:
-            start_date = 'N/A'
-
-        print(f"Nombre del torneo: {tournament.get('name', 'N/A')}")
+        tournament_slug = summary.get('tournament_slug') or ''
+        tournament_url = f"https://www.start.gg/{tournament_slug}/event/{(summary.get('name') or '').replace(' ', '-').lower()}"
+        attendees_count = summary.get('participants_total')
+        if attendees_count is None:
+            attendees_count = 'N/A'
+
+        print(f"Nombre del torneo: {summary.get('tournament_name') or 'N/A'}")
         print(f"Asistentes: {attendees_count}")
 
         return {
-            'name': event.get('name', 'N/A'),
-            'tournament_name': tournament.get('name', 'N/A'),
+            'name': summary.get('name') or 'N/A',
+            'tournament_name': summary.get('tournament_name') or 'N/A',
             'attendees': attendees_count,
-            'start_date': start_date,
-            'city': city,
-            'country': tournament.get('countryCode', 'N/A'),
-            'department': department,
-            'zone': zone,
-            'winner': winner_name,
+            'start_date': summary.get('start_date') or 'N/A',
+            'city': summary.get('city') or 'N/A',
+            'country': summary.get('country_code') or 'N/A',
+            'department': summary.get('department'),
+            'zone': summary.get('zone'),
+            'winner': summary.get('winner'),
             'tournament_url': tournament_url
         }
     except requests.exceptions.RequestException as e:
@@ -152,15 +157,9 @@ def get_tournaments_by_country(country_code, per_page):
     }
     """
     variables = {'cCode': country_code, 'perPage': per_page}
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {startgg_key}'
-    }
 
     try:
-        response = requests.post(startgg_url, json={'query': query, 'variables': variables}, headers=headers)
-        response.raise_for_status()
-        data = response.json()
+        data = startgg_client.execute(query, variables)
 
         if 'errors' in data:
             raise Exception(', '.join(error['message'] for error in data['errors']))
@@ -198,15 +197,9 @@ def get_tournament_location(event_id, coordinates, radius):
         'coordinates': coordinates,
         'radius': radius
     }
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {startgg_key}'
-    }
 
     try:
-        response = requests.post(startgg_url, json={'query': query, 'variables': variables}, headers=headers)
-        response.raise_for_status()
-        data = response.json()
+        data = startgg_client.execute(query, variables)
 
         if 'errors' in data:
             raise Exception(', '.join(error['message'] for error in data['errors']))
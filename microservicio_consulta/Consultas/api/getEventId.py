@@ -1,21 +1,12 @@
-import os
 import requests
 import traceback
 import json
-from dotenv import load_dotenv
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from urllib.parse import urlparse
 import re
 
-load_dotenv()
-
-startgg_url = "https://api.start.gg/gql/alpha"
-
-startgg_key = "3e417c2b55e54203247b7501c15e70ca"  # debe definirse en .env o entorno
-
-if not startgg_key:
-    raise ValueError('La clave de la API de Start.gg no está configurada. Define STARTGG_KEY en .env o en las variables de entorno')
+from . import startgg_client
 
 def get_event_id(tournament_name, event_name):
     if not tournament_name or not event_name:
@@ -23,12 +14,6 @@ def get_event_id(tournament_name, event_name):
 
     event_slug = f"tournament/{tournament_name}/event/{event_name}"
 
-    headers = {
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-        'Authorization': f'Bearer {startgg_key}'
-    }
-
     query = """
     query EventQuery($slug: String) {
         event(slug: $slug) {
@@ -42,12 +27,7 @@ def get_event_id(tournament_name, event_name):
 
     # Añadido timeout para evitar colgarse indefinidamente
     try:
-        response = requests.post(
-            startgg_url,
-            headers=headers,
-            json={'query': query, 'variables': variables},
-            timeout=10
-        )
+        response = startgg_client.post(query, variables, timeout=10)
     except requests.exceptions.RequestException as e:
         # Propagar para que la vista devuelva 502 con detalles
         raise requests.exceptions.RequestException(f"Error contacting Start.gg: {e}")
@@ -1,106 +1,86 @@
-import requests
-import time
-from dotenv import load_dotenv
-load_dotenv()
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 
-startgg_url = "https://api.start.gg/gql/alpha"
-# usar el token nuevo y nombre consistente
-startgg_key = "3e417c2b55e54203247b7501c15e70ca"
+from . import startgg_client
+from .response_cache import ttl_for_event
 
-def delay(seconds):
-    time.sleep(seconds)
+STANDINGS_PER_PAGE = 50
+# páginas de standings (2..totalPages) que se piden a la vez; 1 = secuencial
+STANDINGS_PAGE_CONCURRENCY = int(os.environ.get('STARTGG_STANDINGS_CONCURRENCY', 4))
 
-def get_event_results(event_id):
-    num_entrants = 0
-    num_entrants_found = 0
-    page_number = 1
-    results = []
-
-    try:
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-            "Authorization": f"Bearer {startgg_key}"
-        }
-
-        # Primera solicitud para obtener el número total de participantes
-        response = requests.post(startgg_url, json={
-            "query": """
-            query EventSets($eventId: ID!, $page: Int!, $perPage: Int!) { 
-                event(id: $eventId) {
-                    sets(page: $page, perPage: $perPage, sortType: STANDARD) {
-                        pageInfo { total }
-                        nodes { id slots { entrant { name } } }
-                    }
-                }
+EVENT_STANDINGS_QUERY = """
+query EventStandings($eventId: ID!, $page: Int!, $perPage: Int!) {
+    event(id: $eventId) {
+        state
+        standings(query: { perPage: $perPage, page: $page }) {
+            pageInfo {
+                total
+                totalPages
             }
-            """,
-            "variables": {
-                "eventId": event_id,
-                "page": 1,
-                "perPage": 1
+            nodes {
+                placement
+                entrant {
+                    id
+                    name
+                }
             }
-        }, headers=headers)
-
-        try:
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as e:
-            print("Respuesta de la API (get_event_results - EventSets):", response.status_code, response.text)
-            raise e
-
-        data = response.json()
-        if data.get('data') and data['data'].get('event') and data['data']['event'].get('sets') and data['data']['event']['sets'].get('pageInfo'):
-            num_entrants = data['data']['event']['sets']['pageInfo']['total']
-        else:
-            raise Exception('Datos de respuesta no esperados para EventSets')
+        }
+    }
+}
+"""
 
-        delay(1)
+def _fetch_standings_page(event_id, page, cache_ttl):
+    data = startgg_client.execute(EVENT_STANDINGS_QUERY, {
+        "eventId": event_id,
+        "page": page,
+        "perPage": STANDINGS_PER_PAGE
+    }, cache_ttl=cache_ttl)
+    if data.get('errors'):
+        raise Exception(f"Errores de la API en standings página {page}: {data['errors']}")
+    standings = ((data.get('data') or {}).get('event') or {}).get('standings')
+    if standings is None:
+        raise Exception('Datos de respuesta no esperados para EventStandings')
+    return data, standings
 
-        while num_entrants_found < num_entrants:
-            response = requests.post(startgg_url, json={
-                "query": """
-                query EventStandings($eventId: ID!, $page: Int!, $perPage: Int!) { 
-                    event(id: $eventId) {
-                        standings(query: { perPage: $perPage, page: $page }) {
-                            nodes {
-                                placement
-                                entrant { name }
-                            }
-                        }
-                    }
-                }
-                """,
-                "variables": {
-                    "eventId": event_id,
-                    "page": page_number,
-                    "perPage": 50
-                }
-            }, headers=headers)
-
-            try:
-                response.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                print("Respuesta de la API (get_event_results - Standings):", response.status_code, response.text)
-                raise e
+def get_event_results(event_id):
+    """
+    Posiciones finales del evento: [{'name', 'placement'}] ordenadas por placement.
+    La primera página da el total de standings (pageInfo) y el resto se piden en
+    paralelo (el limitador compartido de startgg_client regula el ritmo).
+    Las filas repetidas entre páginas se descartan; los empates (misma placement,
+    distinto entrant) se conservan.
+    """
+    try:
+        # la primera página decide el TTL del resto (evento terminado o en curso)
+        data, standings = _fetch_standings_page(event_id, 1, ttl_for_event)
+        pages_ttl = ttl_for_event(data)
+        page_info = standings.get('pageInfo') or {}
+        total_pages = page_info.get('totalPages')
+        if not total_pages:
+            total_pages = math.ceil((page_info.get('total') or 0) / STANDINGS_PER_PAGE) or 1
 
-            data = response.json()
-            # Corrección: quitar paréntesis extra que provocaba SyntaxError
-            if data.get('data') and data['data'].get('event') and data['data']['event'].get('standings') and data['data']['event']['standings'].get('nodes'):
-                nodes = data['data']['event']['standings']['nodes']
-                if not nodes:
-                    break
-                for node in nodes:
-                    entrant = node.get('entrant') or {}
-                    results.append({
-                        'name': entrant.get('name'),
-                        'placement': node.get('placement')
-                    })
-                num_entrants_found += len(nodes)
-            else:
-                raise Exception('Datos de respuesta no esperados para EventStandings')
+        nodes = list(standings.get('nodes') or [])
+        pages = list(range(2, total_pages + 1))
+        if pages:
+            workers = max(1, min(STANDINGS_PAGE_CONCURRENCY, len(pages)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for _, more in executor.map(lambda page: _fetch_standings_page(event_id, page, pages_ttl), pages):
+                    nodes += more.get('nodes') or []
 
-            page_number += 1
-            delay(1)
+        results = []
+        seen = set()
+        for node in nodes:
+            entrant = node.get('entrant') or {}
+            key = (node.get('placement'), entrant.get('id') or entrant.get('name'))
+            if key in seen:
+                continue
+            seen.add(key)
+            results.append({
+                'name': entrant.get('name'),
+                'placement': node.get('placement')
+            })
+        results.sort(key=lambda r: (r['placement'] is None, r['placement'] or 0))
     except Exception as e:
         print('Error al obtener las posiciones del evento:', e)
         results = {"error": str(e)}
@@ -11,13 +11,14 @@ from django.db import transaction
 from django.db import connection
 from django.db.utils import OperationalError
 from django.db.models import Q
+from django.utils import timezone
+import hashlib
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 
-STARTGG_URL = "https://api.start.gg/gql/alpha"
-STARTGG_KEY = "3e417c2b55e54203247b7501c15e70ca"
-
-if not STARTGG_KEY:
-    raise ValueError("La clave de la API de Start.gg no está configurada.")
+from Consultas.api import startgg_client
+from Consultas.api.response_cache import ttl_for_player, get_response_cache
 
 # modelos relacionados a ignorar (por nombre de clase / object_name) — reutilizado en validaciones
 IGNORE_RELATED_MODELS = {'Character', 'character', 'CharacterModel', 'Character_Ssbu'}
@@ -25,20 +26,44 @@ IGNORE_RELATED_MODELS = {'Character', 'character', 'CharacterModel', 'Character_
 # patrones para ignorar tablas relacionadas por nombre de tabla (lower-case substrings)
 IGNORE_RELATED_TABLE_PATTERNS = ('character',)
 
-# Función genérica para realizar consultas a la API de Start.gg
-def startgg_query(query, variables):
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {STARTGG_KEY}'
+# campos de jugador que usan tanto la consulta individual como la agrupada
+PLAYER_INFO_FIELDS = """
+        id
+        gamerTag
+        prefix
+        user {
+          name
+          slug
+          location {
+            country
+            state
+            city
+          }
+          authorizations {
+            type
+            externalUsername
+          }
+        }
+"""
+
+PLAYER_INFO_QUERY = """
+    query PlayerInfo($id: ID!) {
+      player(id: $id) {""" + PLAYER_INFO_FIELDS + """      }
     }
+    """
+
+# jugadores por consulta agrupada; cada uno cuesta ~8 objetos del límite de
+# complejidad de start.gg (1000 por consulta). Si aun así se rechaza, el lote se parte.
+PLAYERS_BATCH_SIZE = 50
+# lotes de jugadores que se piden a la vez (el limitador compartido regula el ritmo)
+PLAYERS_BULK_WORKERS = int(os.environ.get('STARTGG_PLAYERS_WORKERS', 4))
+
+PLAYER_NOT_FOUND = "Jugador no encontrado o datos no disponibles"
+
+# Función genérica para realizar consultas a la API de Start.gg
+def startgg_query(query, variables, cache_ttl=None):
     try:
-        response = requests.post(
-            STARTGG_URL,
-            headers=headers,
-            json={'query': query, 'variables': variables}
-        )
-        response.raise_for_status()
-        return response.json()
+        return startgg_client.execute(query, variables, cache_ttl=cache_ttl)
     except requests.exceptions.RequestException as e:
         return {"error": str(e)}
 
@@ -71,33 +96,21 @@ def get_player_details(player_id):
     """
     Obtiene detalles de un jugador usando su player.id, con formato de columnas igual al Excel.
     """
-    query = """
-    query PlayerInfo($id: ID!) {
-      player(id: $id) {
-        id
-        gamerTag
-        prefix
-        user {
-          name
-          slug
-          location {
-            country
-            state
-            city
-          }
-          authorizations {
-            type
-            externalUsername
-          }
-        }
-      }
-    }
-    """
     variables = {'id': player_id}
-    result = startgg_query(query, variables)
+    result = startgg_query(PLAYER_INFO_QUERY, variables, cache_ttl=ttl_for_player)
     print(f"Respuesta de get_player_details para {player_id}: {result}")  # Registro para depuración
     try:
         player_data = result['data']['player']
+        if player_data:
+            return _format_player_details(player_data)
+    except (KeyError, TypeError):
+        return {"error": PLAYER_NOT_FOUND}
+
+def _format_player_details(player_data):
+    """
+    Convierte el nodo player de start.gg al dict con columnas del Excel (ID, GamerTag, ...).
+    """
+    try:
         if player_data:
             user = player_data['user']
             # Extraer redes sociales
@@ -127,8 +140,97 @@ def get_player_details(player_id):
                 'Discord': discord,
                 'Twitch': twitch,
             }
-    except (KeyError, TypeError):
-        return {"error": "Jugador no encontrado o datos no disponibles"}
+    except (KeyError, TypeError, AttributeError):
+        pass
+    return {"error": PLAYER_NOT_FOUND}
+
+def get_players_details_bulk(player_ids, batch_size=PLAYERS_BATCH_SIZE, workers=None, progress=None):
+    """
+    Obtiene los detalles de varios jugadores con pocas peticiones: empaqueta
+    hasta batch_size lookups player(id:) por documento GraphQL usando alias
+    (p0, p1, ...). Devuelve {player_id: details} con el mismo formato que
+    get_player_details (o {"error": ...} para los no encontrados).
+    Comparte la caché con get_player_details: los jugadores ya cacheados no
+    se piden y los obtenidos se guardan bajo la clave de la consulta individual.
+    Los lotes se piden con hasta `workers` hilos (PLAYERS_BULK_WORKERS) y
+    progress(hechos, total) se llama tras la caché y tras cada lote.
+    """
+    results = {}
+    pending = []
+    seen = set()
+    cache = get_response_cache()
+    for player_id in player_ids:
+        if player_id in (None, '') or player_id in seen:
+            continue
+        seen.add(player_id)
+        cached = cache.get(cache.make_key(PLAYER_INFO_QUERY, {'id': player_id})) if cache is not None else None
+        if cached is not None and (cached.get('data') or {}).get('player'):
+            results[player_id] = _format_player_details(cached['data']['player'])
+        else:
+            pending.append(player_id)
+
+    total = len(seen)
+    if progress is not None:
+        progress(total - len(pending), total)
+    chunks = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+    if not chunks:
+        return results
+
+    def fetch(chunk):
+        # cada lote escribe claves distintas de results
+        _fetch_players_batch(chunk, results, cache)
+        return len(chunk)
+
+    done = total - len(pending)
+    workers = max(1, min(workers or PLAYERS_BULK_WORKERS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for fetched in executor.map(fetch, chunks):
+            done += fetched
+            if progress is not None:
+                progress(done, total)
+    return results
+
+# errores GraphQL de start.gg que se resuelven pidiendo menos jugadores por consulta
+COMPLEXITY_ERROR_PATTERN = re.compile(r'complexity|too (?:large|big|many)|max(?:imum)? .*(?:size|objects|nodes)', re.IGNORECASE)
+
+def _is_complexity_error(result):
+    """True si start.gg rechazó la consulta por su complejidad o tamaño."""
+    if not isinstance(result, dict):
+        return False
+    messages = [e.get('message', '') if isinstance(e, dict) else str(e) for e in (result.get('errors') or [])]
+    if result.get('error'):
+        messages.append(str(result['error']))
+    return any(COMPLEXITY_ERROR_PATTERN.search(m or '') for m in messages)
+
+def _fetch_players_batch(chunk, results, cache):
+    params = ", ".join(f"$p{i}: ID!" for i in range(len(chunk)))
+    fields = "\n".join(f"p{i}: player(id: $p{i}) {{{PLAYER_INFO_FIELDS}}}" for i in range(len(chunk)))
+    query = f"query PlayersBatch({params}) {{\n{fields}\n}}"
+    variables = {f"p{i}": player_id for i, player_id in enumerate(chunk)}
+    result = startgg_query(query, variables)
+
+    if _is_complexity_error(result) and len(chunk) > 1:
+        # p. ej. "query complexity is too high": partir el lote en dos y reintentar.
+        # Los errores de red, 5xx o circuito abierto no se reintentan partidos.
+        middle = len(chunk) // 2
+        _fetch_players_batch(chunk[:middle], results, cache)
+        _fetch_players_batch(chunk[middle:], results, cache)
+        return
+
+    if isinstance(result, dict) and result.get('error'):
+        for player_id in chunk:
+            results[player_id] = {"error": result['error']}
+        return
+
+    data = (result or {}).get('data') or {}
+    for i, player_id in enumerate(chunk):
+        player_data = data.get(f"p{i}")
+        if not player_data:
+            results[player_id] = {"error": PLAYER_NOT_FOUND}
+            continue
+        results[player_id] = _format_player_details(player_data)
+        if cache is not None:
+            cache.set(cache.make_key(PLAYER_INFO_QUERY, {'id': player_id}), {'data': {'player': player_data}}, ttl_for_player(None))
 
 # Función para obtener detalles de un jugador junto con sus sets
 def get_player_details_with_sets(player_id, per_page=5, page=1):
@@ -404,6 +506,24 @@ def get_attendees_by_tournament_id(tournament_id, per_page=100, page=1):
     except (KeyError, TypeError):
         return {"error": "Error en la respuesta de la API"}
 
+def get_all_attendees_by_tournament_id(tournament_id, per_page=100):
+    """
+    Igual que get_attendees_by_tournament_id pero recorriendo todas las páginas
+    (hasta recibir una página incompleta).
+    """
+    attendees = []
+    page = 1
+    while True:
+        rows = get_attendees_by_tournament_id(tournament_id, per_page=per_page, page=page)
+        if isinstance(rows, dict):
+            if page == 1:
+                return rows
+            return {"error": f"{rows.get('error')} (página {page})"}
+        attendees += rows
+        if len(rows) < per_page:
+            return attendees
+        page += 1
+
 def get_player_info_view(request):
     """
     API view: acepta player_id, slug o gamerTag (GET/POST/JSON).
@@ -918,22 +1038,56 @@ def _update_or_create_player(model, details):
             raise RuntimeError(f"OperationalError saving Player: {save_exc}") from save_exc
         raise
 
+def _content_hash(data):
+    """Hash estable de un dict (claves ordenadas) para detectar cambios."""
+    raw = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _participant_key(attendee):
+    if attendee.get('player_id'):
+        return str(attendee['player_id'])
+    return f"p{attendee.get('participant_id')}"
+
+def _load_sync_state(tournament_id):
+    """
+    Devuelve (participantes ya sincronizados del torneo {clave: hash}, modelo PlayerSyncState)
+    o ({}, None) si las tablas de estado no existen todavía (falta migrate): en ese caso
+    la sincronización es completa como antes.
+    """
+    try:
+        from Consultas.models import TournamentSyncState, PlayerSyncState
+        if PlayerSyncState._meta.db_table not in connection.introspection.table_names():
+            print("Tablas de sincronización incremental no encontradas; ejecutar migrate. Se sincroniza todo.")
+            return {}, None
+        state = TournamentSyncState.objects.filter(tournament_id=str(tournament_id)).first()
+        return (state.participants if state else {}), PlayerSyncState
+    except Exception as e:
+        print(f"No se pudo leer el estado de sincronización del torneo {tournament_id}: {e}")
+        return {}, None
+
 def sync_players_from_tournament_view(request):
     """
     API view que sincroniza participantes de un torneo a la base de datos de Players.
     Parámetros:
       - tournament_id (GET/POST/JSON)  (requerido)
       - dry_run (opcional) si true no escribe en DB (default false)
-    Respuesta JSON con resumen {created: n, updated: n, skipped: n, errors: [...]}
+      - full (opcional) si true ignora el estado guardado y sincroniza todos los participantes
+    La sincronización es incremental: por torneo se guarda la marca de la última
+    sincronización y el hash de cada participante, y por jugador el hash de los
+    detalles escritos. Sólo se piden detalles y se escriben los participantes
+    nuevos o cambiados; los demás se cuentan en 'unchanged'.
+    Respuesta JSON con resumen {created: n, updated: n, skipped: n, unchanged: n, errors: [...]}
     """
     # extraer params
     tournament_id = request.GET.get('tournament_id') or request.POST.get('tournament_id')
     dry_run = request.GET.get('dry_run') or request.POST.get('dry_run')
+    full = request.GET.get('full') or request.POST.get('full')
     if request.content_type and 'application/json' in (request.content_type or ''):
         try:
             body = json.loads(request.body.decode('utf-8') or "{}")
             tournament_id = tournament_id or body.get('tournament_id')
             dry_run = dry_run or body.get('dry_run')
+            full = full or body.get('full')
         except Exception:
             pass
 
@@ -941,17 +1095,52 @@ def sync_players_from_tournament_view(request):
         return JsonResponse({"success": False, "error": "Missing parameter: tournament_id"}, status=400)
 
     dry_run_bool = str(dry_run).lower() in ['1', 'true', 'yes'] if dry_run is not None else False
+    full_bool = str(full).lower() in ['1', 'true', 'yes'] if full is not None else False
 
-    summary = {"created": 0, "updated": 0, "skipped": 0, "errors": []}
+    summary = {"created": 0, "updated": 0, "skipped": 0, "unchanged": 0, "errors": []}
     try:
-        attendees = get_attendees_by_tournament_id(tournament_id, per_page=100, page=1)
+        attendees = get_all_attendees_by_tournament_id(tournament_id, per_page=100)
         if isinstance(attendees, dict) and attendees.get('error'):
             return JsonResponse({"success": False, "error": "Upstream error getting attendees", "details": attendees.get('error')}, status=502)
         if not attendees:
             return JsonResponse({"success": False, "error": "No attendees found or empty list"}, status=404)
 
-        # iterar asistentes
+        previous, PlayerSyncState = _load_sync_state(tournament_id)
+        if full_bool:
+            previous = {}
+        # participantes al día tras esta pasada (los que fallen no entran y se reintentan)
+        synced = {}
+
+        # participantes nuevos o cambiados respecto a la última sincronización del torneo
+        pending = []
         for a in attendees:
+            key = _participant_key(a)
+            p_hash = _content_hash({
+                'participant_id': a.get('participant_id'),
+                'player_id': a.get('player_id'),
+                'gamerTag': a.get('gamerTag') or a.get('gamer_tag'),
+            })
+            if previous.get(key) == p_hash:
+                summary['unchanged'] += 1
+                synced[key] = p_hash
+            else:
+                pending.append((a, key, p_hash))
+
+        # detalles de los pendientes en pocas consultas agrupadas
+        details_by_id = {}
+        try:
+            details_by_id = get_players_details_bulk([a.get('player_id') for a, _, _ in pending if a.get('player_id')])
+        except Exception as e:
+            print(f"Error obteniendo detalles agrupados del torneo {tournament_id}: {e}")
+
+        # hash de los detalles escritos la última vez para cada jugador pendiente
+        known_hashes = {}
+        if PlayerSyncState is not None and not full_bool:
+            ids = [int(a['player_id']) for a, _, _ in pending if a.get('player_id')]
+            known_hashes = dict(PlayerSyncState.objects.filter(player_id__in=ids).values_list('player_id', 'content_hash'))
+
+        # iterar asistentes pendientes
+        for a, key, p_hash in pending:
             try:
                 player_id = a.get('player_id')
                 gamerTag = a.get('gamerTag') or a.get('gamer_tag')
@@ -960,9 +1149,10 @@ def sync_players_from_tournament_view(request):
                     continue
                 # si existe player_id, preferimos obtener detalles desde start.gg
                 details = None
+                details_ok = False
                 if player_id:
                     try:
-                        details = get_player_details(player_id)
+                        details = details_by_id.get(player_id) or get_player_details(player_id)
                         # get_player_details puede devolver {"error": ...}
                         if isinstance(details, dict) and details.get('error'):
                             # fallback: construir minimal desde attendee
@@ -970,6 +1160,8 @@ def sync_players_from_tournament_view(request):
                                 'ID': player_id,
                                 'GamerTag': gamerTag
                             }
+                        else:
+                            details_ok = details is not None
                     except Exception as e:
                         details = {'ID': player_id, 'GamerTag': gamerTag}
                 else:
@@ -982,27 +1174,41 @@ def sync_players_from_tournament_view(request):
                     # añadir entry en detalles devueltos para inspección
                     continue
 
+                content_hash = _content_hash(details) if details_ok else None
+                if content_hash is not None and known_hashes.get(int(player_id)) == content_hash:
+                    # participante nuevo en el torneo, pero el jugador ya está al día en la BD
+                    summary['unchanged'] += 1
+                    synced[key] = p_hash
+                    continue
+
                 # otherwise create/update in DB
                 with transaction.atomic():
                     try:
-                        existing = _find_existing_player(LocalPlayerModel, details)
-                        if existing:
-                            # actualizar campos
-                            created_flag = False
-                            created, obj = _update_or_create_player(LocalPlayerModel, details)
-                            if not created:
-                                summary['updated'] += 1
-                            else:
-                                summary['created'] += 1
+                        created, obj = _update_or_create_player(LocalPlayerModel, details)
+                        if created:
+                            summary['created'] += 1
                         else:
-                            created, obj = _update_or_create_player(LocalPlayerModel, details)
-                            summary['created'] += 1 if created else 0
+                            summary['updated'] += 1
+                        if content_hash is not None and PlayerSyncState is not None:
+                            PlayerSyncState.objects.update_or_create(
+                                player_id=int(player_id),
+                                defaults={'content_hash': content_hash, 'synced_at': timezone.now()}
+                            )
+                        synced[key] = p_hash
                     except Exception as e:
                         summary['errors'].append({"participant": a, "error": str(e)})
             except Exception as inner_e:
                 summary['errors'].append({"participant": a, "error": str(inner_e)})
                 continue
 
+        # guardar la marca del torneo con los participantes al día
+        if PlayerSyncState is not None and LocalPlayerModel is not None and not dry_run_bool:
+            from Consultas.models import TournamentSyncState
+            TournamentSyncState.objects.update_or_create(
+                tournament_id=str(tournament_id),
+                defaults={'synced_at': timezone.now(), 'participants': synced}
+            )
+
     except Exception as e:
         traceback.print_exc()
         return JsonResponse({"success": False, "error": "Unexpected error", "details": str(e)}, status=500)
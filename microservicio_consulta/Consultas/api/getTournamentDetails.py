@@ -1,36 +1,74 @@
 import os
 import requests
-from dotenv import load_dotenv
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from django.http import JsonResponse
+from django.urls import reverse
+from . import startgg_client
+from .response_cache import ttl_for_tournament
+from .eventInfo import get_event_summary
 from .location_mapping import get_department_by_city, get_region_by_department, get_zone_by_department
 from datetime import datetime
 
-# intentar importar utilidades de player (si el módulo está disponible)
-try:
-    from .getPlayerDetails import get_player_details, _update_or_create_player, LocalPlayerModel as PlayersModuleLocalModel
-except Exception:
-    # si falla la importación, las operaciones de creación se saltarán
-    get_player_details = None
-    _update_or_create_player = None
-    PlayersModuleLocalModel = None
+# páginas de participantes (2..totalPages) que se piden a la vez; 1 = secuencial
+PARTICIPANT_PAGES_CONCURRENCY = int(os.environ.get('STARTGG_PARTICIPANTS_CONCURRENCY', 4))
 
-# Cargar la clave de la API desde el archivo .env
-load_dotenv()
+# consulta reducida para las páginas siguientes: sólo participantes, sin eventos ni standings
+PARTICIPANTS_PAGE_QUERY = """
+query TournamentParticipantsPage($id: ID!, $perPage: Int!, $page: Int!) {
+    tournament(id: $id) {
+        participants(query: {perPage: $perPage, page: $page}) {
+            nodes {
+                id
+                gamerTag
+                player {
+                    id
+                }
+            }
+        }
+    }
+}
+"""
 
-startgg_url = "https://api.start.gg/gql/alpha"
-startgg_key = "3e417c2b55e54203247b7501c15e70ca"
+def _attendee_rows(nodes):
+    return [
+        {
+            "participant_id": p.get("id"),
+            "player_id": (p.get("player") or {}).get("id"),
+            "gamerTag": p.get("gamerTag")
+        }
+        for p in nodes or []
+    ]
 
-if not startgg_key:
-    raise ValueError('La clave de la API de Start.gg no está configurada. Verifica tu archivo .env')
+def _fetch_participants_page(tournament_id, page, per_page, cache_ttl):
+    """
+    Descarga una página de participantes con la consulta reducida.
+    Devuelve (filas, None) o (None, error) para que el llamador reporte la página fallida.
+    """
+    variables = {'id': tournament_id, 'perPage': per_page, 'page': page}
+    try:
+        d = startgg_client.execute(PARTICIPANTS_PAGE_QUERY, variables, cache_ttl=cache_ttl)
+    except requests.exceptions.HTTPError as e:
+        resp = e.response
+        print(f"Respuesta de la API (get_tournament_details page {page}):", resp.status_code)
+        print(resp.text)
+        return None, {"page": page, "error": "Upstream HTTP error", "status_code": resp.status_code, "details": resp.text}
+    except ValueError as ex:
+        print(f"No se pudo parsear JSON en page {page}:", ex)
+        return None, {"page": page, "error": "Invalid JSON", "details": str(ex)}
+    except requests.exceptions.RequestException as ex:
+        print(f"Error de conexión en page {page}:", ex)
+        return None, {"page": page, "error": "RequestException", "details": str(ex)}
+    if 'errors' in d:
+        print(f"GraphQL errors on page {page}:", d['errors'])
+        return None, {"page": page, "error": "GraphQL errors", "details": d.get('errors')}
+    tournament = (d.get('data') or {}).get('tournament')
+    if tournament is None:
+        print(f"Respuesta inesperada page {page}:", d)
+        return None, {"page": page, "error": "Invalid API response structure", "details": d}
+    return _attendee_rows((tournament.get('participants') or {}).get('nodes')), None
 
 def get_tournament_details(tournament_id, attendees_per_page=100):
-    headers = {
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-        'Authorization': f'Bearer {startgg_key}'
-    }
-    
     query = """
     query TournamentQuery($id: ID!, $perPage: Int!, $page: Int!) {
         tournament(id: $id) {
@@ -38,6 +76,7 @@ def get_tournament_details(tournament_id, attendees_per_page=100):
             city
             countryCode
             startAt
+            endAt
             slug
             events {
                 standings(query: { perPage: 1, page: 1 }) {
@@ -71,15 +110,10 @@ def get_tournament_details(tournament_id, attendees_per_page=100):
         'page': 1
     }
     try:
-        response = requests.post(
-            startgg_url,
-            headers=headers,
-            json={'query': query, 'variables': variables},
-            timeout=30
-        )
         try:
-            response.raise_for_status()
-        except requests.exceptions.HTTPError:
+            data = startgg_client.execute(query, variables, cache_ttl=ttl_for_tournament)
+        except requests.exceptions.HTTPError as e:
+            response = e.response
             print("Respuesta de la API (get_tournament_details page 1):", response.status_code)
             print(response.text)
             body_text = response.text
@@ -88,13 +122,9 @@ def get_tournament_details(tournament_id, attendees_per_page=100):
             except Exception:
                 body_json = None
             return {"success": False, "error": "Upstream API HTTP error", "status_code": response.status_code, "details": body_json or body_text}
- 
-        try:
-            data = response.json()
-        except Exception as ex:
+        except ValueError as ex:
             print("No se pudo parsear JSON de la respuesta (get_tournament_details):", ex)
-            print("Respuesta raw:", response.text)
-            return {"success": False, "error": "Invalid JSON from upstream", "details": response.text}
+            return {"success": False, "error": "Invalid JSON from upstream", "details": str(ex)}
  
         if 'errors' in data:
             print("Errors en respuesta upstream (get_tournament_details):", data['errors'])
@@ -106,54 +136,24 @@ def get_tournament_details(tournament_id, attendees_per_page=100):
  
         tournament = data['data']['tournament']
         participants = tournament.get('participants', {})
-        attendees = [
-            {
-                "participant_id": p.get("id"),
-                "player_id": p.get("player", {}).get("id"),
-                "gamerTag": p.get("gamerTag")
-            }
-            for p in participants.get('nodes', [])
-        ]
-        total_pages = participants.get('pageInfo', {}).get('totalPages', 1)
-        for page in range(2, total_pages + 1):
-            variables['page'] = page
-            resp = requests.post(
-                startgg_url,
-                headers=headers,
-                json={'query': query, 'variables': variables},
-                timeout=30
-            )
-            try:
-                resp.raise_for_status()
-            except requests.exceptions.HTTPError:
-                print(f"Respuesta de la API (get_tournament_details page {page}):", resp.status_code)
-                print(resp.text)
-                try:
-                    body_json = resp.json()
-                except Exception:
-                    body_json = resp.text
-                return {"success": False, "error": f"Upstream HTTP error page {page}", "status_code": resp.status_code, "details": body_json}
-            try:
-                d = resp.json()
-            except Exception as ex:
-                print(f"No se pudo parsear JSON en page {page}:", ex)
-                print("Respuesta raw:", resp.text)
-                return {"success": False, "error": f"Invalid JSON on page {page}", "details": resp.text}
-            if 'errors' in d:
-                print(f"GraphQL errors on page {page}:", d['errors'])
-                return {"success": False, "error": f"GraphQL errors on page {page}", "details": d.get('errors') or d}
-            if 'data' not in d or 'tournament' not in d['data'] or d['data']['tournament'] is None:
-                print(f"Respuesta inesperada page {page}:", d)
-                return {"success": False, "error": f"Invalid API response structure on page {page}", "details": d}
-            more_participants = d['data']['tournament'].get('participants', {}).get('nodes', [])
-            attendees += [
-                {
-                    "participant_id": p.get("id"),
-                    "player_id": p.get("player", {}).get("id"),
-                    "gamerTag": p.get("gamerTag")
-                }
-                for p in more_participants
-            ]
+        attendees = _attendee_rows(participants.get('nodes', []))
+        total_pages = (participants.get('pageInfo') or {}).get('totalPages') or 1
+        # las páginas siguientes heredan el TTL decidido con la primera (torneo cerrado o en curso)
+        pages_ttl = ttl_for_tournament(data)
+        pages = list(range(2, total_pages + 1))
+        failed_pages = []
+        if pages:
+            workers = max(1, min(PARTICIPANT_PAGES_CONCURRENCY, len(pages)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # map conserva el orden de las páginas aunque terminen desordenadas
+                page_results = executor.map(
+                    lambda page: _fetch_participants_page(tournament_id, page, attendees_per_page, pages_ttl), pages
+                )
+                for rows, error in page_results:
+                    if error is not None:
+                        failed_pages.append(error)
+                    else:
+                        attendees += rows
         winner = 'N/A'
         events = tournament.get('events', [])
         if events and isinstance(events, list):
@@ -186,7 +186,9 @@ def get_tournament_details(tournament_id, attendees_per_page=100):
             'department': department,
             'region': region,
             'start_date': start_date,
-            'slug': tournament.get('slug')
+            'slug': tournament.get('slug'),
+            # páginas de participantes que no se pudieron descargar (attendees queda incompleto)
+            'failed_pages': failed_pages
         }
         return {"success": True, "details": details}
     except requests.exceptions.RequestException as e:
@@ -198,15 +200,35 @@ def get_tournament_details(tournament_id, attendees_per_page=100):
         traceback.print_exc()
         return {"success": False, "error": "Unexpected error", "details": str(e)}
 
+def _start_player_sync(tournament_id, attendees=None):
+    """
+    Crea/actualiza los jugadores del torneo en segundo plano (player_jobs) y devuelve el
+    trabajo con la URL de progreso. Sin `attendees`, el trabajo descarga los participantes.
+    """
+    try:
+        from .player_jobs import start_player_sync_job
+        player_sync_job = start_player_sync_job(tournament_id, attendees)
+        player_sync_job['status_url'] = f"{reverse('api_player_sync_status')}?job_id={player_sync_job['job_id']}"
+    except Exception as e:
+        print("No se pudo iniciar la sincronización de jugadores:", e)
+        traceback.print_exc()
+        player_sync_job = {"error": "Unable to start player sync job", "details": str(e)}
+    return player_sync_job
+
 def get_event_info_view(request):
     """
     API view que acepta event_id (GET, POST form-data o POST JSON).
     Retorna los detalles del torneo asociado al evento en un formato plano que consuma el frontend.
-    Acepta opcionalmente create_players=1 para intentar crear/actualizar jugadores faltantes en la BD.
+    El resumen sale de una sola consulta (eventInfo.get_event_summary); la lista de asistentes
+    (attendees_list) sólo se descarga con include_attendees=1.
+    Acepta opcionalmente create_players=1 para crear/actualizar jugadores faltantes en la BD: el trabajo
+    descarga los participantes y hace los upserts en segundo plano, y la respuesta incluye
+    player_sync_job con su id y la URL de progreso sin esperar a las páginas de participantes.
     """
     event_id = request.GET.get('event_id') or request.GET.get('id')
     # aceptar flag para auto-crear jugadores faltantes
     create_players_flag = request.GET.get('create_players') or request.POST.get('create_players')
+    include_attendees_flag = request.GET.get('include_attendees') or request.POST.get('include_attendees')
     if request.method == 'POST' and not event_id:
         event_id = request.POST.get('event_id') or request.POST.get('id')
     if request.method == 'POST' and not event_id and request.content_type and 'application/json' in request.content_type:
@@ -216,6 +238,8 @@ def get_event_info_view(request):
             event_id = event_id or body.get('event_id') or body.get('id')
             if create_players_flag is None:
                 create_players_flag = body.get('create_players')
+            if include_attendees_flag is None:
+                include_attendees_flag = body.get('include_attendees')
         except Exception:
             pass
 
@@ -223,126 +247,62 @@ def get_event_info_view(request):
     create_players = False
     if create_players_flag is not None:
         create_players = str(create_players_flag).lower() in ['1', 'true', 'yes']
+    include_attendees = str(include_attendees_flag).lower() in ['1', 'true', 'yes']
 
     if not event_id:
         return JsonResponse({"success": False, "error": "Missing parameter: event_id"}, status=400)
 
     try:
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Authorization': f'Bearer {startgg_key}'
-        }
-        query = """
-        query EventToTournament($eventId: ID!) {
-            event(id: $eventId) {
-                id
-                name
-                tournament {
-                    id
-                    name
-                }
-            }
-        }
-        """
-        variables = {'eventId': int(event_id)}
-        resp = requests.post(startgg_url, headers=headers, json={'query': query, 'variables': variables}, timeout=30)
         try:
-            resp.raise_for_status()
-        except requests.exceptions.HTTPError:
-            print("Respuesta de la API (EventToTournament):", resp.status_code)
+            summary = get_event_summary(int(event_id))
+        except requests.exceptions.HTTPError as e:
+            resp = e.response
+            print("Respuesta de la API (EventSummary):", resp.status_code)
             print(resp.text)
             return JsonResponse({"success": False, "error": "Upstream API HTTP error", "status_code": resp.status_code, "body": resp.text}, status=502)
+        except requests.exceptions.RequestException:
+            raise
+        except Exception as e:
+            print("Respuesta inesperada (EventSummary):", e)
+            return JsonResponse({"success": False, "error": "Invalid upstream response", "body": str(e)}, status=502)
+        if summary is None:
+            return JsonResponse({"success": False, "error": "Event not found"}, status=404)
 
-        data = resp.json()
-        if 'errors' in data or 'data' not in data or data['data'].get('event') is None:
-            print("Respuesta inesperada (EventToTournament):", data)
-            return JsonResponse({"success": False, "error": "Invalid upstream response", "body": data}, status=502)
-
-        tournament = data['data']['event'].get('tournament')
-        if not tournament or not tournament.get('id'):
+        tournament_id = summary.get('tournament_id')
+        if not tournament_id:
             return JsonResponse({"success": False, "error": "Tournament not found for event"}, status=404)
 
-        tournament_id = tournament['id']
-        result = get_tournament_details(tournament_id)
+        num_attendees = summary.get('num_attendees')
+        response_data = {
+            "success": True,
+            "tournament_name": summary.get('tournament_name'),
+            "winner": summary.get('winner_full_name'),
+            "attendees": num_attendees if num_attendees is not None else summary.get('participants_total'),
+            "num_entrants": summary.get('num_entrants'),
+            "tournament_id": tournament_id,
+            "tournament_url": f"https://start.gg/tournament/{tournament_id}",
+            "region": summary.get('region'),
+            "country": summary.get('country_code') or 'CO',
+            "department": summary.get('department'),
+            "city": summary.get('city'),
+            "start_date": summary.get('start_date')
+        }
+        if not include_attendees:
+            if create_players:
+                response_data['player_sync_job'] = _start_player_sync(tournament_id)
+            return JsonResponse(response_data, status=200)
 
+        # lista de asistentes sólo a petición (pagina todos los participantes del torneo)
+        result = get_tournament_details(tournament_id)
         if isinstance(result, dict) and result.get('success') is True:
             details = result['details']
             attendees = details.get('attendees', []) or []
-            # si el cliente pidió crear jugadores faltantes, intentarlo
-            player_sync_summary = None
+            response_data['attendees_list'] = attendees
+            if details.get('failed_pages'):
+                response_data['failed_pages'] = details['failed_pages']
             if create_players:
-                summary = {"created": 0, "updated": 0, "skipped": 0, "errors": []}
-                # sólo si las utilidades están disponibles y hay un modelo
-                if get_player_details is None or _update_or_create_player is None:
-                    summary['errors'].append("Player creation utilities not available on server")
-                else:
-                    # intentar obtener modelo desde el módulo getPlayerDetails si está expuesto
-                    target_model = PlayersModuleLocalModel if PlayersModuleLocalModel is not None else None
-                    # fallback: intentar importar desde Consultas.models
-                    if target_model is None:
-                        try:
-                            from Consultas.models import Player as TargetPlayerModel
-                            target_model = TargetPlayerModel
-                        except Exception:
-                            target_model = None
-
-                    # Verificar que la tabla del modelo exista antes de iterar (evita "no such table")
-                    if target_model is not None:
-                        try:
-                            from django.db import connection
-                            if target_model._meta.db_table not in connection.introspection.table_names():
-                                summary['errors'].append(f"Player table not found in DB: '{target_model._meta.db_table}'. Run migrations.")
-                                # anular target_model para que el bucle no intente crear
-                                target_model = None
-                        except Exception as e:
-                            summary['errors'].append(f"Unable to inspect DB tables: {e}")
-                            target_model = None
-
-                    for a in attendees:
-                        p_id = a.get('player_id')
-                        if not p_id:
-                            summary['skipped'] += 1
-                            continue
-                        try:
-                            # obtener detalles desde start.gg
-                            p_details = get_player_details(int(p_id))
-                            if isinstance(p_details, dict) and p_details.get('error'):
-                                summary['errors'].append({"player_id": p_id, "error": p_details.get('error')})
-                                continue
-                            if target_model is None:
-                                # no hay modelo para persistir
-                                summary['skipped'] += 1
-                                continue
-                            # crear/actualizar en BD
-                            try:
-                                created, obj = _update_or_create_player(target_model, p_details)
-                                if created:
-                                    summary['created'] += 1
-                                else:
-                                    summary['updated'] += 1
-                            except Exception as e:
-                                summary['errors'].append({"player_id": p_id, "error": str(e)})
-                        except Exception as e:
-                            summary['errors'].append({"player_id": p_id, "error": str(e)})
-                player_sync_summary = summary
-
-            response_data = {
-                "success": True,
-                "tournament_name": details.get('name'),
-                "winner": details.get('winner'),
-                "attendees": details.get('numAttendees'),
-                "attendees_list": details.get('attendees', []),
-                "tournament_id": tournament_id,
-                "tournament_url": f"https://start.gg/tournament/{tournament_id}",
-                "region": details.get('region', None),
-                "country": details.get('country_code', 'CO'),
-                "department": details.get('department', None),
-                "city": details.get('city', None),
-                "start_date": details.get('start_date', None)
-            }
-            if player_sync_summary is not None:
-                response_data['player_sync_summary'] = player_sync_summary
+                # ya descargados: el trabajo no vuelve a pedirlos
+                response_data['player_sync_job'] = _start_player_sync(tournament_id, attendees)
             return JsonResponse(response_data, status=200)
         error_details = result.get('details') if result.get('details') is not None else result.get('body') if isinstance(result, dict) else None
         return JsonResponse({"success": False, "error": result.get('error', 'Unknown error'), "details": error_details}, status=502)
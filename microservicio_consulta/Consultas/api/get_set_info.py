@@ -1,11 +1,7 @@
 import requests
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-
-startgg_url = "https://api.start.gg/gql/alpha"
-startgg_key = "3e417c2b55e54203247b7501c15e70ca"
+from . import startgg_client
+from .response_cache import ttl_for_set
 
 def get_set_info(set_id):
     if not set_id:
@@ -22,6 +18,7 @@ def get_set_info(set_id):
         fullRoundText
         round
         winnerId
+        completedAt
         slots {
           entrant {
             id
@@ -70,18 +67,12 @@ def get_set_info(set_id):
     }
     """
     variables = {"setId": set_id_int}
-    resp = requests.post(
-        startgg_url,
-        headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {startgg_key}'},
-        json={'query': query, 'variables': variables}
-    )
     try:
-        resp.raise_for_status()
+        data = startgg_client.execute(query, variables, cache_ttl=ttl_for_set)
     except requests.exceptions.HTTPError as e:
-        print("Respuesta de la API:", resp.text)
+        print("Respuesta de la API:", e.response.text)
         raise e
 
-    data = resp.json()
     return data.get('data', {}).get('set')
 
 if __name__ == "__main__":
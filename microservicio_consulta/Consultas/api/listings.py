@@ -0,0 +1,226 @@
+"""
+Listados JSON de jugadores, torneos y sets con paginación por cursor (keyset).
+
+En lugar de LIMIT/OFFSET cada página continúa desde la clave de la última fila
+de la anterior (WHERE clave > cursor ORDER BY clave LIMIT n), así que el coste
+de una página no depende de cuántas se hayan recorrido antes:
+
+- list-players/: por ID.
+- list-tournaments/: por fecha (más recientes primero, sin fecha al final) e ID;
+  con order=id, sólo por ID.
+- list-sets/: por la clave natural (id_torneo, id_set).
+
+Filtros (sin distinguir mayúsculas): country, department, region y, en torneos
+y sets, tier; en sets se aplican sobre el torneo del set. Además, en sets:
+tournament_id y player_id (como jugador 1 o 2).
+La respuesta trae next_cursor, que se pasa como ?cursor=... para la página siguiente.
+"""
+import base64
+import json
+from datetime import date
+
+from django.db.models import CharField, Q
+from django.db.models.functions import Cast
+from django.http import JsonResponse
+
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 500
+
+PLAYER_LIST_FIELDS = [
+    'id', 'gamertag', 'slug', 'prefijo', 'nombre', 'pais', 'departamento', 'region', 'ciudad',
+    'twitter', 'discord', 'twitch',
+]
+TOURNAMENT_LIST_FIELDS = [
+    'id', 'tournament_name', 'winner', 'attendees', 'region', 'pais', 'departamento', 'ciudad', 'date', 'url', 'tier',
+]
+SET_LIST_FIELDS = [
+    'id_torneo', 'id_set', 'id_player_1', 'player_1', 'player_1_score', 'id_player_2', 'player_2',
+    'player_2_score', 'phase', 'event_name', 'tournament_name', 'ronda',
+]
+# parámetro -> campo, para jugadores y torneos
+LOCATION_FILTERS = {'country': 'pais', 'department': 'departamento', 'region': 'region'}
+
+
+class InvalidListParameter(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise InvalidListParameter("Invalid cursor")
+    if not isinstance(values, list):
+        raise InvalidListParameter("Invalid cursor")
+    return values
+
+
+def _page_size(request):
+    try:
+        per_page = int(request.GET.get('per_page', LIST_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise InvalidListParameter("per_page must be an integer")
+    return max(1, min(per_page, LIST_MAX_PAGE_SIZE))
+
+
+def _int_param(request, name):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise InvalidListParameter(f"{name} must be an integer")
+
+
+def _filters(request, mapping):
+    q = Q()
+    for param, field in mapping.items():
+        value = (request.GET.get(param) or '').strip()
+        if value:
+            q &= Q(**{f'{field}__iexact': value})
+    return q
+
+
+def _page(request, querysets, make_cursor):
+    """
+    Ejecuta la página (una fila de más para saber si hay siguiente) y arma la
+    respuesta. `querysets` se recorren en orden hasta completar la página.
+    """
+    per_page = _page_size(request)
+    rows = []
+    for queryset in querysets:
+        rows += list(queryset[:per_page + 1 - len(rows)])
+        if len(rows) > per_page:
+            break
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    for row in rows:
+        for field, value in row.items():
+            if isinstance(value, date):
+                row[field] = value.isoformat()
+    return JsonResponse({
+        "success": True,
+        "results": rows,
+        "per_page": per_page,
+        "has_more": has_more,
+        "next_cursor": make_cursor(rows[-1]) if has_more else None,
+    }, status=200)
+
+
+def _list_view(build):
+    """Envuelve una vista de listado: parámetros inválidos -> 400, errores de BD -> 500."""
+    def view(request):
+        try:
+            return build(request)
+        except InvalidListParameter as e:
+            return JsonResponse({"success": False, "error": str(e)}, status=400)
+        except Exception as e:
+            print(f"Error en {build.__name__}: {e}")
+            return JsonResponse({"success": False, "error": "Unable to read list", "details": str(e)}, status=500)
+    view.__name__ = build.__name__
+    view.__doc__ = build.__doc__
+    return view
+
+
+@_list_view
+def list_players_view(request):
+    """GET ?country=&department=&region=&per_page=&cursor= -> jugadores ordenados por ID."""
+    from Consultas.models import Player
+
+    queryset = Player.objects.filter(_filters(request, LOCATION_FILTERS)).values(*PLAYER_LIST_FIELDS).order_by('id')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 1 or not isinstance(values[0], int):
+            raise InvalidListParameter("Invalid cursor")
+        queryset = queryset.filter(id__gt=values[0])
+    return _page(request, [queryset], lambda row: encode_cursor([row['id']]))
+
+
+def _tournament_filters(request):
+    return _filters(request, dict(LOCATION_FILTERS, tier='tier'))
+
+
+@_list_view
+def list_tournaments_view(request):
+    """
+    GET ?country=&department=&region=&tier=&order=date|id&per_page=&cursor= -> torneos.
+    Con order=date (por defecto) los más recientes primero y los que no tienen fecha al final.
+    """
+    from Consultas.models import Tournament
+
+    order = request.GET.get('order', 'date')
+    if order not in ('date', 'id'):
+        raise InvalidListParameter("order must be 'date' or 'id'")
+    queryset = Tournament.objects.filter(_tournament_filters(request)).values(*TOURNAMENT_LIST_FIELDS)
+    cursor = request.GET.get('cursor')
+    values = decode_cursor(cursor) if cursor else None
+
+    if order == 'id':
+        queryset = queryset.order_by('id')
+        if values is not None:
+            if len(values) != 1 or not isinstance(values[0], int):
+                raise InvalidListParameter("Invalid cursor")
+            queryset = queryset.filter(id__gt=values[0])
+        return _page(request, [queryset], lambda row: encode_cursor([row['id']]))
+
+    # (fecha DESC, id DESC) sobre el índice (Date, ID): primero los que tienen
+    # fecha y después los que no. date__lte acota el recorrido del índice.
+    dated = queryset.filter(date__isnull=False).order_by('-date', '-id')
+    undated = queryset.filter(date__isnull=True).order_by('-id')
+    if values is not None:
+        if len(values) != 2 or not isinstance(values[1], int):
+            raise InvalidListParameter("Invalid cursor")
+        last_date, last_id = values
+        if last_date is None:
+            dated = dated.none()
+            undated = undated.filter(id__lt=last_id)
+        else:
+            try:
+                last_date = date.fromisoformat(last_date)
+            except (TypeError, ValueError):
+                raise InvalidListParameter("Invalid cursor")
+            dated = dated.filter(Q(date__lt=last_date) | Q(id__lt=last_id), date__lte=last_date)
+    return _page(request, [dated, undated], lambda row: encode_cursor([row['date'], row['id']]))
+
+
+@_list_view
+def list_sets_view(request):
+    """
+    GET ?tournament_id=&player_id=&country=&department=&region=&tier=&per_page=&cursor=
+    -> sets ordenados por (id_torneo, id_set).
+    """
+    from Consultas.models import Set, Tournament
+
+    queryset = Set.objects.filter(id_torneo__isnull=False, id_set__isnull=False)
+    tournament_id = (request.GET.get('tournament_id') or '').strip()
+    if tournament_id:
+        queryset = queryset.filter(id_torneo=tournament_id)
+    player_id = _int_param(request, 'player_id')
+    if player_id is not None:
+        queryset = queryset.filter(Q(id_player_1=player_id) | Q(id_player_2=player_id))
+    tournament_filters = _tournament_filters(request)
+    if tournament_filters:
+        # Colombia_Sets guarda el ID del torneo como texto
+        tournament_ids = (
+            Tournament.objects.filter(tournament_filters)
+            .annotate(id_text=Cast('id', CharField()))
+            .values('id_text')
+        )
+        queryset = queryset.filter(id_torneo__in=tournament_ids)
+
+    queryset = queryset.values(*SET_LIST_FIELDS).order_by('id_torneo', 'id_set')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2 or not isinstance(values[0], str) or not isinstance(values[1], int):
+            raise InvalidListParameter("Invalid cursor")
+        last_torneo, last_set = values
+        queryset = queryset.filter(Q(id_torneo__gt=last_torneo) | Q(id_set__gt=last_set), id_torneo__gte=last_torneo)
+    return _page(request, [queryset], lambda row: encode_cursor([row['id_torneo'], row['id_set']]))
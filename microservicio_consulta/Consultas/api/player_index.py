@@ -0,0 +1,217 @@
+"""
+Índice en memoria para el autocompletado de jugadores (autocomplete-players/).
+
+En lugar de un icontains sobre Colombia_Players en cada tecla, el proceso
+guarda un arreglo ordenado de claves normalizadas (minúsculas y sin tildes:
+'Pérez' -> 'perez') y busca el rango de un prefijo con bisect:
+
+- el gamertag completo y todos sus sufijos (así 'ark' sigue encontrando 'Dark');
+- el prefijo del equipo y cada palabra del gamertag y del nombre.
+
+Orden de los resultados: gamertag exacto, gamertag que empieza por la
+búsqueda, palabra de prefijo/nombre/gamertag que empieza por la búsqueda y,
+por último, texto contenido en el gamertag; dentro de cada grupo, los
+jugadores con más sets en Colombia_Sets primero. Las búsquedas de 1 y 2
+letras (los rangos más grandes) se calculan al construir el índice.
+
+Las escrituras de jugadores por el ORM (señales post_save/post_delete) y las
+importaciones masivas marcan el índice como desactualizado; además caduca
+cada PLAYER_INDEX_TTL segundos por las escrituras de otros procesos. La
+reconstrucción se hace en un hilo mientras se sigue respondiendo con el
+índice anterior.
+"""
+import os
+import re
+import threading
+import time
+import heapq
+import unicodedata
+from bisect import bisect_left
+
+PLAYER_INDEX_TTL = float(os.environ.get('PLAYER_INDEX_TTL', 300))
+PLAYER_INDEX_BACKGROUND_REBUILD = str(os.environ.get('PLAYER_INDEX_BACKGROUND_REBUILD', '1')).lower() in ['1', 'true', 'yes']
+PLAYER_INDEX_MAX_RESULTS = 20
+# búsquedas de hasta esta longitud se precalculan al construir el índice
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+EXACT, GAMERTAG_PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+
+def fold(text):
+    """Minúsculas, sin tildes y con los espacios colapsados."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.casefold().split())
+
+
+def _words(text):
+    return [w for w in re.split(r'[\W_]+', text) if w]
+
+
+class PlayerIndex:
+    def __init__(self, players, activity=None):
+        """players: [(id, gamertag, prefijo, nombre)]; activity: {id: número de sets}."""
+        activity = activity or {}
+        folded = [(fold(gamertag), player_id, gamertag, prefijo, nombre) for player_id, gamertag, prefijo, nombre in players]
+        # la posición de cada jugador es su desempate: más sets primero, luego el gamertag
+        folded = sorted((f for f in folded if f[0]), key=lambda f: (-activity.get(f[1], 0), f[0]))
+        self.ids = [f[1] for f in folded]
+        self.gamertags = [f[2] for f in folded]
+        self.size = n = max(1, len(folded))
+        # clave normalizada -> entradas ordenadas; cada entrada es tipo * n + posición,
+        # así el orden de los enteros es el orden de los resultados
+        postings = {}
+        for slot, (key, _, _, prefijo, nombre) in enumerate(folded):
+            entries = {key: GAMERTAG_PREFIX}
+            for token in set(_words(key)[1:]) | set(_words(fold(nombre))) | ({fold(prefijo)} - {''}):
+                entries.setdefault(token, WORD_PREFIX)
+            for start in range(1, len(key)):
+                if key[start] != ' ':
+                    entries.setdefault(key[start:], SUBSTRING)
+            for token, kind in entries.items():
+                postings.setdefault(token, []).append(kind * n + slot)
+        for entries in postings.values():
+            entries.sort()
+        self.postings = postings
+        self.keys = sorted(postings)
+        self.built_at = time.time()
+        self._precomputed = self._precompute()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _precompute(self):
+        """Mejores PLAYER_INDEX_MAX_RESULTS jugadores de cada búsqueda de 1 y 2 letras."""
+        n = self.size
+        ranked = []
+        for key, entries in self.postings.items():
+            prefixes = tuple(key[:length] for length in range(1, min(PRECOMPUTED_PREFIX_LENGTH, len(key)) + 1))
+            for entry in entries:
+                ranked.append((entry, prefixes))
+                if entry < (GAMERTAG_PREFIX + 1) * n and len(key) <= PRECOMPUTED_PREFIX_LENGTH:
+                    # coincidencia exacta: sólo para la búsqueda igual al gamertag
+                    ranked.append((EXACT * n + entry % n, (key,)))
+        ranked.sort(key=lambda r: r[0])
+        top = {}
+        for entry, prefixes in ranked:
+            slot = entry % n
+            for prefix in prefixes:
+                slots = top.setdefault(prefix, [])
+                if len(slots) < PLAYER_INDEX_MAX_RESULTS and slot not in slots:
+                    slots.append(slot)
+        return top
+
+    def search(self, query, limit=10):
+        """Hasta `limit` jugadores ({id, gamertag}) que coinciden con la búsqueda, ordenados."""
+        q = fold(query)
+        limit = max(1, min(limit, PLAYER_INDEX_MAX_RESULTS))
+        if not q:
+            return []
+        n = self.size
+        if len(q) <= PRECOMPUTED_PREFIX_LENGTH:
+            slots = self._precomputed.get(q, [])[:limit]
+        else:
+            start = bisect_left(self.keys, q)
+            end = bisect_left(self.keys, q + '\uffff', start)
+            lists = []
+            for key in self.keys[start:end]:
+                entries = self.postings[key]
+                if key == q:
+                    # el gamertag igual a la búsqueda pasa de GAMERTAG_PREFIX a EXACT
+                    entries = (e - n if e < (GAMERTAG_PREFIX + 1) * n else e for e in entries)
+                lists.append(entries)
+            slots = []
+            for entry in heapq.merge(*lists):
+                slot = entry % n
+                if slot not in slots:
+                    slots.append(slot)
+                    if len(slots) == limit:
+                        break
+        return [{'id': self.ids[slot], 'gamertag': self.gamertags[slot]} for slot in slots]
+
+
+def load_player_index():
+    """Construye el índice desde Colombia_Players, con la actividad contada en Colombia_Sets."""
+    from django.db.models import Count
+    from Consultas.models import Player, Set
+
+    players = list(Player.objects.values_list('id', 'gamertag', 'prefijo', 'nombre'))
+    activity = {}
+    try:
+        for column in ('id_player_1', 'id_player_2'):
+            for player_id, sets in Set.objects.values_list(column).annotate(n=Count('id_set')).order_by():
+                if player_id is not None:
+                    activity[player_id] = activity.get(player_id, 0) + sets
+    except Exception as e:
+        print(f"Índice de jugadores sin actividad (Colombia_Sets no disponible): {e}")
+    return PlayerIndex(players, activity)
+
+
+_index = None
+_stale = False
+_rebuilding = False
+_lock = threading.Lock()
+
+
+def mark_player_index_stale(*args, **kwargs):
+    """Marca el índice para reconstruirlo en la próxima búsqueda (sirve como receptor de señales)."""
+    global _stale
+    _stale = True
+
+
+def set_player_index(index):
+    """Sustituye el índice compartido (tests); None obliga a construirlo en la próxima búsqueda."""
+    global _index, _stale
+    with _lock:
+        _index = index
+        _stale = False
+
+
+def rebuild_player_index():
+    global _index, _stale, _rebuilding
+    with _lock:
+        _stale = False
+    try:
+        index = load_player_index()
+        with _lock:
+            _index = index
+        return index
+    finally:
+        with _lock:
+            _rebuilding = False
+
+
+def _rebuild_in_thread():
+    from django.db import connection
+    try:
+        rebuild_player_index()
+    except Exception as e:
+        print(f"No se pudo reconstruir el índice de jugadores: {e}")
+    finally:
+        connection.close()
+
+
+def get_player_index():
+    """Devuelve el índice del proceso; lo construye la primera vez y lo renueva si está desactualizado."""
+    global _rebuilding
+    index = _index
+    if index is None:
+        return rebuild_player_index()
+    if _stale or time.time() - index.built_at >= PLAYER_INDEX_TTL:
+        with _lock:
+            if _rebuilding:
+                return index
+            _rebuilding = True
+        if PLAYER_INDEX_BACKGROUND_REBUILD:
+            threading.Thread(target=_rebuild_in_thread, name='player-index', daemon=True).start()
+        else:
+            return rebuild_player_index()
+    return index
+
+
+def connect_signals():
+    from django.db.models.signals import post_delete, post_save
+    from Consultas.models import Player
+
+    post_save.connect(mark_player_index_stale, sender=Player, dispatch_uid='player_index_post_save')
+    post_delete.connect(mark_player_index_stale, sender=Player, dispatch_uid='player_index_post_delete')
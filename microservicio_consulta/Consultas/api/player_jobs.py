@@ -0,0 +1,335 @@
+"""
+Trabajos en segundo plano para crear/actualizar los jugadores de un torneo.
+
+get-event-info con create_players=1 ya no descarga los participantes ni hace
+los upserts dentro de la petición HTTP: registra un PlayerSyncJob con el ID
+del torneo y lo despacha a un worker, que pagina los participantes. El progreso queda en la tabla del trabajo (compartida por todos los
+procesos de gunicorn) y se consulta en player-sync-status/?job_id=...
+Las subidas de upload_exceljugadores usan el mismo mecanismo: cada bloque del
+archivo se despacha como un trabajo 'upload_chunk' en cuanto se lee (el worker
+consulta start.gg en lotes concurrentes y hace un único upsert por bloque) y el
+trabajo 'upload' del archivo agrega el progreso de todos.
+
+Modo de ejecución (PLAYER_JOBS_BACKEND):
+- 'thread' (por defecto): pool de hilos del propio proceso (PLAYER_JOBS_WORKERS).
+- 'celery': tarea Celery sobre el Redis del docker-compose (CELERY_BROKER_URL).
+  Worker: DJANGO_SETTINGS_MODULE=Smash_Proyect.settings celery -A Consultas.api.player_jobs.celery worker
+  Si Celery no está instalado se usa el pool de hilos.
+- 'inline': se ejecuta en la misma petición (depuración y tests).
+"""
+import os
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.http import JsonResponse
+
+PLAYER_JOBS_BACKEND = os.environ.get('PLAYER_JOBS_BACKEND', 'thread').lower()
+PLAYER_JOBS_WORKERS = int(os.environ.get('PLAYER_JOBS_WORKERS', 2))
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+# cada cuántos jugadores se guarda el progreso en la tabla del trabajo
+PROGRESS_EVERY = 10
+
+# Celery es opcional: sin él sólo están disponibles los modos 'thread' e 'inline'
+try:
+    from celery import Celery
+    celery = Celery('consultas', broker=CELERY_BROKER_URL)
+except Exception:
+    celery = None
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PLAYER_JOBS_WORKERS, thread_name_prefix='player-sync')
+    return _executor
+
+
+def _job_dict(job):
+    if job.kind == 'upload':
+        return _upload_job_dict(job)
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "tournament_id": job.tournament_id,
+        "status": job.status,
+        "total": job.total,
+        "processed": job.processed,
+        "created": job.created,
+        "updated": job.updated,
+        "skipped": job.skipped,
+        "errors": job.errors,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def start_player_sync_job(tournament_id, attendees=None):
+    """
+    Registra el trabajo y lo despacha según PLAYER_JOBS_BACKEND. Devuelve el dict de estado.
+    Sin `attendees` el worker descarga los participantes del torneo (total se conoce entonces).
+    """
+    from Consultas.models import PlayerSyncJob
+
+    job = PlayerSyncJob.objects.create(
+        id=uuid.uuid4().hex,
+        tournament_id=str(tournament_id),
+        total=len(attendees or []),
+        attendees=attendees or [],
+    )
+    return _dispatch(job)
+
+
+def _upload_job_dict(job):
+    """Estado del trabajo 'upload': suma de sus bloques más lo propio (errores de lectura)."""
+    from Consultas.models import PlayerSyncJob
+
+    chunks = list(PlayerSyncJob.objects.filter(parent_id=job.id).defer('attendees').order_by('created_at'))
+    status = job.status
+    finished_at = job.finished_at
+    if chunks and job.status != 'queued':
+        if any(c.status in ('queued', 'running') for c in chunks):
+            status = 'running'
+        else:
+            status = 'failed' if job.status == 'failed' or any(c.status == 'failed' for c in chunks) else 'done'
+            finished_at = max(c.finished_at for c in chunks if c.finished_at) if any(c.finished_at for c in chunks) else None
+    errors = list(job.errors)
+    for c in chunks:
+        errors += c.errors
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "tournament_id": job.tournament_id,
+        "status": status,
+        "total": job.total + sum(c.total for c in chunks),
+        "processed": job.processed + sum(c.processed for c in chunks),
+        "created": job.created + sum(c.created for c in chunks),
+        "updated": job.updated + sum(c.updated for c in chunks),
+        "skipped": job.skipped + sum(c.skipped for c in chunks),
+        "chunks": len(chunks),
+        "errors": errors,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": finished_at.isoformat() if finished_at else None,
+    }
+
+
+def start_player_upload_job(name, chunks):
+    """
+    Registra la importación de un archivo de jugadores y despacha un trabajo
+    'upload_chunk' por cada bloque (registros, inválidos) de `chunks` en cuanto
+    se lee (ver upload_ingest.prepare_players): el archivo no se guarda entero
+    y las primeras filas se escriben mientras se lee el resto. Un error de
+    lectura a mitad queda en los errores del trabajo; los bloques ya
+    despachados siguen su curso. Devuelve el estado agregado del archivo.
+    """
+    from Consultas.models import PlayerSyncJob
+
+    job = PlayerSyncJob.objects.create(
+        id=uuid.uuid4().hex,
+        kind='upload',
+        tournament_id=f"upload:{name}"[:100],
+    )
+    dispatched = 0
+    try:
+        for records, invalid in chunks:
+            chunk = PlayerSyncJob.objects.create(
+                id=uuid.uuid4().hex,
+                kind='upload_chunk',
+                parent_id=job.id,
+                tournament_id=job.tournament_id,
+                total=len(records),
+                attendees=records,
+                errors=list(invalid),
+            )
+            _dispatch(chunk)
+            dispatched += 1
+        job.status = 'running' if dispatched else 'done'
+    except Exception as e:
+        print(f"Error leyendo el archivo de jugadores {name}: {e}")
+        job.errors.append(f"Error leyendo el archivo: {e}")
+        job.status = 'failed'
+    job.save(update_fields=['status', 'errors'])
+    return _job_dict(job)
+
+
+def _dispatch(job):
+    if PLAYER_JOBS_BACKEND == 'inline':
+        run_player_sync_job(job.id)
+        job.refresh_from_db()
+    elif PLAYER_JOBS_BACKEND == 'celery' and celery is not None:
+        run_player_sync_job_task.delay(job.id)
+    else:
+        _get_executor().submit(_run_in_thread, job.id)
+    return _job_dict(job)
+
+
+def _run_in_thread(job_id):
+    from django.db import connection
+    try:
+        run_player_sync_job(job_id)
+    finally:
+        # cada hilo del pool abre su propia conexión: cerrarla al terminar
+        connection.close()
+
+
+def run_player_sync_job(job_id):
+    """
+    Procesa los asistentes del trabajo (los descarga primero si el trabajo sólo trae el
+    torneo): detalles de start.gg en lote y upsert uno a uno.
+    """
+    from django.utils import timezone
+    from Consultas.models import PlayerSyncJob
+
+    job = PlayerSyncJob.objects.get(pk=job_id)
+    job.status = 'running'
+    job.save(update_fields=['status'])
+    try:
+        if job.kind in ('upload', 'upload_chunk'):
+            # 'upload' con filas: trabajos creados antes de procesar por bloques
+            _process_upload_job(job)
+        else:
+            _process_job(job)
+        job.status = 'done'
+    except Exception as e:
+        traceback.print_exc()
+        job.errors.append(f"Job failed: {e}")
+        job.status = 'failed'
+    job.finished_at = timezone.now()
+    job.save()
+
+
+def _save_progress(job):
+    job.save(update_fields=['processed', 'created', 'updated', 'skipped', 'errors'])
+
+
+def _load_attendees(job):
+    """Pagina los participantes del torneo del trabajo (get_tournament_details) y los guarda en él."""
+    from .getTournamentDetails import get_tournament_details
+
+    result = get_tournament_details(job.tournament_id)
+    if not isinstance(result, dict) or result.get('success') is not True:
+        error = result.get('error', 'Unknown error') if isinstance(result, dict) else 'Unknown error'
+        raise RuntimeError(f"Unable to fetch participants: {error}")
+    details = result['details']
+    job.attendees = details.get('attendees', []) or []
+    job.total = len(job.attendees)
+    for failed in details.get('failed_pages') or []:
+        job.errors.append({"page": failed.get('page'), "error": failed.get('error')})
+    job.save(update_fields=['attendees', 'total', 'errors'])
+
+
+def _process_job(job):
+    if not job.attendees:
+        _load_attendees(job)
+    try:
+        from .getPlayerDetails import get_player_details, get_players_details_bulk, _update_or_create_player, LocalPlayerModel
+    except Exception:
+        job.errors.append("Player creation utilities not available on server")
+        job.skipped = job.total
+        job.processed = job.total
+        return
+
+    target_model = LocalPlayerModel
+    if target_model is None:
+        try:
+            from Consultas.models import Player as target_model
+        except Exception:
+            target_model = None
+
+    # Verificar que la tabla del modelo exista antes de iterar (evita "no such table")
+    if target_model is not None:
+        try:
+            from django.db import connection
+            if target_model._meta.db_table not in connection.introspection.table_names():
+                job.errors.append(f"Player table not found in DB: '{target_model._meta.db_table}'. Run migrations.")
+                target_model = None
+        except Exception as e:
+            job.errors.append(f"Unable to inspect DB tables: {e}")
+            target_model = None
+
+    # pedir los detalles de todos los asistentes en consultas agrupadas
+    details_by_id = {}
+    try:
+        details_by_id = get_players_details_bulk([int(a['player_id']) for a in job.attendees if a.get('player_id')])
+    except Exception as e:
+        job.errors.append(f"Bulk player fetch failed: {e}")
+
+    for a in job.attendees:
+        p_id = a.get('player_id')
+        try:
+            if not p_id:
+                job.skipped += 1
+                continue
+            p_details = details_by_id.get(int(p_id)) or get_player_details(int(p_id))
+            if isinstance(p_details, dict) and p_details.get('error'):
+                job.errors.append({"player_id": p_id, "error": p_details.get('error')})
+                continue
+            if target_model is None:
+                # no hay modelo para persistir
+                job.skipped += 1
+                continue
+            created, obj = _update_or_create_player(target_model, p_details)
+            if created:
+                job.created += 1
+            else:
+                job.updated += 1
+        except Exception as e:
+            job.errors.append({"player_id": p_id, "error": str(e)})
+        finally:
+            job.processed += 1
+            if job.processed % PROGRESS_EVERY == 0:
+                _save_progress(job)
+    _save_progress(job)
+
+
+def _process_upload_job(job):
+    from Consultas.upload_ingest import import_players
+
+    def progress(done, total):
+        # `total` son los IDs únicos consultados; el progreso se expresa en filas del trabajo
+        job.processed = min(job.total, int(job.total * done / total)) if total else job.total
+        _save_progress(job)
+
+    summary = import_players(job.attendees, progress=progress)
+    job.processed = job.total
+    job.created = summary['inserted']
+    job.updated = summary['updated']
+    job.skipped = summary['duplicates'] + summary['invalid']
+    job.errors += summary['errors']
+    _save_progress(job)
+
+
+if celery is not None:
+    @celery.task(name='consultas.run_player_sync_job')
+    def run_player_sync_job_task(job_id):
+        import django
+        from django.apps import apps
+        if not apps.ready:
+            os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Smash_Proyect.settings')
+            django.setup()
+        from django.db import connection
+        try:
+            run_player_sync_job(job_id)
+        finally:
+            connection.close()
+
+
+def player_sync_status_view(request):
+    """GET ?job_id=... -> estado y contadores de progreso del trabajo."""
+    job_id = request.GET.get('job_id') or request.POST.get('job_id')
+    if not job_id:
+        return JsonResponse({"success": False, "error": "Missing parameter: job_id"}, status=400)
+    from Consultas.models import PlayerSyncJob
+    try:
+        job = PlayerSyncJob.objects.filter(pk=job_id).first()
+    except Exception as e:
+        return JsonResponse({"success": False, "error": "Unable to read job", "details": str(e)}, status=500)
+    if job is None:
+        return JsonResponse({"success": False, "error": "Job not found"}, status=404)
+    return JsonResponse(dict(_job_dict(job), success=True), status=200)
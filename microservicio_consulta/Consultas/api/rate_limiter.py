@@ -0,0 +1,158 @@
+"""
+Limitador de peticiones (token bucket) para la API de start.gg.
+
+start.gg permite STARTGG_RATE_LIMIT peticiones por ventana de STARTGG_RATE_WINDOW
+segundos por token. Todas las llamadas de startgg_client pasan por acquire(),
+de forma que los hilos de un worker y los distintos workers de Django/gunicorn
+comparten un único presupuesto:
+
+- El estado del bucket vive en un archivo SQLite local (STARTGG_RATE_LIMIT_DB) y
+  se actualiza dentro de BEGIN IMMEDIATE, que serializa a todos los procesos.
+- Si el archivo no se puede usar se cae a un bucket en memoria (sólo hilos).
+
+El bucket admite ráfagas de hasta STARTGG_RATE_BURST peticiones y se rellena a
+(limit - burst) / window tokens por segundo, así que en cualquier ventana de
+`window` segundos nunca salen más de `limit` peticiones.
+Cuando start.gg responde 429, penalize() bloquea el bucket para todos.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+STARTGG_RATE_LIMIT = int(os.environ.get('STARTGG_RATE_LIMIT', 80))
+STARTGG_RATE_WINDOW = float(os.environ.get('STARTGG_RATE_WINDOW', 60))
+STARTGG_RATE_BURST = int(os.environ.get('STARTGG_RATE_BURST', 8))
+STARTGG_RATE_LIMIT_DB = os.environ.get('STARTGG_RATE_LIMIT_DB') or os.path.join(tempfile.gettempdir(), 'startgg_rate_limit.sqlite3')
+
+
+class TokenBucket:
+    """Token bucket en memoria, compartido entre hilos del proceso."""
+
+    def __init__(self, limit=STARTGG_RATE_LIMIT, window=STARTGG_RATE_WINDOW, burst=STARTGG_RATE_BURST,
+                 clock=time.time, sleep=time.sleep):
+        if limit < 1 or window <= 0:
+            raise ValueError("limit debe ser >= 1 y window > 0")
+        self.capacity = float(max(1, min(burst, limit)))
+        # si burst == limit no queda presupuesto para rellenar: mínimo 1 token por ventana
+        self.rate = max(limit - self.capacity, 1) / window
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._blocked_until = 0.0
+
+    def _take(self, tokens, updated, blocked_until, now):
+        """
+        Aplica el relleno y trata de consumir un token.
+        Devuelve (espera_en_segundos, tokens, updated); espera 0 = concedido.
+        """
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        if blocked_until > now:
+            return blocked_until - now, tokens, now
+        if tokens >= 1:
+            return 0.0, tokens - 1, now
+        return (1 - tokens) / self.rate, tokens, now
+
+    def try_acquire(self):
+        """Intenta consumir un token sin bloquear. Devuelve los segundos a esperar (0 = concedido)."""
+        with self._lock:
+            wait, self._tokens, self._updated = self._take(self._tokens, self._updated, self._blocked_until, self.clock())
+            return wait
+
+    def acquire(self):
+        """Bloquea hasta obtener un token. Devuelve el tiempo total esperado (segundos)."""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return waited
+            self.sleep(wait)
+            waited += wait
+
+    def penalize(self, seconds):
+        """Bloquea el bucket `seconds` segundos y lo vacía (p. ej. tras un HTTP 429)."""
+        with self._lock:
+            now = self.clock()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = now
+
+
+class SqliteTokenBucket(TokenBucket):
+    """Token bucket cuyo estado se guarda en SQLite para compartirlo entre procesos."""
+
+    def __init__(self, path=STARTGG_RATE_LIMIT_DB, name='startgg', **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_bucket ('
+                'name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, blocked_until REAL NOT NULL)'
+            )
+            conn.execute(
+                'INSERT OR IGNORE INTO rate_bucket (name, tokens, updated, blocked_until) VALUES (?, ?, ?, 0)',
+                (self.name, self.capacity, self.clock())
+            )
+
+    def _connection(self):
+        # sqlite3.Connection no se comparte entre hilos: una por hilo
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def try_acquire(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            tokens, updated, blocked_until = conn.execute(
+                'SELECT tokens, updated, blocked_until FROM rate_bucket WHERE name = ?', (self.name,)
+            ).fetchone()
+            wait, tokens, updated = self._take(tokens, updated, blocked_until, self.clock())
+            conn.execute('UPDATE rate_bucket SET tokens = ?, updated = ? WHERE name = ?', (tokens, updated, self.name))
+            conn.execute('COMMIT')
+            return wait
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def penalize(self, seconds):
+        conn = self._connection()
+        now = self.clock()
+        with conn:
+            conn.execute(
+                'UPDATE rate_bucket SET tokens = 0, updated = ?, blocked_until = MAX(blocked_until, ?) WHERE name = ?',
+                (now, now + seconds, self.name)
+            )
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Devuelve el limitador compartido del proceso (SQLite si es posible, si no en memoria)."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                try:
+                    _limiter = SqliteTokenBucket()
+                except Exception as e:
+                    print(f"Rate limiter SQLite no disponible ({e}); usando bucket en memoria")
+                    _limiter = TokenBucket()
+    return _limiter
+
+
+def set_rate_limiter(limiter):
+    """Sustituye el limitador compartido (tests o configuración explícita)."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
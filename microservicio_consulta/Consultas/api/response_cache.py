@@ -0,0 +1,194 @@
+"""
+Caché persistente (SQLite) de respuestas GraphQL de start.gg.
+
+La clave es un hash de la consulta y sus variables. Cada entrada guarda su
+propio vencimiento: quien llama elige el TTL según el tipo de consulta (ver las
+funciones ttl_for_*), largo para torneos/eventos/sets terminados y corto para
+los que siguen en curso. El tamaño está acotado a STARTGG_CACHE_MAX_ENTRIES con
+expulsión LRU (por último acceso). Se llevan contadores de aciertos y fallos.
+Las entradas vencidas se conservan STARTGG_CACHE_STALE_SECONDS más para que
+startgg_client pueda servirlas (get_stale) mientras el circuito de start.gg
+está abierto.
+Si la base de la caché falla (bloqueada, sin permisos, disco lleno) la caché
+se comporta como un fallo: get/get_stale devuelven None y set no guarda nada.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+STARTGG_CACHE_ENABLED = str(os.environ.get('STARTGG_CACHE_ENABLED', '1')).lower() in ['1', 'true', 'yes']
+STARTGG_CACHE_DB = os.environ.get('STARTGG_CACHE_DB') or os.path.join(tempfile.gettempdir(), 'startgg_cache.sqlite3')
+STARTGG_CACHE_MAX_ENTRIES = int(os.environ.get('STARTGG_CACHE_MAX_ENTRIES', 5000))
+# TTLs en segundos
+STARTGG_CACHE_TTL_COMPLETED = int(os.environ.get('STARTGG_CACHE_TTL_COMPLETED', 30 * 24 * 3600))
+STARTGG_CACHE_TTL_LIVE = int(os.environ.get('STARTGG_CACHE_TTL_LIVE', 60))
+STARTGG_CACHE_TTL_PLAYER = int(os.environ.get('STARTGG_CACHE_TTL_PLAYER', 6 * 3600))
+# margen tras endAt antes de considerar un torneo cerrado (resultados reportados tarde)
+COMPLETED_GRACE_SECONDS = 24 * 3600
+# cuánto tiempo tras vencer se puede seguir sirviendo una entrada si start.gg no responde
+STARTGG_CACHE_STALE_SECONDS = int(os.environ.get('STARTGG_CACHE_STALE_SECONDS', 24 * 3600))
+
+
+class ResponseCache:
+    def __init__(self, path=STARTGG_CACHE_DB, max_entries=STARTGG_CACHE_MAX_ENTRIES, clock=time.time,
+                 stale_seconds=STARTGG_CACHE_STALE_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS response_cache ('
+            'key TEXT PRIMARY KEY, body TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS response_cache_last_access ON response_cache (last_access)')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(query, variables=None):
+        raw = json.dumps({'query': ' '.join(query.split()), 'variables': variables or {}}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _count(self, hit):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """Devuelve el JSON guardado o None si no existe, venció o la caché no responde."""
+        now = self.clock()
+        try:
+            conn = self._connection()
+            row = conn.execute('SELECT body, expires_at FROM response_cache WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None and row[1] + self.stale_seconds <= now:
+                    conn.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+                self._count(False)
+                return None
+            conn.execute('UPDATE response_cache SET last_access = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            print(f"Caché de start.gg no disponible al leer: {e}")
+            self._count(False)
+            return None
+        self._count(True)
+        return json.loads(row[0])
+
+    def get_stale(self, key):
+        """Devuelve el JSON aunque haya vencido (dentro de stale_seconds), o None. No cuenta como acierto."""
+        try:
+            row = self._connection().execute(
+                'SELECT body, expires_at FROM response_cache WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Caché de start.gg no disponible al leer: {e}")
+            return None
+        if row is None or row[1] + self.stale_seconds <= self.clock():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, data, ttl):
+        if not ttl or ttl <= 0:
+            return
+        now = self.clock()
+        try:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO response_cache (key, body, expires_at, last_access) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(data), now + ttl, now)
+            )
+            self._evict(conn)
+        except sqlite3.Error as e:
+            print(f"Caché de start.gg no disponible al guardar: {e}")
+
+    def _evict(self, conn):
+        (count,) = conn.execute('SELECT COUNT(*) FROM response_cache').fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                'DELETE FROM response_cache WHERE key IN '
+                '(SELECT key FROM response_cache ORDER BY last_access ASC LIMIT ?)',
+                (excess,)
+            )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM response_cache')
+
+    def stats(self):
+        (entries,) = self._connection().execute('SELECT COUNT(*) FROM response_cache').fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'max_entries': self.max_entries}
+
+
+def ttl_for_end_timestamp(end_at, now=None):
+    """TTL largo si end_at (epoch, s o ms) quedó atrás hace más del margen; corto si no."""
+    if not end_at:
+        return STARTGG_CACHE_TTL_LIVE
+    try:
+        end_at = int(end_at)
+    except (TypeError, ValueError):
+        return STARTGG_CACHE_TTL_LIVE
+    if end_at > 10**12:
+        end_at = end_at / 1000
+    now = now or time.time()
+    return STARTGG_CACHE_TTL_COMPLETED if end_at + COMPLETED_GRACE_SECONDS < now else STARTGG_CACHE_TTL_LIVE
+
+
+def ttl_for_tournament(data):
+    tournament = ((data or {}).get('data') or {}).get('tournament') or {}
+    return ttl_for_end_timestamp(tournament.get('endAt'))
+
+
+def ttl_for_event(data):
+    event = ((data or {}).get('data') or {}).get('event') or {}
+    if event.get('state') == 'COMPLETED':
+        return STARTGG_CACHE_TTL_COMPLETED
+    return STARTGG_CACHE_TTL_LIVE
+
+
+def ttl_for_set(data):
+    set_data = ((data or {}).get('data') or {}).get('set') or {}
+    return STARTGG_CACHE_TTL_COMPLETED if set_data.get('completedAt') else STARTGG_CACHE_TTL_LIVE
+
+
+def ttl_for_player(data):
+    return STARTGG_CACHE_TTL_PLAYER
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Devuelve la caché compartida del proceso, o None si está desactivada o no se pudo abrir."""
+    global _cache
+    if _cache is None and STARTGG_CACHE_ENABLED:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = ResponseCache()
+                except Exception as e:
+                    print(f"Caché de start.gg no disponible: {e}")
+                    return None
+    return _cache
+
+
+def set_response_cache(cache):
+    """Sustituye la caché compartida (tests o configuración explícita)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
@@ -1,24 +1,126 @@
 import os
 import requests
-from dotenv import load_dotenv
-import time
+from concurrent.futures import ThreadPoolExecutor
 
-# Cargar la clave de la API desde el archivo .env
-load_dotenv()
+from . import startgg_client
 
-startgg_url = "https://api.start.gg/gql/alpha"
-startgg_key = "3e417c2b55e54203247b7501c15e70ca"
+# entrants resueltos por cada consulta agrupada (alias e0..eN); cada alias cuesta
+# unos pocos objetos en el límite de complejidad de start.gg (1000 por consulta)
+ENTRANT_BATCH_SIZE = 50
 
-if not startgg_key:
-    raise ValueError('La clave de la API de Start.gg no está configurada. Verifica tu archivo .env')
+SETS_PER_PAGE = 20
+# páginas de sets que se piden a la vez; 1 = modo secuencial
+SETS_PAGE_CONCURRENCY = int(os.environ.get('STARTGG_SETS_CONCURRENCY', 4))
 
-def delay(seconds):
-    time.sleep(seconds)
+EVENT_SETS_QUERY = """
+query EventSets($eventId: ID!, $page: Int!, $perPage: Int!) {
+    event(id: $eventId) {
+        sets(page: $page, perPage: $perPage) {
+            pageInfo {
+                total
+                totalPages
+            }
+            nodes {
+                id
+                displayScore
+                phaseGroup {
+                    phase {
+                        name
+                    }
+                    displayIdentifier
+                }
+                event {
+                    name
+                    tournament {
+                        name
+                    }
+                }
+                slots {
+                    entrant {
+                        id
+                    }
+                }
+                games {
+                    selections {
+                        entrant {
+                            id
+                        }
+                        character {
+                            id
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+"""
+
+def entrant_player_map(participants):
+    """Participantes (con player y entrants) -> {entrant_id (texto): player_id}."""
+    entrant_to_player = {}
+    for p in participants or []:
+        player_id = p.get("player", {}).get("id") if p.get("player") else None
+        # los slots de los sets referencian entrant.id, no participant.id
+        for entrant in p.get("entrants") or []:
+            if entrant and entrant.get("id") is not None:
+                entrant_to_player[str(entrant["id"])] = player_id
+    return entrant_to_player
+
+def set_from_node(node, entrant_to_player_id):
+    """Nodo de set de EVENT_SETS_QUERY -> dict del set (formato de get_sets_by_event)."""
+    display_score = node.get('displayScore') or 'N/A'
+    player1, player2 = display_score.split(' - ') if ' - ' in display_score else (display_score, '')
+    player1_name, player1_score = player1.rsplit(' ', 1) if ' ' in player1 else (player1, '')
+    player2_name, player2_score = player2.rsplit(' ', 1) if ' ' in player2 else (player2, '')
+
+    player1_name = player1_name.split('|')[-1].strip()
+    player2_name = player2_name.split('|')[-1].strip()
+
+    player1_participant_id = str(node['slots'][0]['entrant']['id']) if node['slots'][0]['entrant'] else None
+    player2_participant_id = str(node['slots'][1]['entrant']['id']) if node['slots'][1]['entrant'] else None
+
+    player1_id = entrant_to_player_id.get(player1_participant_id) if player1_participant_id else None
+    player2_id = entrant_to_player_id.get(player2_participant_id) if player2_participant_id else None
+
+    phase_name = ""
+    phase_group = node.get('phaseGroup')
+    if phase_group:
+        display_identifier = phase_group.get('displayIdentifier')
+        if display_identifier:
+            phase_name = display_identifier
+        if phase_group.get('phase') and phase_group['phase'].get('name'):
+            phase_name = phase_group['phase']['name']
+    if not phase_name:
+        phase_name = "Desconocido"
+
+    player1_characters, player2_characters = [], []
+    if node['games']:
+        for game in node['games']:
+            for selection in game['selections']:
+                if str(selection['entrant']['id']) == player1_participant_id:
+                    player1_characters.append(selection['character']['id'])
+                elif str(selection['entrant']['id']) == player2_participant_id:
+                    player2_characters.append(selection['character']['id'])
+
+    return {
+        'id': node['id'],
+        'player1_id': player1_id,
+        'player2_id': player2_id,
+        'player1_name': player1_name,
+        'player1_score': player1_score,
+        'player2_name': player2_name,
+        'player2_score': player2_score,
+        'phase_name': phase_name,
+        'event_name': node['event']['name'],
+        'tournament_name': node['event']['tournament']['name'],
+        'player1_characters': player1_characters,
+        'player2_characters': player2_characters
+    }
 
 def get_entrant_to_player_id_by_tournament(tournament_id):
     entrant_to_player = {}
     page = 1
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {startgg_key}'}
     while True:
         query_participants = """
         query TournamentParticipants($id: ID!, $perPage: Int!, $page: Int!) {
@@ -31,6 +133,9 @@ def get_entrant_to_player_id_by_tournament(tournament_id):
                         player {
                             id
                         }
+                        entrants {
+                            id
+                        }
                     }
                 }
             }
@@ -38,29 +143,20 @@ def get_entrant_to_player_id_by_tournament(tournament_id):
         """
         variables_participants = {'id': tournament_id, 'perPage': 100, 'page': page}
         try:
-            resp = requests.post(
-                startgg_url,
-                headers=headers,
-                json={'query': query_participants, 'variables': variables_participants}
-            )
-            resp.raise_for_status()
+            d = startgg_client.execute(query_participants, variables_participants)
         except requests.exceptions.HTTPError as e:
-            print(f"Error API TournamentParticipants (page {page}):", resp.status_code, resp.text)
+            print(f"Error API TournamentParticipants (page {page}):", e.response.status_code, e.response.text)
             break
         except Exception as e:
             print(f"Request error TournamentParticipants (page {page}): {e}")
             break
 
-        d = resp.json()
         tournament = d.get('data', {}).get('tournament', {})
         participants = tournament.get('participants', {})
-        for p in participants.get('nodes', []):
-            player_id = p.get("player", {}).get("id") if p.get("player") else None
-            entrant_to_player[str(p.get("id"))] = player_id
+        entrant_to_player.update(entrant_player_map(participants.get('nodes', [])))
         if page >= participants.get('pageInfo', {}).get('totalPages', 0):
             break
         page += 1
-        delay(0.25)
     return entrant_to_player
 
 def get_player_id_from_entrant_id(entrant_id):
@@ -77,25 +173,57 @@ def get_player_id_from_entrant_id(entrant_id):
     }
     """
     variables = {"id": int(entrant_id)}
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {startgg_key}'}
     try:
-        response = requests.post(
-            startgg_url,
-            headers=headers,
-            json={'query': query, 'variables': variables}
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = startgg_client.execute(query, variables)
         entrant = data.get('data', {}).get('entrant', {})
         participants = entrant.get('participants', [])
         if participants and participants[0].get('player') and participants[0]['player'].get('id'):
             return participants[0]['player']['id']
     except requests.exceptions.HTTPError as e:
-        print(f"Error API EntrantQuery for entrant_id {entrant_id}:", response.status_code, response.text)
+        print(f"Error API EntrantQuery for entrant_id {entrant_id}:", e.response.status_code, e.response.text)
     except Exception as e:
         print(f"Error obteniendo player_id para entrant_id {entrant_id}: {e}")
     return None
 
+def get_player_ids_from_entrant_ids(entrant_ids, batch_size=ENTRANT_BATCH_SIZE):
+    """
+    Resuelve varios entrant_id -> player_id con una sola consulta GraphQL por
+    lote, usando alias (e0: entrant(id: $e0) ...). Devuelve dict {str(entrant_id): player_id}.
+    Los entrants que no se pudieron resolver quedan con valor None.
+    """
+    result = {}
+    ids = []
+    for entrant_id in entrant_ids:
+        key = str(entrant_id)
+        if key not in result:
+            result[key] = None
+            ids.append(key)
+
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        params = ", ".join(f"$e{i}: ID!" for i in range(len(chunk)))
+        fields = "\n".join(
+            f"e{i}: entrant(id: $e{i}) {{ id participants {{ player {{ id }} }} }}"
+            for i in range(len(chunk))
+        )
+        query = f"query EntrantsBatch({params}) {{\n{fields}\n}}"
+        variables = {f"e{i}": int(entrant_id) for i, entrant_id in enumerate(chunk)}
+        try:
+            data = startgg_client.execute(query, variables)
+        except requests.exceptions.HTTPError as e:
+            print(f"Error API EntrantsBatch ({len(chunk)} entrants):", e.response.status_code, e.response.text)
+            continue
+        except Exception as e:
+            print(f"Error obteniendo player_id para {len(chunk)} entrants: {e}")
+            continue
+        batch_data = data.get('data') or {}
+        for i, entrant_id in enumerate(chunk):
+            entrant = batch_data.get(f"e{i}") or {}
+            participants = entrant.get('participants') or []
+            if participants and participants[0].get('player') and participants[0]['player'].get('id'):
+                result[entrant_id] = participants[0]['player']['id']
+    return result
+
 def get_phase_name_from_phase_id(phase_id):
     query = """
     query PhaseName($phaseId: ID!) {
@@ -106,28 +234,98 @@ def get_phase_name_from_phase_id(phase_id):
     }
     """
     variables = {"phaseId": int(phase_id)}
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {startgg_key}'}
     try:
-        response = requests.post(
-            startgg_url,
-            headers=headers,
-            json={'query': query, 'variables': variables}
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = startgg_client.execute(query, variables)
         phase = data.get('data', {}).get('phase', {})
         return phase.get('name')
     except requests.exceptions.HTTPError as e:
-        print(f"Error API PhaseName for phase_id {phase_id}:", response.status_code, response.text)
+        print(f"Error API PhaseName for phase_id {phase_id}:", e.response.status_code, e.response.text)
     except Exception as e:
         print(f"Error obteniendo nombre de fase para phase_id {phase_id}: {e}")
         return None
 
-def get_sets_by_event(event_id):
-    sets = []
-    page_number = 1
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {startgg_key}'}
+def _fetch_event_sets_page(event_id, page_number):
+    """
+    Descarga una página de sets. Devuelve (nodes, pageInfo) o None si falla
+    (el error se registra aquí para que el llamador sólo tenga que cortar).
+    """
+    variables = {
+        'eventId': event_id,
+        'page': page_number,
+        'perPage': SETS_PER_PAGE
+    }
+    try:
+        data = startgg_client.execute(EVENT_SETS_QUERY, variables)
+
+        if 'errors' in data:
+            raise Exception(', '.join(error['message'] for error in data['errors']))
+
+        event = data.get('data', {}).get('event', {})
+        sets_data = event.get('sets', {})
+        return sets_data.get('nodes', []), sets_data.get('pageInfo') or {}
+    except requests.exceptions.HTTPError as e:
+        print(f"Error API EventSets (page {page_number}):", e.response.status_code, e.response.text)
+    except Exception as e:
+        print('Error fetching sets:', e)
+    return None
+
+def iter_event_sets_pages(event_id, concurrency=None):
+    """
+    Genera las listas de nodos de sets de un evento, página a página y en el
+    orden original. La primera página informa pageInfo.totalPages; con
+    concurrency > 1 el resto de páginas se programan todas de entrada y se
+    descargan en paralelo (hasta `concurrency` a la vez). Si una página falla
+    se detiene ahí, igual que el recorrido secuencial.
+    """
+    concurrency = concurrency or SETS_PAGE_CONCURRENCY
+    first = _fetch_event_sets_page(event_id, 1)
+    if first is None:
+        return
+    nodes, page_info = first
+    yield nodes
+
+    total_pages = page_info.get('totalPages')
+    if not total_pages:
+        # la API no informó el total: avanzar hasta encontrar una página incompleta
+        page_number = 1
+        while len(nodes) >= SETS_PER_PAGE:
+            page_number += 1
+            page = _fetch_event_sets_page(event_id, page_number)
+            if page is None:
+                return
+            nodes = page[0]
+            yield nodes
+        return
+
+    if concurrency <= 1:
+        for page_number in range(2, total_pages + 1):
+            page = _fetch_event_sets_page(event_id, page_number)
+            if page is None:
+                return
+            yield page[0]
+        return
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = [pool.submit(_fetch_event_sets_page, event_id, n) for n in range(2, total_pages + 1)]
+        for future in futures:
+            page = future.result()
+            if page is None:
+                return
+            yield page[0]
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
+def get_sets_by_event(event_id, concurrency=None):
+    return list(iter_sets_by_event(event_id, concurrency))
+
+def iter_sets_by_event(event_id, concurrency=None, prefetch_entrants=True):
+    """
+    Genera los sets del evento (mismo formato que get_sets_by_event) a medida que
+    llega cada página. Con prefetch_entrants=False no se precarga el mapa
+    entrant -> player de todo el torneo: cada página resuelve sus entrants con una
+    consulta agrupada, de modo que el primer set sale tras muy pocas peticiones.
+    """
     query_event = """
     query EventQuery($eventId: ID!) {
         event(id: $eventId) {
@@ -139,154 +337,38 @@ def get_sets_by_event(event_id):
     """
     variables_event = {'eventId': event_id}
     try:
-        response_event = requests.post(
-            startgg_url,
-            headers=headers,
-            json={'query': query_event, 'variables': variables_event}
-        )
-        response_event.raise_for_status()
-        data_event = response_event.json()
+        data_event = startgg_client.execute(query_event, variables_event)
         tournament = data_event.get('data', {}).get('event', {}).get('tournament', {})
         tournament_id = tournament.get('id')
     except requests.exceptions.HTTPError as e:
-        print(f"Error API EventQuery for event_id {event_id}:", response_event.status_code, response_event.text)
-        return sets
+        print(f"Error API EventQuery for event_id {event_id}:", e.response.status_code, e.response.text)
+        return
     except Exception as e:
         print(f"Error obteniendo torneo para event_id {event_id}: {e}")
-        return sets
-
-    try:
-        entrant_to_player_id = get_entrant_to_player_id_by_tournament(tournament_id)
-    except Exception as e:
-        entrant_to_player_id = {}
-
-    def process_nodes(nodes):
-        for node in nodes:
-            display_score = node.get('displayScore', 'N/A')
-            player1, player2 = display_score.split(' - ') if ' - ' in display_score else (display_score, '')
-            player1_name, player1_score = player1.rsplit(' ', 1) if ' ' in player1 else (player1, '')
-            player2_name, player2_score = player2.rsplit(' ', 1) if ' ' in player2 else (player2, '')
-
-            player1_name = player1_name.split('|')[-1].strip()
-            player2_name = player2_name.split('|')[-1].strip()
-
-            player1_participant_id = str(node['slots'][0]['entrant']['id']) if node['slots'][0]['entrant'] else None
-            player2_participant_id = str(node['slots'][1]['entrant']['id']) if node['slots'][1]['entrant'] else None
-
-            player1_id = get_player_id_from_entrant_id(player1_participant_id) if player1_participant_id else None
-            player2_id = get_player_id_from_entrant_id(player2_participant_id) if player2_participant_id else None
-
-            phase_name = ""
-            phase_group = node.get('phaseGroup')
-            if phase_group:
-                display_identifier = phase_group.get('displayIdentifier')
-                if display_identifier:
-                    phase_name = display_identifier
-                if phase_group.get('phase') and phase_group['phase'].get('name'):
-                    phase_name = phase_group['phase']['name']
-            if not phase_name:
-                phase_name = "Desconocido"
-
-            player1_characters, player2_characters = [], []
-            if node['games']:
-                for game in node['games']:
-                    for selection in game['selections']:
-                        if str(selection['entrant']['id']) == player1_participant_id:
-                            player1_characters.append(selection['character']['id'])
-                        elif str(selection['entrant']['id']) == player2_participant_id:
-                            player2_characters.append(selection['character']['id'])
-
-            set_data = {
-                'id': node['id'],
-                'player1_id': player1_id,
-                'player2_id': player2_id,
-                'player1_name': player1_name,
-                'player1_score': player1_score,
-                'player2_name': player2_name,
-                'player2_score': player2_score,
-                'phase_name': phase_name,
-                'event_name': node['event']['name'],
-                'tournament_name': node['event']['tournament']['name'],
-                'player1_characters': player1_characters,
-                'player2_characters': player2_characters
-            }
-            sets.append(set_data)
-
-    while True:
-        query = """
-        query EventSets($eventId: ID!, $page: Int!, $perPage: Int!) {
-            event(id: $eventId) {
-                sets(page: $page, perPage: $perPage) {
-                    nodes {
-                        id
-                        displayScore
-                        phaseGroup {
-                            phase {
-                                name
-                            }
-                            displayIdentifier
-                        }
-                        event {
-                            name
-                            tournament {
-                                name
-                            }
-                        }
-                        slots {
-                            entrant {
-                                id
-                            }
-                        }
-                        games {
-                            selections {
-                                entrant {
-                                    id
-                                }
-                                character {
-                                    id
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-        }
-        """
-
-        variables = {
-            'eventId': event_id,
-            'page': page_number,
-            'perPage': 20
-        }
+        return
 
+    entrant_to_player_id = {}
+    if prefetch_entrants:
         try:
-            response = requests.post(
-                startgg_url,
-                headers=headers,
-                json={'query': query, 'variables': variables}
-            )
-
-            response.raise_for_status()
-            data = response.json()
-
-            if 'errors' in data:
-                raise Exception(', '.join(error['message'] for error in data['errors']))
-
-            event = data.get('data', {}).get('event', {})
-            sets_data = event.get('sets', {})
-            nodes = sets_data.get('nodes', [])
-            process_nodes(nodes)
+            entrant_to_player_id = get_entrant_to_player_id_by_tournament(tournament_id)
+        except Exception as e:
+            entrant_to_player_id = {}
 
-            if len(nodes) < 20:
-                break
+    def resolve_missing_entrants(nodes):
+        # entrants de la página que no están en el mapa precargado -> una consulta agrupada
+        missing = []
+        for node in nodes:
+            for slot in node.get('slots') or []:
+                entrant = slot.get('entrant') if slot else None
+                if entrant and str(entrant['id']) not in entrant_to_player_id:
+                    missing.append(entrant['id'])
+        if missing:
+            entrant_to_player_id.update(get_player_ids_from_entrant_ids(missing))
 
-            page_number += 1
-            delay(1)
-        except requests.exceptions.HTTPError as e:
-            print(f"Error API EventSets (page {page_number}):", response.status_code, response.text)
-            break
-        except Exception as e:
-            print('Error fetching sets:', e)
-            break
+    def process_nodes(nodes):
+        resolve_missing_entrants(nodes)
+        for node in nodes:
+            yield set_from_node(node, entrant_to_player_id)
 
-    return sets
\ No newline at end of file
+    for nodes in iter_event_sets_pages(event_id, concurrency):
+        yield from process_nodes(nodes)
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""
+Agrupación de peticiones idénticas simultáneas (single-flight).
+
+Cuando varios hilos piden a la vez la misma consulta a start.gg (por ejemplo,
+muchos usuarios abriendo el mismo enlace de get-event-info/), sólo el primero
+hace la petición; los demás esperan y reciben una copia de su resultado (o la
+misma excepción). La clave es la de la caché de respuestas: consulta
+normalizada + variables.
+"""
+import copy
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Ejecuta fn() una sola vez por clave entre los hilos que llegan mientras está en curso."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # cada llamador recibe su propia copia (algunos modifican la respuesta)
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight():
+    return _single_flight
+
+
+def set_single_flight(single_flight):
+    """Sustituye el agrupador compartido (tests)."""
+    global _single_flight
+    _single_flight = single_flight or SingleFlight()
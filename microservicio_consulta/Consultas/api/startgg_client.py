@@ -0,0 +1,280 @@
+"""
+Cliente compartido para la API GraphQL de start.gg.
+
+Todos los módulos de Consultas/api (y las vistas que consultan start.gg) deben
+pasar por aquí: se reutiliza una única requests.Session con pool de conexiones
+(keep-alive), de modo que las llamadas consecutivas no repiten el handshake
+TCP+TLS, y se aplican siempre las mismas cabeceras, clave y timeouts.
+Cada petición consume un token del limitador compartido (rate_limiter) y las
+respuestas 429 se reintentan con espera. execute() puede servir respuestas
+desde la caché persistente (response_cache) si el llamador indica un TTL.
+
+Las consultas idénticas simultáneas comparten una sola petición (single_flight)
+y un circuit breaker (circuit_breaker) corta las llamadas mientras start.gg
+falla: execute() sirve entonces la copia vencida de la caché o lanza
+CircuitOpenError (subclase de RequestException) sin esperar al timeout.
+Cada llamada queda medida en upstream_metrics (vista /metrics y una línea
+JSON por llamada en la salida estándar).
+
+La URL base se puede cambiar (STARTGG_URL o set_base_url) para apuntar al
+servidor de reproducción local (startgg_replay). Con STARTGG_RECORD_DIR cada
+respuesta se guarda como fixture en ese directorio.
+"""
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from .circuit_breaker import CircuitOpenError, get_circuit_breaker, is_failure_status
+from .rate_limiter import get_rate_limiter
+from .response_cache import ResponseCache, get_response_cache
+from .single_flight import get_single_flight
+from .upstream_metrics import CallRecord
+
+# Cargar la clave de la API desde el archivo .env
+load_dotenv()
+
+STARTGG_URL = os.environ.get('STARTGG_URL') or "https://api.start.gg/gql/alpha"
+# si se define, cada petición/respuesta se guarda como fixture (ver startgg_replay)
+STARTGG_RECORD_DIR = os.environ.get('STARTGG_RECORD_DIR')
+# clave de desarrollo por defecto; en producción definir STARTGG_KEY en .env o entorno
+STARTGG_KEY = os.environ.get('STARTGG_KEY') or "3e417c2b55e54203247b7501c15e70ca"
+
+# (connect, read) en segundos
+STARTGG_CONNECT_TIMEOUT = float(os.environ.get('STARTGG_CONNECT_TIMEOUT', 5))
+STARTGG_READ_TIMEOUT = float(os.environ.get('STARTGG_READ_TIMEOUT', 30))
+# conexiones abiertas que se mantienen en el pool (una por hilo concurrente)
+STARTGG_POOL_SIZE = int(os.environ.get('STARTGG_POOL_SIZE', 10))
+# reintentos tras HTTP 429 (Too Many Requests)
+STARTGG_MAX_RETRIES = int(os.environ.get('STARTGG_MAX_RETRIES', 3))
+STARTGG_BACKOFF_SECONDS = float(os.environ.get('STARTGG_BACKOFF_SECONDS', 2))
+
+if not STARTGG_KEY:
+    raise ValueError('La clave de la API de Start.gg no está configurada. Define STARTGG_KEY en .env o en las variables de entorno')
+
+_session = None
+_session_lock = threading.Lock()
+_base_url = STARTGG_URL
+_recorder = None
+
+
+def default_headers():
+    return {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json',
+        'Authorization': f'Bearer {STARTGG_KEY}',
+        'User-Agent': 'consultas-api/1.0',
+    }
+
+
+def get_session():
+    """
+    Devuelve la sesión HTTP compartida (creada de forma perezosa y thread-safe).
+    requests.Session es segura para uso concurrente de POSTs independientes; el
+    HTTPAdapter mantiene hasta STARTGG_POOL_SIZE conexiones vivas hacia start.gg.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=STARTGG_POOL_SIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(default_headers())
+                _session = session
+    return _session
+
+
+def reset_session():
+    """Cierra la sesión compartida (útil en tests o tras un fork de proceso)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_base_url():
+    return _base_url
+
+
+def set_base_url(url=None):
+    """Cambia el endpoint GraphQL de todas las llamadas (None = STARTGG_URL)."""
+    global _base_url
+    _base_url = url or STARTGG_URL
+
+
+def get_recorder():
+    """Grabador de fixtures activo (creado desde STARTGG_RECORD_DIR) o None."""
+    global _recorder
+    if _recorder is None and STARTGG_RECORD_DIR:
+        from .startgg_replay import FixtureRecorder
+        _recorder = FixtureRecorder(STARTGG_RECORD_DIR)
+    return _recorder
+
+
+def set_recorder(recorder):
+    """Activa (o con None desactiva) la grabación de fixtures."""
+    global _recorder
+    _recorder = recorder
+
+
+def record_response(query, variables, status_code, body_text):
+    recorder = get_recorder()
+    if recorder is not None:
+        try:
+            recorder.record(query, variables, status_code, body_text)
+        except Exception as e:
+            print(f"No se pudo grabar el fixture de start.gg: {e}")
+
+
+def _retry_after_seconds(response, attempt):
+    """Segundos a esperar tras un 429: cabecera Retry-After o backoff exponencial."""
+    retry_after = response.headers.get('Retry-After')
+    try:
+        if retry_after is not None:
+            return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    return STARTGG_BACKOFF_SECONDS * (2 ** attempt)
+
+
+def post(query, variables=None, timeout=None, record=None):
+    """
+    Envía una consulta GraphQL y devuelve el requests.Response sin procesar.
+    Espera turno en el limitador compartido antes de cada intento; ante un 429
+    bloquea el limitador (para todos los hilos/procesos) y reintenta hasta
+    STARTGG_MAX_RETRIES veces. Si se agotan, devuelve el último 429.
+    Propaga requests.exceptions.RequestException (conexión, timeout) y
+    CircuitOpenError si el circuito está abierto.
+
+    Cada intento se registra en upstream_metrics; `record` es el CallRecord de
+    execute() (sin él, post() registra y escribe su propia línea de log).
+    """
+    own_record = record is None
+    if own_record:
+        record = CallRecord(query)
+    payload = {'query': query, 'variables': variables or {}}
+    request_bytes = len(json.dumps(payload))
+    limiter = get_rate_limiter()
+    breaker = get_circuit_breaker()
+    attempt = 0
+    try:
+        while True:
+            if breaker is not None:
+                try:
+                    breaker.before_call()
+                except CircuitOpenError:
+                    record.mark_rejected()
+                    raise
+            try:
+                waited = limiter.acquire() or 0.0
+                started = time.monotonic()
+                try:
+                    response = get_session().post(
+                        get_base_url(),
+                        json=payload,
+                        timeout=timeout or (STARTGG_CONNECT_TIMEOUT, STARTGG_READ_TIMEOUT)
+                    )
+                except requests.exceptions.RequestException as e:
+                    record.attempt(None, time.monotonic() - started, request_bytes, 0, waited)
+                    record.error = type(e).__name__
+                    if breaker is not None:
+                        breaker.record_failure()
+                    raise
+                record.attempt(response.status_code, time.monotonic() - started, request_bytes,
+                               _body_size(response), waited)
+            except BaseException:
+                # sin resultado que registrar: no dejar ocupada la llamada de prueba
+                if breaker is not None:
+                    breaker.release_trial()
+                raise
+            if breaker is not None:
+                if is_failure_status(response.status_code):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if response.status_code != 429 or attempt >= STARTGG_MAX_RETRIES:
+                record_response(query, variables, response.status_code, response.text)
+                return response
+            wait = _retry_after_seconds(response, attempt)
+            print(f"start.gg devolvió 429; reintento {attempt + 1}/{STARTGG_MAX_RETRIES} en {wait:.1f}s")
+            limiter.penalize(wait)
+            attempt += 1
+    finally:
+        if own_record:
+            record.log()
+
+
+def _body_size(response):
+    try:
+        return len(response.content)
+    except TypeError:
+        return 0
+
+
+def execute(query, variables=None, timeout=None, cache_ttl=None):
+    """
+    Envía una consulta GraphQL y devuelve el JSON de la respuesta (dict).
+    Lanza requests.exceptions.HTTPError si el status no es 2xx; el response
+    original queda disponible en e.response para inspeccionar status y cuerpo.
+    Los errores GraphQL ('errors' en el cuerpo) se devuelven tal cual para que
+    cada llamador decida cómo tratarlos.
+
+    cache_ttl (segundos, o función que recibe el JSON y devuelve segundos)
+    activa la caché persistente: se consulta antes de ir a start.gg y se guarda
+    la respuesta si no trae 'errors'. Sin cache_ttl no se usa la caché.
+
+    Si otro hilo ya está pidiendo la misma consulta se espera su respuesta en
+    vez de repetirla. Con el circuito abierto se devuelve la copia vencida de
+    la caché (si hay cache_ttl y la entrada existe) o se lanza CircuitOpenError.
+    """
+    record = CallRecord(query)
+    try:
+        cache = get_response_cache() if cache_ttl is not None else None
+        key = ResponseCache.make_key(query, variables)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                record.cache_result('hit')
+                return cached
+            record.cache_result('miss')
+
+        fetched = []
+
+        def fetch():
+            fetched.append(True)
+            response = post(query, variables, timeout=timeout, record=record)
+            response.raise_for_status()
+            data = response.json()
+
+            if cache is not None and isinstance(data, dict) and 'errors' not in data:
+                ttl = cache_ttl(data) if callable(cache_ttl) else cache_ttl
+                cache.set(key, data, ttl)
+            return data
+
+        try:
+            return get_single_flight().do(key, fetch)
+        except CircuitOpenError:
+            stale = cache.get_stale(key) if cache is not None else None
+            if stale is None:
+                raise
+            breaker = get_circuit_breaker()
+            if breaker is not None:
+                breaker.record_stale()
+            record.cache_result('stale')
+            print("Circuito de start.gg abierto; se sirve la respuesta vencida de la caché")
+            return stale
+        finally:
+            if not fetched:
+                record.mark_coalesced()
+    except Exception as e:
+        record.error = record.error or type(e).__name__
+        raise
+    finally:
+        record.log()
@@ -0,0 +1,215 @@
+"""
+Grabación y reproducción de respuestas de start.gg para pruebas y benchmarks sin red.
+
+- FixtureRecorder guarda cada par petición/respuesta GraphQL como un archivo
+  JSON. startgg_client lo activa con STARTGG_RECORD_DIR (o set_recorder).
+- ReplayServer es un servidor HTTP local que responde con esos fixtures,
+  con latencia configurable por petición. Las consultas paginadas
+  (variables page/perPage) se pueden volver a paginar: se juntan los nodes de
+  todas las páginas grabadas y se sirve cualquier página con cualquier
+  tamaño, limitado a page_size si se indica, recalculando pageInfo.
+
+Uso típico:
+    STARTGG_RECORD_DIR=fixtures/ python manage.py ingest_tournaments 123   # grabar
+    python manage.py startgg_replay_server fixtures/ --latency 0.2         # reproducir
+    STARTGG_URL=http://127.0.0.1:8765/ python manage.py runserver
+"""
+import copy
+import glob
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .response_cache import ResponseCache
+from .upstream_metrics import operation_name
+
+PAGING_VARIABLES = ('page', 'perPage')
+
+
+def fixture_key(query, variables=None):
+    """Misma clave normalizada que la caché de respuestas."""
+    return ResponseCache.make_key(query, variables)
+
+
+class FixtureRecorder:
+    """Guarda cada respuesta como <dir>/<Operacion>-<hash>.json."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, query, variables, status_code, body_text):
+        key = fixture_key(query, variables)
+        try:
+            body = json.loads(body_text)
+        except ValueError:
+            body = body_text
+        fixture = {
+            'operation': operation_name(query),
+            'query': query,
+            'variables': variables or {},
+            'status': status_code,
+            'response': body,
+        }
+        path = os.path.join(self.directory, f"{fixture['operation']}-{key[:16]}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, ensure_ascii=False)
+        return path
+
+
+def _find_connection(node):
+    """Primer dict con lista 'nodes' dentro de la respuesta (la conexión paginada)."""
+    if isinstance(node, dict):
+        if isinstance(node.get('nodes'), list):
+            return node
+        for value in node.values():
+            found = _find_connection(value)
+            if found is not None:
+                return found
+    elif isinstance(node, list):
+        for value in node:
+            found = _find_connection(value)
+            if found is not None:
+                return found
+    return None
+
+
+class FixtureStore:
+    """Fixtures cargados en memoria, indexados por clave exacta y por consulta sin paginación."""
+
+    def __init__(self, directory):
+        self.exact = {}
+        # clave sin page/perPage -> {perPage: {page: respuesta}}
+        self.paged = {}
+        for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+            with open(path, encoding='utf-8') as f:
+                fixture = json.load(f)
+            self.add(fixture)
+
+    def add(self, fixture):
+        query, variables = fixture['query'], fixture.get('variables') or {}
+        self.exact[fixture_key(query, variables)] = fixture
+        if fixture.get('status') == 200 and all(v in variables for v in PAGING_VARIABLES):
+            base = {k: v for k, v in variables.items() if k not in PAGING_VARIABLES}
+            pages = self.paged.setdefault(fixture_key(query, base), {}).setdefault(variables['perPage'], {})
+            pages[variables['page']] = fixture['response']
+
+    def _all_nodes(self, base_key):
+        """Nodes de la serie de páginas grabada más completa (mismo perPage, páginas en orden)."""
+        best = None
+        for per_page, pages in self.paged.get(base_key, {}).items():
+            nodes = []
+            for page in sorted(pages):
+                conn = _find_connection(pages[page]) or {}
+                nodes.extend(conn.get('nodes') or [])
+            if best is None or len(nodes) > len(best[1]):
+                best = (pages[min(pages)], nodes)
+        return best
+
+    def lookup(self, query, variables, page_size=None):
+        """Devuelve (status, cuerpo) para la petición, o None si no hay fixture aplicable."""
+        variables = variables or {}
+        per_page = variables.get('perPage')
+        capped = page_size is not None and per_page is not None and per_page > page_size
+        fixture = self.exact.get(fixture_key(query, variables))
+        if fixture is not None and not capped:
+            return fixture.get('status', 200), fixture['response']
+        if not all(v in variables for v in PAGING_VARIABLES):
+            return None
+
+        base = {k: v for k, v in variables.items() if k not in PAGING_VARIABLES}
+        best = self._all_nodes(fixture_key(query, base))
+        if best is None:
+            return None
+        template, nodes = best
+        size = min(per_page, page_size) if page_size else per_page
+        start = (variables['page'] - 1) * size
+        body = copy.deepcopy(template)
+        conn = _find_connection(body)
+        conn['nodes'] = nodes[start:start + size]
+        page_info = conn.get('pageInfo')
+        if isinstance(page_info, dict):
+            if 'total' in page_info:
+                page_info['total'] = len(nodes)
+            if 'totalPages' in page_info:
+                page_info['totalPages'] = max(1, math.ceil(len(nodes) / size))
+        return 200, body
+
+
+class ReplayServer:
+    """
+    Servidor HTTP local que imita el endpoint GraphQL de start.gg con fixtures.
+    latency: segundos de espera por petición. page_size: tamaño máximo de página servido.
+    """
+
+    def __init__(self, fixtures_dir, latency=0.0, page_size=None, host='127.0.0.1', port=0):
+        self.store = FixtureStore(fixtures_dir)
+        self.latency = latency
+        self.page_size = page_size
+        self.requests = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    payload = {}
+                if server.latency:
+                    time.sleep(server.latency)
+                found = server.store.lookup(payload.get('query'), payload.get('variables'), server.page_size)
+                with server._lock:
+                    server.requests += 1
+                    if found is None:
+                        server.misses += 1
+                if found is None:
+                    status, body = 200, {'errors': [{'message': f"No hay fixture para {operation_name(payload.get('query'))}"}]}
+                else:
+                    status, body = found
+                raw = (body if isinstance(body, str) else json.dumps(body)).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, format, *args):
+                # sin una línea por petición en la consola
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='startgg-replay', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
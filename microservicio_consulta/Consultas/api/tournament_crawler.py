@@ -0,0 +1,261 @@
+"""
+Rastreo completo de los torneos de un país en start.gg hacia Colombia_Tournament.
+
+get_tournaments_by_country sólo devuelve la primera página; aquí el rango de
+fechas se parte en ventanas (CRAWL_WINDOW_DAYS) y de cada ventana se piden
+todas las páginas. Las ventanas de un lote se descargan a la vez con el motor
+asíncrono (AsyncStartggClient: mismo limitador de peticiones que el resto de la
+app) y, al terminar el lote, los torneos se guardan con un upsert y cada
+ventana completada se marca en TournamentCrawlWindow. Si el rastreo se
+interrumpe, la siguiente ejecución salta las ventanas ya marcadas.
+
+Las ventanas que llegan hasta hoy no se marcan: sus torneos aún pueden cambiar.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from .async_ingest import AsyncStartggClient, STARTGG_ASYNC_CONCURRENCY, _connection
+from .location_mapping import get_department_by_city, get_region_by_department
+
+# Super Smash Bros. Ultimate en start.gg; 0 = todos los juegos
+STARTGG_VIDEOGAME_ID = int(os.environ.get('STARTGG_VIDEOGAME_ID', 1386))
+CRAWL_WINDOW_DAYS = int(os.environ.get('STARTGG_CRAWL_WINDOW_DAYS', 30))
+# start.gg limita la complejidad de cada consulta: torneos por página con sus eventos
+CRAWL_PER_PAGE = 25
+
+TOURNAMENTS_PAGE_QUERY = """
+query CrawlTournaments($cCode: String!, $afterDate: Timestamp!, $beforeDate: Timestamp!, $videogameIds: [ID], $page: Int!, $perPage: Int!) {
+    tournaments(query: {
+        page: $page
+        perPage: $perPage
+        sortBy: "startAt asc"
+        filter: {
+            countryCode: $cCode
+            afterDate: $afterDate
+            beforeDate: $beforeDate
+            videogameIds: $videogameIds
+        }
+    }) {
+        pageInfo {
+            total
+            totalPages
+        }
+        nodes {
+            id
+            name
+            slug
+            city
+            countryCode
+            startAt
+            numAttendees
+            events(filter: {videogameId: $videogameIds}) {
+                slug
+                numEntrants
+                standings(query: {perPage: 1, page: 1}) {
+                    nodes {
+                        entrant {
+                            name
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+"""
+
+
+def date_windows(since, until, days=CRAWL_WINDOW_DAYS):
+    """Parte [since, until] (fechas inclusive) en ventanas consecutivas de `days` días."""
+    windows = []
+    start = since
+    while start <= until:
+        end = min(start + timedelta(days=days - 1), until)
+        windows.append((start, end))
+        start = end + timedelta(days=1)
+    return windows
+
+
+def _timestamp(day, end_of_day=False):
+    moment = datetime.combine(day, dt_time.max if end_of_day else dt_time.min, tzinfo=dt_timezone.utc)
+    return int(moment.timestamp())
+
+
+def _window_variables(country_code, start, end, videogame_id, per_page):
+    return {
+        'cCode': country_code,
+        'afterDate': _timestamp(start),
+        'beforeDate': _timestamp(end, end_of_day=True),
+        'videogameIds': [videogame_id] if videogame_id else None,
+        'perPage': per_page,
+    }
+
+
+async def fetch_window(client, country_code, start, end, videogame_id=STARTGG_VIDEOGAME_ID, per_page=CRAWL_PER_PAGE):
+    """Todos los torneos de la ventana: la primera página da totalPages y el resto se piden a la vez."""
+    variables = _window_variables(country_code, start, end, videogame_id, per_page)
+
+    async def page(number):
+        data = await client.execute(TOURNAMENTS_PAGE_QUERY, dict(variables, page=number))
+        return _connection(data, 'tournaments')
+
+    first = await page(1)
+    total_pages = (first.get('pageInfo') or {}).get('totalPages') or 1
+    rest = await asyncio.gather(*(page(n) for n in range(2, total_pages + 1)))
+    nodes = list(first.get('nodes') or [])
+    for conn in rest:
+        nodes += conn.get('nodes') or []
+    return nodes
+
+
+async def crawl_windows(country_code, windows, videogame_id=STARTGG_VIDEOGAME_ID, per_page=CRAWL_PER_PAGE,
+                        concurrency=None, transport=None, url=None):
+    """
+    Descarga varias ventanas a la vez. Devuelve {'windows': {(inicio, fin): nodes},
+    'errors': [...], 'requests': n}; una ventana que falla no detiene a las demás.
+    """
+    async with AsyncStartggClient(concurrency=concurrency, url=url, transport=transport) as client:
+        results = await asyncio.gather(
+            *(fetch_window(client, country_code, start, end, videogame_id, per_page) for start, end in windows),
+            return_exceptions=True
+        )
+        summary = {'windows': {}, 'errors': [], 'requests': client.requests}
+
+    for window, result in zip(windows, results):
+        if isinstance(result, Exception):
+            print(f"Error rastreando torneos {country_code} {window[0]}..{window[1]}: {result}")
+            summary['errors'].append({'window': [str(window[0]), str(window[1])], 'error': str(result)})
+        else:
+            summary['windows'][window] = result
+    return summary
+
+
+def run_crawl_windows(country_code, windows, **kwargs):
+    """Envoltorio síncrono de crawl_windows() (en otro hilo si ya hay un event loop en marcha)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(crawl_windows(country_code, windows, **kwargs))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(lambda: asyncio.run(crawl_windows(country_code, windows, **kwargs))).result()
+
+
+def tournament_row(node):
+    """
+    Nodo de start.gg -> campos de Tournament. El evento principal (más
+    participantes) da el ganador, los asistentes y la URL, como en las cargas por Excel.
+    """
+    events = [e for e in (node.get('events') or []) if e]
+    main_event = max(events, key=lambda e: e.get('numEntrants') or 0) if events else {}
+    standings = ((main_event.get('standings') or {}).get('nodes') or [])
+    winner = ((standings[0] or {}).get('entrant') or {}).get('name') if standings else None
+    if winner and '|' in winner:
+        # nombre del jugador sin el sponsor
+        winner = winner.split('|')[-1].strip()
+
+    city = node.get('city') or None
+    department = get_department_by_city(city) if city else None
+    start_at = node.get('startAt')
+    slug = main_event.get('slug') or node.get('slug')
+    return {
+        'id': int(node['id']),
+        'tournament_name': node.get('name'),
+        'winner': winner,
+        'attendees': main_event.get('numEntrants') or node.get('numAttendees'),
+        'region': get_region_by_department(department) if department else None,
+        'pais': node.get('countryCode'),
+        'departamento': department,
+        'ciudad': city,
+        'date': datetime.fromtimestamp(int(start_at), tz=dt_timezone.utc).date() if start_at else None,
+        'url': f"https://www.start.gg/{slug}" if slug else None,
+    }
+
+
+def upsert_tournaments(rows):
+    """
+    Inserta o actualiza los torneos por ID en una transacción. Los campos que
+    start.gg no trae (None) conservan el valor guardado, y Tier no se toca.
+    Devuelve (creados, actualizados).
+    """
+    from django.db import transaction
+    from Consultas.models import Tournament
+
+    rows = list({row['id']: row for row in rows}.values())
+    if not rows:
+        return 0, 0
+    fields = [f for f in rows[0] if f != 'id']
+    with transaction.atomic():
+        existing = {
+            t.id: t for t in Tournament.objects.filter(id__in=[row['id'] for row in rows])
+        }
+        objs = []
+        for row in rows:
+            current = existing.get(row['id'])
+            values = {
+                f: (row[f] if row[f] is not None or current is None else getattr(current, f))
+                for f in fields
+            }
+            objs.append(Tournament(id=row['id'], tier=current.tier if current else None, **values))
+        Tournament.objects.bulk_create(objs, update_conflicts=True, unique_fields=['id'], update_fields=fields)
+    return len(rows) - len(existing), len(existing)
+
+
+def _done_windows(country_code, videogame_id):
+    from Consultas.models import TournamentCrawlWindow
+    return set(
+        TournamentCrawlWindow.objects.filter(country_code=country_code, videogame_id=videogame_id)
+        .values_list('window_start', 'window_end')
+    )
+
+
+def _mark_window(country_code, videogame_id, window, tournaments):
+    from django.utils import timezone
+    from Consultas.models import TournamentCrawlWindow
+    TournamentCrawlWindow.objects.update_or_create(
+        country_code=country_code, videogame_id=videogame_id,
+        window_start=window[0], window_end=window[1],
+        defaults={'tournaments': tournaments, 'crawled_at': timezone.now()},
+    )
+
+
+def crawl_country(country_code, since, until=None, window_days=CRAWL_WINDOW_DAYS, videogame_id=STARTGG_VIDEOGAME_ID,
+                  concurrency=None, resume=True, progress=None, transport=None, url=None):
+    """
+    Rastrea todos los torneos de `country_code` entre `since` y `until` (hoy por
+    defecto) y los guarda en Colombia_Tournament. Con resume=True se saltan las
+    ventanas ya completadas en ejecuciones anteriores. `progress(summary)` se
+    llama tras cada lote. Devuelve los contadores del rastreo.
+    """
+    today = date.today()
+    until = min(until or today, today)
+    concurrency = concurrency or STARTGG_ASYNC_CONCURRENCY
+    windows = date_windows(since, until, window_days)
+    done = _done_windows(country_code, videogame_id) if resume else set()
+    pending = [w for w in windows if w not in done]
+
+    summary = {
+        'windows': len(windows), 'skipped_windows': len(windows) - len(pending), 'crawled_windows': 0,
+        'tournaments': 0, 'created': 0, 'updated': 0, 'requests': 0, 'errors': [],
+    }
+    # un lote = tantas ventanas como peticiones simultáneas; la BD se escribe entre lotes
+    for i in range(0, len(pending), concurrency):
+        batch = pending[i:i + concurrency]
+        result = run_crawl_windows(
+            country_code, batch, videogame_id=videogame_id, concurrency=concurrency, transport=transport, url=url
+        )
+        summary['requests'] += result['requests']
+        summary['errors'] += result['errors']
+        for window, nodes in result['windows'].items():
+            rows = [tournament_row(node) for node in nodes if node and node.get('id')]
+            created, updated = upsert_tournaments(rows)
+            summary['created'] += created
+            summary['updated'] += updated
+            summary['tournaments'] += len(rows)
+            summary['crawled_windows'] += 1
+            if window[1] < today:
+                _mark_window(country_code, videogame_id, window, len(rows))
+        if progress is not None:
+            progress(summary)
+    return summary
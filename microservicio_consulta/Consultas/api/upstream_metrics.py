@@ -0,0 +1,202 @@
+"""
+Métricas de las llamadas GraphQL a start.gg.
+
+startgg_client y el cliente asíncrono de async_ingest registran aquí cada
+llamada, con la operación GraphQL como etiqueta:
+
+- peticiones HTTP enviadas por estado, latencia (histograma) y bytes enviados/recibidos;
+- reintentos tras 429 y segundos de espera en el limitador de peticiones;
+- resultado de la caché (hit, miss, stale), peticiones agrupadas (single-flight)
+  y rechazos del circuit breaker.
+
+render() devuelve todo en formato de texto de Prometheus (vista /metrics) y
+cada llamada lógica deja además una línea JSON en la salida estándar
+(STARTGG_METRICS_LOG=0 para desactivarla). Los valores son por proceso: con
+varios workers de gunicorn, Prometheus debe sumar las series de cada uno.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+STARTGG_METRICS_LOG = str(os.environ.get('STARTGG_METRICS_LOG', '1')).lower() in ['1', 'true', 'yes']
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def operation_name(query):
+    m = re.search(r'\b(?:query|mutation)\s+(\w+)', query or '')
+    return m.group(1) if m else 'anonymous'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.label_names, values)} {total}')
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # etiquetas -> [conteos por bucket..., suma, total]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._values.setdefault(label_values, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, [0])[-1]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        names = self.label_names + ('le',)
+        with self._lock:
+            for values, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{_labels(names, values + (bound,))} {count}')
+                lines.append(f'{self.name}_bucket{_labels(names, values + ("+Inf",))} {series[-1]}')
+                lines.append(f'{self.name}_sum{_labels(self.label_names, values)} {series[-2]:.6f}')
+                lines.append(f'{self.name}_count{_labels(self.label_names, values)} {series[-1]}')
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+REQUESTS = Counter('startgg_requests_total', 'Peticiones HTTP enviadas a start.gg', ('operation', 'status'))
+LATENCY = Histogram('startgg_request_duration_seconds', 'Latencia de cada petición HTTP a start.gg', ('operation',))
+REQUEST_BYTES = Counter('startgg_request_bytes_total', 'Bytes enviados a start.gg', ('operation',))
+RESPONSE_BYTES = Counter('startgg_response_bytes_total', 'Bytes recibidos de start.gg', ('operation',))
+RETRIES = Counter('startgg_retries_total', 'Reintentos tras HTTP 429', ('operation',))
+RATE_LIMIT_WAIT = Counter('startgg_rate_limit_wait_seconds_total', 'Segundos esperando turno en el limitador', ('operation',))
+CACHE = Counter('startgg_cache_total', 'Consultas con caché por resultado (hit, miss, stale)', ('operation', 'result'))
+COALESCED = Counter('startgg_coalesced_total', 'Llamadas servidas por una petición idéntica en curso', ('operation',))
+REJECTED = Counter('startgg_circuit_rejected_total', 'Llamadas cortadas por el circuit breaker', ('operation',))
+
+METRICS = (REQUESTS, LATENCY, REQUEST_BYTES, RESPONSE_BYTES, RETRIES, RATE_LIMIT_WAIT, CACHE, COALESCED, REJECTED)
+
+
+class CallRecord:
+    """Datos de una llamada lógica (execute/post), que puede incluir varios intentos HTTP."""
+
+    def __init__(self, query, client='sync'):
+        self.operation = operation_name(query)
+        self.client = client
+        self.started = time.monotonic()
+        self.attempts = 0
+        self.status = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.rate_limit_wait = 0.0
+        self.upstream_seconds = 0.0
+        self.cache = None
+        self.coalesced = False
+        self.error = None
+
+    def attempt(self, status, seconds, request_bytes, response_bytes, rate_limit_wait):
+        """Un intento HTTP terminado (status None = excepción de red)."""
+        if self.attempts:
+            RETRIES.inc(self.operation)
+        self.attempts += 1
+        self.status = status
+        self.upstream_seconds += seconds
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        self.rate_limit_wait += rate_limit_wait
+        REQUESTS.inc(self.operation, str(status) if status is not None else 'error')
+        LATENCY.observe(seconds, self.operation)
+        REQUEST_BYTES.inc(self.operation, amount=request_bytes)
+        RESPONSE_BYTES.inc(self.operation, amount=response_bytes)
+        if rate_limit_wait:
+            RATE_LIMIT_WAIT.inc(self.operation, amount=rate_limit_wait)
+
+    def cache_result(self, result):
+        self.cache = result
+        CACHE.inc(self.operation, result)
+
+    def mark_coalesced(self):
+        self.coalesced = True
+        COALESCED.inc(self.operation)
+
+    def mark_rejected(self):
+        self.error = 'circuit_open'
+        REJECTED.inc(self.operation)
+
+    def log(self):
+        if not STARTGG_METRICS_LOG:
+            return
+        print(json.dumps({
+            'event': 'startgg_call',
+            'client': self.client,
+            'operation': self.operation,
+            'status': self.status,
+            'duration_ms': round((time.monotonic() - self.started) * 1000, 1),
+            'upstream_ms': round(self.upstream_seconds * 1000, 1),
+            'attempts': self.attempts,
+            'retries': max(0, self.attempts - 1),
+            'rate_limit_wait_ms': round(self.rate_limit_wait * 1000, 1),
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'cache': self.cache,
+            'coalesced': self.coalesced,
+            'error': self.error,
+        }, default=str))
+
+
+def render(extra_lines=()):
+    """Texto de Prometheus con todas las métricas (más líneas ya formateadas de quien llama)."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    lines += list(extra_lines)
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Pone todas las métricas a cero (tests)."""
+    for metric in METRICS:
+        metric.reset()
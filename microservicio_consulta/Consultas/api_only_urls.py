@@ -5,18 +5,27 @@ from .api.getPlayerDetails import get_player_info_view, sync_players_from_tourna
 from .api.get_set_info import get_set_info
 from .api.setByTournament import get_sets_by_event
 from .api.eventInfo import get_tournaments_by_country
+from .api.player_jobs import player_sync_status_view
+from .api.listings import list_players_view, list_tournaments_view, list_sets_view
 from . import views
 
 urlpatterns = [
     path('health/', views.api_health, name='api_health'),
+    path('upstream-status/', views.api_upstream_status, name='api_upstream_status'),
+    # sin barra final: es la ruta por defecto de Prometheus
+    path('metrics', views.metrics_view, name='api_metrics'),
     path('get-event-id/', get_event_id_view, name='api_get_event_id'),
     path('get-event-info/', get_event_info_view, name='api_get_event_info'),
     path('get-event-results/', views.get_event_results, name='api_get_event_results'),
     path('get-player-info/', get_player_info_view, name='api_get_player_info'),
     path('sync-players/', sync_players_from_tournament_view, name='api_sync_players'),
+    path('player-sync-status/', player_sync_status_view, name='api_player_sync_status'),
     path('ensure-player/', ensure_player_view, name='api_ensure_player'),
     path('get-sets-by-tournament/', views.get_sets_by_tournament_view, name='api_get_sets_by_tournament'),
     path('get-set-info/', views.get_set_info_api, name='api_get_set_info'),
     path('get-tournaments-by-country/', views.get_tournaments_by_country_view, name='api_get_tournaments_by_country'),
     path('autocomplete-players/', views.autocomplete_players, name='api_autocomplete_players'),
+    path('list-players/', list_players_view, name='api_list_players'),
+    path('list-tournaments/', list_tournaments_view, name='api_list_tournaments'),
+    path('list-sets/', list_sets_view, name='api_list_sets'),
 ]
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 class ConsultasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Consultas'
+
+    def ready(self):
+        # el índice de autocompletado se marca como desactualizado al escribir jugadores
+        from .api.player_index import connect_signals
+        connect_signals()
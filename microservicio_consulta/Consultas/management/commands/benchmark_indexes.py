@@ -0,0 +1,150 @@
+import importlib
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+hot_indexes = importlib.import_module('Consultas.migrations.0008_hot_column_indexes')
+sets_natural_key = importlib.import_module('Consultas.migrations.0006_sets_natural_key')
+
+CREATE_PLAYERS_TABLE = """
+CREATE TABLE "Colombia_Players" (
+    "ID" bigint NOT NULL PRIMARY KEY,
+    "Gamertag" varchar(200) NULL,
+    "Prefijo" varchar(200) NULL,
+    "Nombre" varchar(200) NULL,
+    "Pais" varchar(100) NULL,
+    "Departamento" varchar(100) NULL
+)
+"""
+
+# (nombre, SQL con los mismos filtros que genera el ORM, parámetros)
+QUERIES = [
+    ('sets de un jugador (player_detail)',
+     'SELECT * FROM "Colombia_Sets" WHERE "id_player_1" = ? OR "id_player_2" = ? ORDER BY "id_set" DESC LIMIT 50',
+     lambda p: (p['player'], p['player'])),
+    ('cara a cara',
+     'SELECT * FROM "Colombia_Sets" WHERE ("id_player_1" = ? AND "id_player_2" = ?) '
+     'OR ("id_player_1" = ? AND "id_player_2" = ?)',
+     lambda p: (p['player'], p['rival'], p['rival'], p['player'])),
+    ('sets de un torneo',
+     'SELECT * FROM "Colombia_Sets" WHERE "id_torneo" = ?',
+     lambda p: (p['tournament_id'],)),
+    ('admin: filtro por tournament_name',
+     'SELECT * FROM "Colombia_Sets" WHERE "tournament_name" = ? LIMIT 100',
+     lambda p: (p['tournament_name'],)),
+    ('admin: filtro por event_name',
+     'SELECT * FROM "Colombia_Sets" WHERE "event_name" = ? LIMIT 100',
+     lambda p: (p['event_name'],)),
+    ('admin: valores de list_filter tournament_name',
+     'SELECT DISTINCT "tournament_name" FROM "Colombia_Sets" ORDER BY "tournament_name"',
+     lambda p: ()),
+    ('gamertag iexact',
+     'SELECT "ID", "Gamertag" FROM "Colombia_Players" WHERE "Gamertag" LIKE ? ESCAPE \'\\\' LIMIT 10',
+     lambda p: (p['gamertag'].upper(),)),
+    ('gamertag istartswith',
+     'SELECT "ID", "Gamertag" FROM "Colombia_Players" WHERE "Gamertag" LIKE ? ESCAPE \'\\\' LIMIT 10',
+     lambda p: (p['gamertag'][:3] + '%',)),
+    ('gamertag icontains (autocomplete_players)',
+     'SELECT "ID", "Gamertag" FROM "Colombia_Players" WHERE "Gamertag" LIKE ? ESCAPE \'\\\' LIMIT 10',
+     lambda p: ('%' + p['gamertag'][1:4] + '%',)),
+]
+
+
+class Command(BaseCommand):
+    help = ('Compara el plan (EXPLAIN QUERY PLAN) y el tiempo de las consultas más frecuentes sobre '
+            'Colombia_Sets y Colombia_Players antes y después de los índices de la migración 0008, '
+            'en una base SQLite temporal con datos sintéticos')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sets', type=int, default=1_000_000, help='Sets sintéticos')
+        parser.add_argument('--players', type=int, default=20_000, help='Jugadores sintéticos')
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por consulta (se informa la mediana)')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--db', help='Archivo SQLite a usar (por defecto uno temporal que se borra al terminar)')
+
+    def handle(self, *args, **options):
+        path = options['db']
+        temporary = path is None
+        if temporary:
+            fd, path = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(fd)
+        conn = sqlite3.connect(path)
+        try:
+            started = time.perf_counter()
+            params = self._populate(conn, options['sets'], options['players'], random.Random(options['seed']))
+            self.stdout.write(f"{options['sets']} sets y {options['players']} jugadores generados en "
+                              f"{time.perf_counter() - started:.1f}s ({path})")
+
+            before = self._run(conn, params, options['repeat'])
+            started = time.perf_counter()
+            for name, table, columns in hot_indexes.INDEXES:
+                conn.execute(hot_indexes.index_sql(name, table, columns))
+            conn.execute('ANALYZE')
+            conn.commit()
+            self.stdout.write(f"Índices de 0008 creados en {time.perf_counter() - started:.1f}s\n")
+            after = self._run(conn, params, options['repeat'])
+
+            for (name, _, _), (plan_before, ms_before), (plan_after, ms_after) in zip(QUERIES, before, after):
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                self.stdout.write(f"  antes   {ms_before:10.3f} ms  {plan_before}")
+                self.stdout.write(f"  después {ms_after:10.3f} ms  {plan_after}")
+        finally:
+            conn.close()
+            if temporary:
+                os.remove(path)
+
+    def _populate(self, conn, n_sets, n_players, rng):
+        # estado previo a 0008: tabla de sets con el índice único (id_torneo, id_set) de 0006
+        conn.execute(sets_natural_key.CREATE_SETS_TABLE)
+        conn.execute(f'CREATE UNIQUE INDEX "{sets_natural_key.INDEX_NAME}" ON "Colombia_Sets" ("id_torneo", "id_set")')
+        conn.execute(CREATE_PLAYERS_TABLE)
+
+        letters = 'abcdefghijklmnopqrstuvwxyzáéíóñ'
+        gamertags = [''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(n_players)]
+        conn.executemany(
+            'INSERT INTO "Colombia_Players" VALUES (?, ?, ?, ?, ?, ?)',
+            ((i + 1, tag, None, tag.title(), 'Colombia', 'Antioquia') for i, tag in enumerate(gamertags)),
+        )
+
+        n_tournaments = max(1, n_sets // 60)
+
+        def sets():
+            for i in range(n_sets):
+                t = i % n_tournaments
+                p1, p2 = rng.randint(1, n_players), rng.randint(1, n_players)
+                yield (str(100000 + t), i + 1, p1, gamertags[p1 - 1], rng.randint(0, 3), p2, gamertags[p2 - 1],
+                       rng.randint(0, 3), 'Bracket', f'Ultimate Singles {t % 400}', f'Torneo {t}', '', '', 'Bracket')
+
+        conn.executemany(
+            'INSERT INTO "Colombia_Sets" ("id_torneo", "id_set", "id_player_1", "player_1", "player_1_score", '
+            '"id_player_2", "player_2", "player_2_score", "phase", "event_name", "tournament_name", '
+            '"player_1_characters", "player_2_characters", "ronda") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            sets(),
+        )
+        conn.execute('ANALYZE')
+        conn.commit()
+
+        row = conn.execute('SELECT "id_player_1", "id_player_2", "id_torneo", "tournament_name", "event_name" '
+                           'FROM "Colombia_Sets" WHERE "id_set" = ?', (n_sets // 2,)).fetchone()
+        return {
+            'player': row[0], 'rival': row[1], 'tournament_id': row[2], 'tournament_name': row[3],
+            'event_name': row[4], 'gamertag': gamertags[row[0] - 1],
+        }
+
+    def _run(self, conn, params, repeat):
+        results = []
+        for _, sql, make_params in QUERIES:
+            values = make_params(params)
+            plan = '; '.join(r[-1] for r in conn.execute(f'EXPLAIN QUERY PLAN {sql}', values))
+            timings = []
+            for _ in range(max(1, repeat)):
+                started = time.perf_counter()
+                conn.execute(sql, values).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results.append((plan, statistics.median(timings)))
+        return results
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Consultas.api import startgg_client, rate_limiter, response_cache
+from Consultas.api.startgg_replay import ReplayServer
+from Consultas.api.setByTournament import get_sets_by_event
+from Consultas.api.getTournamentDetails import get_tournament_details
+from Consultas.api.getPlayerDetails import get_players_details_bulk
+
+
+class Command(BaseCommand):
+    help = ('Mide el rendimiento de get_sets_by_event, get_tournament_details y la obtención de jugadores '
+            'contra el servidor de reproducción local (sin red, sin caché y sin límite de peticiones)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixtures_dir', help='Directorio con los fixtures grabados')
+        parser.add_argument('--event-id', help='Evento para get_sets_by_event')
+        parser.add_argument('--tournament-id', help='Torneo para get_tournament_details y la obtención de jugadores')
+        parser.add_argument('--latency', type=float, default=0.05, help='Latencia simulada por petición (s)')
+        parser.add_argument('--page-size', type=int, default=None)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if not options['event_id'] and not options['tournament_id']:
+            raise CommandError('Indica --event-id y/o --tournament-id')
+
+        server = ReplayServer(options['fixtures_dir'], latency=options['latency'], page_size=options['page_size'])
+        previous_cache_flag = response_cache.STARTGG_CACHE_ENABLED
+        server.start()
+        startgg_client.set_base_url(server.url)
+        # cada repetición debe llegar al servidor: sin caché ni límite de peticiones
+        response_cache.STARTGG_CACHE_ENABLED = False
+        response_cache.set_response_cache(None)
+        rate_limiter.set_rate_limiter(rate_limiter.TokenBucket(limit=10**6, window=1, burst=10**6))
+        try:
+            if options['event_id']:
+                self._measure('get_sets_by_event', server, options['repeat'],
+                              lambda: len(get_sets_by_event(options['event_id'])))
+            if options['tournament_id']:
+                details = {}
+
+                def tournament():
+                    details.update(get_tournament_details(options['tournament_id']))
+                    return len((details.get('details') or {}).get('attendees') or [])
+
+                self._measure('get_tournament_details', server, options['repeat'], tournament)
+                ids = [a['player_id'] for a in (details.get('details') or {}).get('attendees') or [] if a.get('player_id')]
+                self._measure('get_players_details_bulk', server, options['repeat'],
+                              lambda: len(get_players_details_bulk(ids)))
+        finally:
+            startgg_client.set_base_url(None)
+            response_cache.STARTGG_CACHE_ENABLED = previous_cache_flag
+            rate_limiter.set_rate_limiter(None)
+            server.stop()
+
+    def _measure(self, name, server, repeat, fn):
+        timings = []
+        for _ in range(repeat):
+            before = server.requests
+            started = time.perf_counter()
+            items = fn()
+            timings.append((time.perf_counter() - started, server.requests - before, items))
+        best, requests_made, items = min(timings)
+        self.stdout.write(
+            f"{name}: {items} elementos, {requests_made} peticiones, mejor {best:.3f}s "
+            f"({items / best if best else 0:.0f} elementos/s), media {sum(t[0] for t in timings) / repeat:.3f}s"
+        )
+        if server.misses:
+            self.stderr.write(f"  aviso: {server.misses} peticiones sin fixture hasta ahora")
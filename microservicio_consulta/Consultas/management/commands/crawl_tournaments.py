@@ -0,0 +1,56 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Consultas.api.async_ingest import STARTGG_ASYNC_CONCURRENCY
+from Consultas.api.tournament_crawler import crawl_country, CRAWL_WINDOW_DAYS, STARTGG_VIDEOGAME_ID
+
+
+class Command(BaseCommand):
+    help = ('Rastrea en start.gg todos los torneos de un país por ventanas de fechas y los guarda en '
+            'Colombia_Tournament. Reanuda desde las ventanas ya completadas.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('country_code', nargs='?', default='CO', help='Código de país (por defecto CO)')
+        parser.add_argument('--since', default='2018-12-07', help='Fecha inicial YYYY-MM-DD')
+        parser.add_argument('--until', help='Fecha final YYYY-MM-DD (por defecto hoy)')
+        parser.add_argument('--window-days', type=int, default=CRAWL_WINDOW_DAYS, help='Días por ventana')
+        parser.add_argument('--videogame-id', type=int, default=STARTGG_VIDEOGAME_ID,
+                            help='Videojuego de start.gg (1386 = Ultimate, 0 = todos)')
+        parser.add_argument('--concurrency', type=int, default=STARTGG_ASYNC_CONCURRENCY,
+                            help='Peticiones simultáneas a start.gg')
+        parser.add_argument('--restart', action='store_true', help='Ignorar las ventanas ya completadas')
+
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options['since'])
+            until = date.fromisoformat(options['until']) if options['until'] else None
+        except ValueError as e:
+            raise CommandError(f"Fecha no válida: {e}")
+        if options['window_days'] < 1:
+            raise CommandError('--window-days debe ser mayor que 0')
+
+        def progress(summary):
+            done = summary['skipped_windows'] + summary['crawled_windows'] + len(summary['errors'])
+            self.stdout.write(
+                f"  {done}/{summary['windows']} ventanas, {summary['tournaments']} torneos "
+                f"({summary['created']} nuevos, {summary['updated']} actualizados)"
+            )
+
+        started = time.monotonic()
+        summary = crawl_country(
+            options['country_code'].upper(), since, until,
+            window_days=options['window_days'], videogame_id=options['videogame_id'],
+            concurrency=options['concurrency'], resume=not options['restart'], progress=progress,
+        )
+        elapsed = time.monotonic() - started
+
+        for error in summary['errors']:
+            self.stderr.write(f"Ventana {error['window'][0]}..{error['window'][1]}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['tournaments']} torneos ({summary['created']} nuevos, {summary['updated']} actualizados) "
+            f"en {elapsed:.1f}s: {summary['crawled_windows']} ventanas rastreadas, "
+            f"{summary['skipped_windows']} ya completadas, {summary['requests']} peticiones, "
+            f"{len(summary['errors'])} errores"
+        ))
@@ -0,0 +1,62 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Consultas.api.async_ingest import persist_ingestion, run_ingestion, STARTGG_ASYNC_CONCURRENCY
+
+
+class Command(BaseCommand):
+    help = ('Descarga de start.gg torneos completos (participantes, sets y standings) de forma concurrente '
+            'y los guarda en Colombia_Tournament, Colombia_Players y Colombia_Sets')
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_ids', nargs='*', help='IDs de torneos de start.gg')
+        parser.add_argument('--ids-file', help='Archivo con un ID de torneo por línea')
+        parser.add_argument('--concurrency', type=int, default=STARTGG_ASYNC_CONCURRENCY,
+                            help='Peticiones simultáneas a start.gg')
+        parser.add_argument('--no-sets', action='store_true', help='No descargar los sets de cada evento')
+        parser.add_argument('--no-standings', action='store_true', help='No descargar los standings de cada evento')
+        parser.add_argument('--output', help='Guardar el resultado completo como JSON en este archivo')
+        parser.add_argument('--dry-run', action='store_true', help='Sólo descargar, sin escribir en la BD')
+
+    def handle(self, *args, **options):
+        tournament_ids = list(options['tournament_ids'])
+        if options['ids_file']:
+            with open(options['ids_file'], encoding='utf-8') as f:
+                tournament_ids += [line.strip() for line in f if line.strip()]
+        if not tournament_ids:
+            raise CommandError('Indica al menos un ID de torneo o --ids-file')
+
+        started = time.monotonic()
+        summary = run_ingestion(
+            tournament_ids,
+            concurrency=options['concurrency'],
+            include_sets=not options['no_sets'],
+            include_standings=not options['no_standings'],
+        )
+        elapsed = time.monotonic() - started
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False)
+
+        for error in summary['errors']:
+            self.stderr.write(f"Torneo {error['tournament_id']}: {error['error']}")
+        sets = sum(len(e['sets']) for t in summary['tournaments'] for e in t['events'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(summary['tournaments'])} torneos, {sets} sets en {elapsed:.1f}s "
+            f"({summary['requests']} peticiones, {len(summary['errors'])} errores)"
+        ))
+        if options['dry_run']:
+            return
+
+        saved = persist_ingestion(summary)
+        for error in saved['players']['errors'] + saved['sets']['errors']:
+            self.stderr.write(f"Fila {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Torneos: {saved['tournaments']['created']} nuevos, {saved['tournaments']['updated']} actualizados; "
+            f"jugadores nuevos: {saved['players']['inserted']}; "
+            f"sets: {saved['sets']['inserted']} nuevos, {saved['sets']['updated']} actualizados "
+            f"({len(saved['sets']['errors'])} rechazados)"
+        ))
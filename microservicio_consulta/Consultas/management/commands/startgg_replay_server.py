@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from Consultas.api.startgg_replay import ReplayServer
+
+
+class Command(BaseCommand):
+    help = 'Sirve en local los fixtures grabados de start.gg (apuntar STARTGG_URL a la URL mostrada)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixtures_dir', help='Directorio con los fixtures (STARTGG_RECORD_DIR al grabar)')
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help='Segundos de espera por petición')
+        parser.add_argument('--page-size', type=int, default=None,
+                            help='Tamaño máximo de página servido en consultas paginadas')
+
+    def handle(self, *args, **options):
+        server = ReplayServer(
+            options['fixtures_dir'], latency=options['latency'], page_size=options['page_size'],
+            host=options['host'], port=options['port'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(server.store.exact)} fixtures en {server.url} (latencia {options['latency']}s). Ctrl+C para salir."
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+            self.stdout.write(f"{server.requests} peticiones servidas, {server.misses} sin fixture")
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Consultas', '0002_add_main_character_fk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TournamentSyncState',
+            fields=[
+                ('tournament_id', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('synced_at', models.DateTimeField()),
+                ('participants', models.JSONField(default=dict)),
+            ],
+            options={
+                'db_table': 'Consultas_tournament_sync_state',
+            },
+        ),
+        migrations.CreateModel(
+            name='PlayerSyncState',
+            fields=[
+                ('player_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('synced_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'Consultas_player_sync_state',
+            },
+        ),
+    ]
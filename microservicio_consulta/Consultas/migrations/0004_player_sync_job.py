@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Consultas', '0003_sync_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerSyncJob',
+            fields=[
+                ('id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('tournament_id', models.CharField(max_length=100)),
+                ('status', models.CharField(default='queued', max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('processed', models.IntegerField(default=0)),
+                ('created', models.IntegerField(default=0)),
+                ('updated', models.IntegerField(default=0)),
+                ('skipped', models.IntegerField(default=0)),
+                ('errors', models.JSONField(default=list)),
+                ('attendees', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'Consultas_player_sync_job',
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+def ensure_tournament_table(apps, schema_editor):
+    """
+    El modelo usa Colombia_Tournament (la tabla de la BD real) pero 0001 la creó
+    como "Colombia Tournament". Se renombra o se crea sólo si hace falta.
+    """
+    Tournament = apps.get_model('Consultas', 'Tournament')
+    tables = schema_editor.connection.introspection.table_names()
+    if 'Colombia_Tournament' in tables:
+        return
+    if 'Colombia Tournament' in tables:
+        schema_editor.alter_db_table(Tournament, 'Colombia Tournament', 'Colombia_Tournament')
+    else:
+        schema_editor.create_model(Tournament)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Consultas', '0004_player_sync_job'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterModelTable(name='tournament', table='Colombia_Tournament'),
+            ],
+        ),
+        migrations.RunPython(ensure_tournament_table, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='TournamentCrawlWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country_code', models.CharField(max_length=8)),
+                ('videogame_id', models.IntegerField(default=0)),
+                ('window_start', models.DateField()),
+                ('window_end', models.DateField()),
+                ('tournaments', models.IntegerField(default=0)),
+                ('crawled_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'Consultas_tournament_crawl_window',
+                'unique_together': {('country_code', 'videogame_id', 'window_start', 'window_end')},
+            },
+        ),
+    ]
@@ -0,0 +1,125 @@
+from django.db import migrations, models
+
+INDEX_NAME = 'colombia_sets_torneo_set_uniq'
+
+CREATE_SETS_TABLE = """
+CREATE TABLE "Colombia_Sets" (
+    "id" integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+    "id_torneo" varchar(100) NULL,
+    "id_set" integer NULL,
+    "id_player_1" bigint NULL,
+    "player_1" varchar(200) NULL,
+    "player_1_score" integer NULL,
+    "id_player_2" bigint NULL,
+    "player_2" varchar(200) NULL,
+    "player_2_score" integer NULL,
+    "phase" varchar(100) NULL,
+    "event_name" varchar(200) NULL,
+    "tournament_name" varchar(200) NULL,
+    "player_1_characters" text NULL,
+    "player_2_characters" text NULL,
+    "ronda" varchar(200) NULL
+)
+"""
+
+
+def add_sets_unique_index(apps, schema_editor):
+    """
+    Índice único sobre la clave natural (id_torneo, id_set) de Colombia_Sets.
+    La tabla real se creó a mano (sin la columna ronda); en una BD creada desde
+    las migraciones no existe. Antes de crear el índice se eliminan los
+    duplicados, conservando la fila insertada más tarde.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        if 'Colombia_Sets' not in tables:
+            cursor.execute(CREATE_SETS_TABLE)
+        columns = [c.name for c in connection.introspection.get_table_description(cursor, 'Colombia_Sets')]
+        if 'ronda' not in columns:
+            cursor.execute('ALTER TABLE "Colombia_Sets" ADD COLUMN "ronda" varchar(200) NULL')
+        cursor.execute(
+            'DELETE FROM "Colombia_Sets" WHERE "id_set" IS NOT NULL AND rowid NOT IN ('
+            'SELECT MAX(rowid) FROM "Colombia_Sets" WHERE "id_set" IS NOT NULL GROUP BY "id_torneo", "id_set")'
+        )
+        cursor.execute(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS "{INDEX_NAME}" ON "Colombia_Sets" ("id_torneo", "id_set")'
+        )
+
+
+def drop_sets_unique_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP INDEX IF EXISTS "{INDEX_NAME}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Consultas', '0005_tournament_crawl'),
+    ]
+
+    # La BD la modifica RunPython (tabla creada a mano); el estado registra las
+    # columnas de Colombia_Sets y la clave natural para que coincida con models.Set.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_sets_unique_index, drop_sets_unique_index),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='set',
+                    name='id_torneo',
+                    field=models.CharField(blank=True, db_column='id_torneo', max_length=100, null=True),
+                ),
+                migrations.AddField(
+                    model_name='set',
+                    name='id_set',
+                    field=models.IntegerField(blank=True, db_column='id_set', null=True),
+                ),
+                migrations.AddField(
+                    model_name='set',
+                    name='id_player_1',
+                    field=models.BigIntegerField(blank=True, db_column='id_player_1', null=True),
+                ),
+                migrations.AddField(
+                    model_name='set',
+                    name='id_player_2',
+                    field=models.BigIntegerField(blank=True, db_column='id_player_2', null=True),
+                ),
+                migrations.AddField(
+                    model_name='set',
+                    name='phase',
+                    field=models.CharField(blank=True, max_length=100, null=True),
+                ),
+                migrations.AddField(
+                    model_name='set',
+                    name='event_name',
+                    field=models.CharField(blank=True, max_length=200, null=True),
+                ),
+                migrations.AddField(
+                    model_name='set',
+                    name='tournament_name',
+                    field=models.CharField(blank=True, max_length=200, null=True),
+                ),
+                migrations.AddField(
+                    model_name='set',
+                    name='player_1_characters',
+                    field=models.TextField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='set',
+                    name='player_2_characters',
+                    field=models.TextField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='set',
+                    name='ronda',
+                    field=models.CharField(blank=True, max_length=200, null=True),
+                ),
+                migrations.AlterUniqueTogether(
+                    name='set',
+                    unique_together={('id_torneo', 'id_set')},
+                ),
+            ],
+        ),
+    ]
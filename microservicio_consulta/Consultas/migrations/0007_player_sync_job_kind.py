@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Consultas', '0006_sets_natural_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playersyncjob',
+            name='kind',
+            field=models.CharField(default='tournament', max_length=20),
+        ),
+    ]
@@ -0,0 +1,93 @@
+from django.db import migrations, models
+from django.db.models.functions import Collate
+
+# (nombre, tabla, columnas) de los índices sobre las columnas más consultadas.
+# - Colombia_Sets por jugador: (id_player_1, id_player_2) sirve para los sets de
+#   un jugador como jugador 1 y para el cara a cara; (id_player_2, id_player_1)
+#   para el jugador 2 y el cara a cara en el otro orden.
+# - id_torneo ya está cubierto por el índice único (id_torneo, id_set) de 0006.
+# - tournament_name y event_name: filtros del admin (list_filter).
+# - Gamertag con COLLATE NOCASE: búsquedas sin distinguir mayúsculas por igualdad
+#   o por prefijo (LIKE 'abc%'); un icontains ('%abc%') sigue recorriendo la tabla.
+INDEXES = [
+    ('colombia_sets_p1_p2_idx', 'Colombia_Sets', ['id_player_1', 'id_player_2']),
+    ('colombia_sets_p2_p1_idx', 'Colombia_Sets', ['id_player_2', 'id_player_1']),
+    ('colombia_sets_tourn_name_idx', 'Colombia_Sets', ['tournament_name']),
+    ('colombia_sets_event_name_idx', 'Colombia_Sets', ['event_name']),
+    ('colombia_players_tag_nocase', 'Colombia_Players', ['Gamertag COLLATE NOCASE']),
+]
+
+
+def index_sql(name, table, columns):
+    quoted = ', '.join(' '.join([f'"{c.split()[0]}"'] + c.split()[1:]) for c in columns)
+    return f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({quoted})'
+
+
+def create_indexes(apps, schema_editor):
+    """
+    Las tablas Colombia_* se crearon a mano: sólo se indexan las que existen y
+    tienen las columnas (SQLite compara los nombres sin distinguir mayúsculas).
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        tables = {t.lower(): t for t in connection.introspection.table_names(cursor)}
+        analyzed = set()
+        for name, table, columns in INDEXES:
+            if table.lower() not in tables:
+                print(f"Índice {name} omitido: no existe la tabla {table}")
+                continue
+            existing = {c.name.lower() for c in connection.introspection.get_table_description(cursor, tables[table.lower()])}
+            missing = [c.split()[0] for c in columns if c.split()[0].lower() not in existing]
+            if missing:
+                print(f"Índice {name} omitido: faltan columnas {missing} en {table}")
+                continue
+            cursor.execute(index_sql(name, tables[table.lower()], columns))
+            analyzed.add(tables[table.lower()])
+        # estadísticas para que el planificador elija los índices nuevos
+        for table in sorted(analyzed):
+            cursor.execute(f'ANALYZE "{table}"')
+
+
+def drop_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for name, table, columns in INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Consultas', '0007_player_sync_job_kind'),
+    ]
+
+    # Los índices se crean con SQL (sólo si la tabla hecha a mano tiene las
+    # columnas); el estado los registra igual que Meta.indexes de los modelos.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='set',
+                    index=models.Index(fields=['id_player_1', 'id_player_2'], name='colombia_sets_p1_p2_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='set',
+                    index=models.Index(fields=['id_player_2', 'id_player_1'], name='colombia_sets_p2_p1_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='set',
+                    index=models.Index(fields=['tournament_name'], name='colombia_sets_tourn_name_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='set',
+                    index=models.Index(fields=['event_name'], name='colombia_sets_event_name_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='player',
+                    index=models.Index(Collate('gamertag', 'NOCASE'), name='colombia_players_tag_nocase'),
+                ),
+            ],
+        ),
+    ]
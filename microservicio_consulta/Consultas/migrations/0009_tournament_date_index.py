@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+INDEX_NAME = 'colombia_tournament_date_idx'
+
+
+def create_date_index(apps, schema_editor):
+    """
+    Índice (Date, ID) de Colombia_Tournament para la paginación por cursor de
+    list-tournaments/ (más recientes primero). La tabla real se creó a mano;
+    SQLite compara los nombres de columna sin distinguir mayúsculas.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'Colombia_Tournament' not in connection.introspection.table_names(cursor):
+            print(f"Índice {INDEX_NAME} omitido: no existe la tabla Colombia_Tournament")
+            return
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS "{INDEX_NAME}" ON "Colombia_Tournament" ("Date", "ID")')
+
+
+def drop_date_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP INDEX IF EXISTS "{INDEX_NAME}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Consultas', '0008_hot_column_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_date_index, drop_date_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='tournament',
+                    index=models.Index(fields=['date', 'id'], name=INDEX_NAME),
+                ),
+            ],
+        ),
+    ]
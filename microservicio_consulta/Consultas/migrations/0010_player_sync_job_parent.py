@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Consultas', '0009_tournament_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playersyncjob',
+            name='parent_id',
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+    ]
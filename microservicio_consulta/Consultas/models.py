@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Collate
 
 # Modelo mínimo Character: expone 'name' y 'game' para satisfacer admin/forms que los referencian.
 class Character(models.Model):
@@ -47,6 +48,8 @@ class Player(models.Model):
 
     class Meta:
         db_table = 'Colombia_Players'
+        # creado por la migración 0008 (tabla creada a mano)
+        indexes = [models.Index(Collate('gamertag', 'NOCASE'), name='colombia_players_tag_nocase')]
 
     def __str__(self):
         return self.gamertag or self.nombre or str(self.id)
@@ -79,6 +82,8 @@ class Tournament(models.Model):
 
     class Meta:
         db_table = 'Colombia_Tournament'
+        # para la paginación por fecha de list-tournaments/; creado por la migración 0009
+        indexes = [models.Index(fields=['date', 'id'], name='colombia_tournament_date_idx')]
 
     def __str__(self):
         return self.tournament_name or str(self.id)
@@ -122,6 +127,86 @@ class Set(models.Model):
 
     class Meta:
         db_table = 'Colombia_Sets'
+        # clave natural; el índice único lo crea la migración 0006 (tabla creada a mano)
+        unique_together = ('id_torneo', 'id_set')
+        # índices de las columnas más consultadas, creados por la migración 0008
+        indexes = [
+            models.Index(fields=['id_player_1', 'id_player_2'], name='colombia_sets_p1_p2_idx'),
+            models.Index(fields=['id_player_2', 'id_player_1'], name='colombia_sets_p2_p1_idx'),
+            models.Index(fields=['tournament_name'], name='colombia_sets_tourn_name_idx'),
+            models.Index(fields=['event_name'], name='colombia_sets_event_name_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.id_torneo}:{self.id_set}"
\ No newline at end of file
+        return f"{self.id_torneo}:{self.id_set}"
+
+# Estado de la sincronización incremental de participantes (sync_players_from_tournament_view).
+# Por torneo: marca de la última sincronización y hash de cada participante ya sincronizado.
+class TournamentSyncState(models.Model):
+    tournament_id = models.CharField(max_length=100, primary_key=True)
+    synced_at = models.DateTimeField()
+    # {clave_participante: hash(participant_id, player_id, gamerTag)}
+    participants = models.JSONField(default=dict)
+
+    class Meta:
+        db_table = 'Consultas_tournament_sync_state'
+
+    def __str__(self):
+        return f"{self.tournament_id} @ {self.synced_at}"
+
+# Por jugador: hash del contenido (detalles de start.gg) escrito por última vez en Colombia_Players.
+class PlayerSyncState(models.Model):
+    player_id = models.BigIntegerField(primary_key=True)
+    content_hash = models.CharField(max_length=64)
+    synced_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'Consultas_player_sync_state'
+
+    def __str__(self):
+        return f"{self.player_id}: {self.content_hash}"
+
+# Trabajo en segundo plano de creación/actualización de jugadores (get-event-info con create_players=1).
+class PlayerSyncJob(models.Model):
+    id = models.CharField(max_length=32, primary_key=True)
+    # 'tournament': asistentes de get-event-info; 'upload': archivo de upload_exceljugadores,
+    # cuyas filas se procesan en trabajos 'upload_chunk' (uno por bloque leído)
+    kind = models.CharField(max_length=20, default='tournament')
+    # trabajo 'upload' al que pertenece un 'upload_chunk'
+    parent_id = models.CharField(max_length=32, null=True, blank=True, db_index=True)
+    tournament_id = models.CharField(max_length=100)
+    # queued | running | done | failed
+    status = models.CharField(max_length=20, default='queued')
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    created = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    errors = models.JSONField(default=list)
+    # asistentes a procesar ({participant_id, player_id, gamerTag}); así el worker no vuelve a pedirlos.
+    # En los trabajos 'upload_chunk', las filas de su bloque (ver upload_ingest.prepare_players)
+    attendees = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'Consultas_player_sync_job'
+
+    def __str__(self):
+        return f"{self.id} ({self.status} {self.processed}/{self.total})"
+
+# Ventanas de fechas ya rastreadas por el comando crawl_tournaments (checkpoint para reanudar).
+class TournamentCrawlWindow(models.Model):
+    country_code = models.CharField(max_length=8)
+    videogame_id = models.IntegerField(default=0)
+    window_start = models.DateField()
+    window_end = models.DateField()
+    tournaments = models.IntegerField(default=0)
+    crawled_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('country_code', 'videogame_id', 'window_start', 'window_end')
+        db_table = 'Consultas_tournament_crawl_window'
+
+    def __str__(self):
+        return f"{self.country_code} {self.window_start}..{self.window_end} ({self.tournaments})"
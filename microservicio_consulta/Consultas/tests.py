@@ -1,6 +1,52 @@
-from django.test import TestCase
-from .models import Tournament, Event, Player, Set
+import asyncio
+import functools
+import importlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import types
+from datetime import date, datetime, timezone as dt_timezone
+from unittest import mock
+
+import httpx
+import pandas as pd
+import requests
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.state import ProjectState
+from django.db.models import Q
+from django.test import TestCase, SimpleTestCase, RequestFactory, Client
+from .models import Tournament, Event, Player, Set, PlayerSyncJob
 from .views import get_event_results  # Importar la función
+from . import views
+from . import views_uploads
+from . import upload_ingest
+from .api import startgg_client
+from .api import setByTournament
+from .api import rate_limiter
+from .api import response_cache
+from .api import getPlayerDetails
+from .api import async_ingest
+from .api import getTournamentDetails
+from .api import player_jobs
+from .api import startgg_replay
+from .api import getEventResults
+from .api import eventInfo
+from .api import tournament_crawler
+from .api import circuit_breaker
+from .api import single_flight
+from .api import upstream_metrics
+from .api import listings
+from .api import player_index
 
 class MyAppTests(TestCase):
     def setUp(self):
@@ -15,4 +61,1301 @@ class MyAppTests(TestCase):
         results = get_event_results(event.id)
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0]['player__name'], "Test Player")
-        self.assertEqual(results[0]['result'], "Win")
\ No newline at end of file
+        self.assertEqual(results[0]['result'], "Win")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class StartggClientTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        rate_limiter.set_rate_limiter(rate_limiter.TokenBucket(limit=10, window=10, burst=2, clock=self.clock, sleep=self.clock.sleep))
+
+    def tearDown(self):
+        startgg_client.reset_session()
+        rate_limiter.set_rate_limiter(None)
+
+    def test_session_is_shared(self):
+        session = startgg_client.get_session()
+        self.assertIs(session, startgg_client.get_session())
+        self.assertEqual(session.headers['Authorization'], f'Bearer {startgg_client.STARTGG_KEY}')
+
+    def test_execute_applies_timeout_and_returns_json(self):
+        with mock.patch.object(requests.Session, 'post') as post:
+            post.return_value.json.return_value = {'data': {'event': {'id': 1}}}
+            data = startgg_client.execute('query Q { event { id } }', {'id': 1})
+        self.assertEqual(data['data']['event']['id'], 1)
+        kwargs = post.call_args.kwargs
+        self.assertEqual(kwargs['json']['variables'], {'id': 1})
+        self.assertEqual(kwargs['timeout'], (startgg_client.STARTGG_CONNECT_TIMEOUT, startgg_client.STARTGG_READ_TIMEOUT))
+
+
+def _set_node(set_id, entrant_1, entrant_2):
+    return {
+        'id': set_id,
+        'displayScore': 'A 2 - B 1',
+        'phaseGroup': {'phase': {'name': 'Pools'}, 'displayIdentifier': 'A1'},
+        'event': {'name': 'Singles', 'tournament': {'name': 'Test'}},
+        'slots': [{'entrant': {'id': entrant_1}}, {'entrant': {'id': entrant_2}}],
+        'games': None,
+    }
+
+
+class SetsByEventTests(SimpleTestCase):
+    def fake_execute(self, query, variables=None, timeout=None):
+        self.queries.append(query)
+        if 'EventQuery' in query:
+            return {'data': {'event': {'tournament': {'id': 7}}}}
+        if 'TournamentParticipants' in query:
+            return {'data': {'tournament': {'participants': {
+                'pageInfo': {'totalPages': 1},
+                'nodes': [{'id': 1, 'gamerTag': 'A', 'player': {'id': 100}, 'entrants': [{'id': 11}]}],
+            }}}}
+        if 'EntrantsBatch' in query:
+            return {'data': {'e0': {'id': 12, 'participants': [{'player': {'id': 200}}]}}}
+        return {'data': {'event': {'sets': {'nodes': [_set_node(1, 11, 12), _set_node(2, 12, 11)]}}}}
+
+    def test_entrants_resolved_from_map_and_one_batch(self):
+        self.queries = []
+        with mock.patch.object(startgg_client, 'execute', side_effect=self.fake_execute):
+            sets = setByTournament.get_sets_by_event(99)
+        self.assertEqual([(s['player1_id'], s['player2_id']) for s in sets], [(100, 200), (200, 100)])
+        self.assertEqual(len(self.queries), 4)
+        self.assertEqual(sum('EntrantsBatch' in q for q in self.queries), 1)
+
+    def test_concurrent_pages_keep_set_order(self):
+        def fake_page(query, variables=None, timeout=None):
+            page = variables['page']
+            if page == 2:
+                time.sleep(0.05)  # la página 2 llega después que la 3
+            nodes = [_set_node(page * 100 + i, None, None) for i in range(2)]
+            for node in nodes:
+                node['slots'] = [{'entrant': None}, {'entrant': None}]
+            return {'data': {'event': {'sets': {'pageInfo': {'total': 6, 'totalPages': 3}, 'nodes': nodes}}}}
+
+        with mock.patch.object(startgg_client, 'execute', side_effect=fake_page):
+            pages = list(setByTournament.iter_event_sets_pages(99, concurrency=3))
+        self.assertEqual([[n['id'] for n in nodes] for nodes in pages], [[100, 101], [200, 201], [300, 301]])
+
+    def test_stream_mode_emits_ndjson_without_prefetching_participants(self):
+        self.queries = []
+        request = RequestFactory().post('/get-sets-by-tournament/', {'event_id': 99, 'stream': '1'})
+        with mock.patch.object(startgg_client, 'execute', side_effect=self.fake_execute):
+            response = views.get_sets_by_tournament_view(request)
+            lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([line['id'] for line in lines], [1, 2])
+        self.assertFalse(any('TournamentParticipants' in q for q in self.queries))
+
+    def test_view_stays_csrf_exempt(self):
+        self.queries = []
+        self.assertTrue(getattr(views.get_sets_by_tournament_view, 'csrf_exempt', False))
+        client = Client(enforce_csrf_checks=True)
+        with mock.patch.object(startgg_client, 'execute', side_effect=self.fake_execute):
+            response = client.post('/api/get-sets-by-tournament/', {'event_id': 99, 'stream': '1'})
+            b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        rate_limiter.set_rate_limiter(rate_limiter.TokenBucket(limit=10, window=10, burst=2, clock=self.clock, sleep=self.clock.sleep))
+
+    def tearDown(self):
+        startgg_client.reset_session()
+        rate_limiter.set_rate_limiter(None)
+
+    def test_bucket_never_exceeds_limit_per_window(self):
+        bucket = rate_limiter.get_rate_limiter()
+        for _ in range(10):
+            bucket.acquire()
+        # 2 de ráfaga + 8 rellenados a 0.8 tokens/s: exactamente una ventana de 10 s
+        self.assertAlmostEqual(self.clock.now - 1000.0, 10.0)
+
+    def test_429_penalizes_bucket_and_retries(self):
+        throttled = mock.Mock(status_code=429, headers={'Retry-After': '3'})
+        ok = mock.Mock(status_code=200, headers={})
+        with mock.patch.object(requests.Session, 'post', side_effect=[throttled, ok]) as post:
+            response = startgg_client.post('query Q { event { id } }')
+        self.assertIs(response, ok)
+        self.assertEqual(post.call_count, 2)
+        self.assertIn(3.0, self.clock.slept)
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.clock = FakeClock()
+        self.cache = response_cache.ResponseCache(path=self.path, max_entries=2, clock=self.clock)
+        response_cache.set_response_cache(self.cache)
+        rate_limiter.set_rate_limiter(rate_limiter.TokenBucket(limit=100, window=1, clock=self.clock, sleep=self.clock.sleep))
+
+    def tearDown(self):
+        response_cache.set_response_cache(None)
+        rate_limiter.set_rate_limiter(None)
+        startgg_client.reset_session()
+        os.remove(self.path)
+
+    def test_ttl_expiry_and_lru_eviction(self):
+        self.cache.set('a', {'v': 1}, ttl=10)
+        self.cache.set('b', {'v': 2}, ttl=100)
+        self.clock.now += 1
+        self.assertEqual(self.cache.get('a'), {'v': 1})  # 'a' pasa a ser el más reciente
+        self.cache.set('c', {'v': 3}, ttl=100)           # expulsa 'b' (LRU)
+        self.assertIsNone(self.cache.get('b'))
+        self.clock.now += 10
+        self.assertIsNone(self.cache.get('a'))           # vencido
+        self.assertEqual(self.cache.get('c'), {'v': 3})
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+    def test_execute_serves_repeated_query_from_cache(self):
+        ok = mock.Mock(status_code=200, headers={})
+        ok.json.return_value = {'data': {'player': {'id': 5}}}
+        with mock.patch.object(requests.Session, 'post', return_value=ok) as post:
+            first = startgg_client.execute('query P { player { id } }', {'id': 5}, cache_ttl=60)
+            second = startgg_client.execute('query P { player { id } }', {'id': 5}, cache_ttl=60)
+        self.assertEqual(first, second)
+        self.assertEqual(post.call_count, 1)
+
+    def test_locked_cache_degrades_to_a_miss(self):
+        self.cache.set('a', {'v': 1}, ttl=10)
+        self.cache._connection().execute('PRAGMA busy_timeout = 0')
+        locker = sqlite3.connect(self.path, isolation_level=None)
+        locker.execute('BEGIN EXCLUSIVE')
+        try:
+            self.assertIsNone(self.cache.get('a'))
+            self.assertIsNone(self.cache.get_stale('a'))
+            self.cache.set('b', {'v': 2}, ttl=10)
+
+            ok = mock.Mock(status_code=200, headers={})
+            ok.json.return_value = {'data': {'player': {'id': 5}}}
+            with mock.patch.object(requests.Session, 'post', return_value=ok) as post:
+                data = startgg_client.execute('query P { player { id } }', {'id': 5}, cache_ttl=60)
+            self.assertEqual(data, {'data': {'player': {'id': 5}}})
+            post.assert_called_once()
+        finally:
+            locker.execute('ROLLBACK')
+            locker.close()
+        self.assertEqual(self.cache.get('a'), {'v': 1})
+        self.assertIsNone(self.cache.get('b'))
+
+
+def _player_node(player_id):
+    return {
+        'id': player_id, 'gamerTag': f'tag{player_id}', 'prefix': None,
+        'user': {'name': None, 'slug': f'user/{player_id}', 'location': {'country': 'Colombia', 'city': None},
+                 'authorizations': [{'type': 'TWITTER', 'externalUsername': f'tw{player_id}'}]},
+    }
+
+
+class PlayersBulkTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        response_cache.set_response_cache(response_cache.ResponseCache(path=self.path))
+        self.queries = []
+
+    def tearDown(self):
+        response_cache.set_response_cache(None)
+        os.remove(self.path)
+
+    def fake_execute(self, query, variables=None, timeout=None, cache_ttl=None):
+        self.queries.append(variables)
+        if len(variables) > 2:
+            return {'errors': [{'message': 'Your query complexity is too high'}]}
+        # el jugador 3 no existe en start.gg
+        return {'data': {alias: (_player_node(pid) if pid != 3 else None) for alias, pid in variables.items()}}
+
+    def test_aliased_batches_split_on_complexity_and_reuse_cache(self):
+        with mock.patch.object(startgg_client, 'execute', side_effect=self.fake_execute):
+            details = getPlayerDetails.get_players_details_bulk([1, 2, 3, 1], batch_size=3)
+            again = getPlayerDetails.get_players_details_bulk([1, 2])
+        # lote de 3 rechazado por complejidad -> partido en 1 + 2
+        self.assertEqual(self.queries, [{'p0': 1, 'p1': 2, 'p2': 3}, {'p0': 1}, {'p0': 2, 'p1': 3}])
+        self.assertEqual(details[2]['GamerTag'], 'tag2')
+        self.assertEqual(details[2]['Twitter'], 'tw2')
+        self.assertEqual(details[2]['Slug'], 'user/2')
+        self.assertIn('error', details[3])
+        self.assertEqual(again, {1: details[1], 2: details[2]})  # servido desde la caché, sin peticiones
+
+    def test_transport_errors_fail_the_whole_batch_without_splitting(self):
+        for error in (requests.exceptions.ReadTimeout('timeout'), circuit_breaker.CircuitOpenError('abierto')):
+            self.queries = []
+            def fail(query, variables=None, timeout=None, cache_ttl=None):
+                self.queries.append(variables)
+                raise error
+            with mock.patch.object(startgg_client, 'execute', side_effect=fail):
+                details = getPlayerDetails.get_players_details_bulk([1, 2, 3, 4], batch_size=4)
+            self.assertEqual(len(self.queries), 1)
+            self.assertEqual(details, {pid: {'error': str(error)} for pid in [1, 2, 3, 4]})
+
+
+class AsyncIngestTests(SimpleTestCase):
+    """El motor asíncrono contra un start.gg de mentira (httpx.MockTransport)."""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        response_cache.set_response_cache(response_cache.ResponseCache(path=self.path))
+        rate_limiter.set_rate_limiter(rate_limiter.TokenBucket(limit=1000, window=1, burst=1000))
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def tearDown(self):
+        response_cache.set_response_cache(None)
+        rate_limiter.set_rate_limiter(None)
+        os.remove(self.path)
+
+    def page(self, name, nodes, page, total_pages):
+        return {name: {'pageInfo': {'total': None, 'totalPages': total_pages}, 'nodes': nodes[page - 1]}}
+
+    def stand_in(self, payload):
+        query, v = payload['query'], payload['variables']
+        if 'IngestTournament' in query:
+            if v['id'] == 'roto':
+                return {'errors': [{'message': 'not found'}]}
+            return {'data': {'tournament': {
+                'id': v['id'], 'name': 'Torneo', 'endAt': None,
+                'events': [{'id': 10, 'name': 'Singles', 'state': 'ACTIVE', 'numEntrants': 4}],
+                'participants': self.page('p', [[{'id': 1}], [{'id': 2}]], 1, 2)['p'],
+            }}}
+        if 'IngestParticipants' in query:
+            return {'data': {'tournament': {'participants': {'nodes': [{'id': 2}]}}}}
+        if 'EventSets' in query:
+            return {'data': {'event': self.page('sets', [[{'id': 's1'}], [{'id': 's2'}], [{'id': 's3'}]], v['page'], 3)}}
+        if 'IngestStandings' in query:
+            return {'data': {'event': self.page('standings', [[{'placement': 1}]], v['page'], 1)}}
+        raise AssertionError(query)
+
+    async def handler(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return httpx.Response(200, json=self.stand_in(json.loads(request.content)))
+
+    def test_tournaments_fetched_concurrently_under_global_limit(self):
+        summary = async_ingest.run_ingestion(
+            ['t1', 't2', 'roto'], concurrency=3, transport=httpx.MockTransport(self.handler)
+        )
+        self.assertEqual(len(summary['tournaments']), 2)
+        self.assertEqual(summary['errors'][0]['tournament_id'], 'roto')
+        first = summary['tournaments'][0]
+        self.assertEqual([p['id'] for p in first['participants']], [1, 2])
+        self.assertEqual([s['id'] for s in first['events'][0]['sets']], ['s1', 's2', 's3'])
+        self.assertEqual(first['events'][0]['standings'], [{'placement': 1}])
+        self.assertEqual(self.max_in_flight, 3)
+
+    def test_blocked_limiter_and_cache_do_not_stall_the_event_loop(self):
+        class LockedLimiter(rate_limiter.TokenBucket):
+            def try_acquire(inner):
+                time.sleep(0.2)  # BEGIN IMMEDIATE esperando el bloqueo de otro proceso
+                return 0
+
+        ticks = []
+
+        async def heartbeat():
+            for _ in range(10):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def main():
+            async with async_ingest.AsyncStartggClient(
+                transport=httpx.MockTransport(self.handler), limiter=LockedLimiter()
+            ) as client:
+                beats = asyncio.create_task(heartbeat())
+                await asyncio.sleep(0.02)
+                query = 'query IngestTournament($id: ID!) { tournament(id: $id) { id } }'
+                data = await client.execute(query, {'id': 't1'}, cache_ttl=60)
+                await beats
+                return data
+
+        data = asyncio.run(main())
+        self.assertEqual(data['data']['tournament']['id'], 't1')
+        self.assertLess(max(b - a for a, b in zip(ticks, ticks[1:])), 0.15)
+
+
+class IngestPersistenceTests(TestCase):
+    """ingest_tournaments guarda torneos, jugadores nuevos y sets con los upserts de las cargas."""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        response_cache.set_response_cache(response_cache.ResponseCache(path=self.path))
+        rate_limiter.set_rate_limiter(rate_limiter.TokenBucket(limit=1000, window=1, burst=1000))
+
+    def tearDown(self):
+        response_cache.set_response_cache(None)
+        rate_limiter.set_rate_limiter(None)
+        os.remove(self.path)
+
+    def set_node(self, set_id, score):
+        return {
+            'id': set_id, 'displayScore': score,
+            'phaseGroup': {'phase': {'name': 'Pools'}, 'displayIdentifier': 'A1'},
+            'event': {'name': 'Singles', 'tournament': {'name': 'Copa'}},
+            'slots': [{'entrant': {'id': 501}}, {'entrant': {'id': 502}}],
+            'games': [{'selections': [{'entrant': {'id': 501}, 'character': {'id': 1302}}]}],
+        }
+
+    def stand_in(self, payload):
+        query, v = payload['query'], payload['variables']
+        if 'IngestTournament' in query:
+            return {'data': {'tournament': {
+                'id': v['id'], 'name': 'Copa', 'slug': 'tournament/copa', 'city': 'Medellín', 'countryCode': 'CO',
+                'startAt': 1700000000, 'endAt': 1700050000, 'numAttendees': 2,
+                'events': [{'id': 10, 'name': 'Singles', 'state': 'COMPLETED', 'numEntrants': 2}],
+                'participants': {'pageInfo': {'total': 2, 'totalPages': 1}, 'nodes': [
+                    {'id': 1, 'gamerTag': 'Ana', 'player': {'id': 101}, 'entrants': [{'id': 501}]},
+                    {'id': 2, 'gamerTag': 'Nuevo', 'player': {'id': 102}, 'user': {'slug': 'user/abc'}, 'entrants': [{'id': 502}]},
+                ]},
+            }}}
+        if 'EventSets' in query:
+            nodes = [self.set_node(9001, 'SP | Ana 3 - Nuevo 1'), self.set_node(9002, 'Ana W - Nuevo DQ')]
+            return {'data': {'event': {'sets': {'pageInfo': {'total': 2, 'totalPages': 1}, 'nodes': nodes}}}}
+        if 'IngestStandings' in query:
+            return {'data': {'event': {'standings': {'pageInfo': {'total': 1, 'totalPages': 1}, 'nodes': [
+                {'placement': 1, 'entrant': {'id': 501, 'name': 'SP | Ana'}},
+            ]}}}}
+        raise AssertionError(query)
+
+    def test_command_writes_tournaments_players_and_sets(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO Colombia_Players (ID, Gamertag, Slug, Prefijo, Nombre, Pais, Departamento, Region, Ciudad) '
+                "VALUES (101, 'Ana (perfil)', 's', 'SP', 'Ana R', 'CO', 'Antioquia', 'Andina', 'Medellín')"
+            )
+        Tournament.objects.create(id=77, tournament_name='Vieja', tier='A')
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json=self.stand_in(json.loads(request.content))))
+        run = functools.partial(async_ingest.run_ingestion, transport=transport)
+        out = io.StringIO()
+        for _ in range(2):
+            with mock.patch('Consultas.management.commands.ingest_tournaments.run_ingestion', run):
+                call_command('ingest_tournaments', '77', stdout=out, stderr=io.StringIO())
+
+        tournament = Tournament.objects.get(id=77)
+        self.assertEqual((tournament.tournament_name, tournament.winner, tournament.tier), ('Copa', 'Ana', 'A'))
+        self.assertEqual(tournament.departamento, 'Antioquia')
+        # los jugadores existentes no se sobrescriben
+        self.assertEqual(list(Player.objects.order_by('id').values_list('id', 'gamertag', 'slug')), [(101, 'Ana (perfil)', 's'), (102, 'Nuevo', 'user/abc')])
+        # el set con DQ no tiene puntuación numérica y se rechaza
+        self.assertEqual(
+            list(Set.objects.values_list('id_torneo', 'id_set', 'id_player_1', 'player_1', 'player_1_score',
+                                         'id_player_2', 'player_2_score', 'phase', 'player_1_characters')),
+            [('77', 9001, 101, 'Ana', 3, 102, 1, 'Pools', '1302')],
+        )
+        self.assertIn('sets: 0 nuevos, 1 actualizados (1 rechazados)', out.getvalue())
+
+    def test_dry_run_only_downloads(self):
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json=self.stand_in(json.loads(request.content))))
+        run = functools.partial(async_ingest.run_ingestion, transport=transport)
+        with mock.patch('Consultas.management.commands.ingest_tournaments.run_ingestion', run):
+            call_command('ingest_tournaments', '77', '--dry-run', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(Tournament.objects.exists())
+        self.assertFalse(Player.objects.values('id').exists())
+        self.assertFalse(Set.objects.values('id_set').exists())
+
+
+class TournamentDetailsPagesTests(SimpleTestCase):
+    def fake_execute(self, query, variables=None, timeout=None, cache_ttl=None):
+        self.queries.append(query)
+        page = variables['page']
+        if page == 1:
+            return {'data': {'tournament': {
+                'name': 'Major', 'endAt': None, 'events': [],
+                'participants': {'pageInfo': {'totalPages': 4}, 'nodes': [{'id': 1, 'player': {'id': 10}}]},
+            }}}
+        if page == 3:
+            return {'errors': [{'message': 'boom'}]}
+        time.sleep(0.02 if page == 2 else 0)  # la página 2 termina la última
+        return {'data': {'tournament': {'participants': {'nodes': [{'id': page, 'player': {'id': page * 10}}]}}}}
+
+    def test_later_pages_use_slim_query_and_keep_order(self):
+        self.queries = []
+        with mock.patch.object(startgg_client, 'execute', side_effect=self.fake_execute):
+            result = getTournamentDetails.get_tournament_details(1)
+        self.assertTrue(result['success'])
+        details = result['details']
+        self.assertEqual([a['participant_id'] for a in details['attendees']], [1, 2, 4])
+        self.assertEqual([f['page'] for f in details['failed_pages']], [3])
+        self.assertTrue(all('TournamentParticipantsPage' in q for q in self.queries[1:]))
+
+
+class IncrementalPlayerSyncTests(TestCase):
+    def sync(self, attendees):
+        def bulk(ids):
+            self.fetched.append(list(ids))
+            return {pid: {'ID': pid, 'GamerTag': f'tag{pid}'} for pid in ids}
+        self.fetched = []
+        request = RequestFactory().get('/sync-players/', {'tournament_id': '77'})
+        with mock.patch.object(getPlayerDetails, 'get_all_attendees_by_tournament_id', return_value=attendees), \
+                mock.patch.object(getPlayerDetails, 'get_players_details_bulk', side_effect=bulk), \
+                mock.patch.object(getPlayerDetails, '_update_or_create_player', return_value=(True, None)) as upsert:
+            response = getPlayerDetails.sync_players_from_tournament_view(request)
+        return json.loads(response.content)['summary'], upsert.call_count
+
+    def test_resync_only_touches_new_or_changed_participants(self):
+        attendees = [
+            {'participant_id': 1, 'player_id': 10, 'gamerTag': 'a'},
+            {'participant_id': 2, 'player_id': 20, 'gamerTag': 'b'},
+        ]
+        summary, writes = self.sync(attendees)
+        self.assertEqual((summary['created'], summary['unchanged'], writes), (2, 0, 2))
+
+        summary, writes = self.sync(attendees)
+        self.assertEqual((summary['unchanged'], writes), (2, 0))
+        self.assertEqual(self.fetched, [[]])
+
+        # un participante nuevo y otro que cambia de gamerTag en el torneo con detalles iguales
+        attendees = [dict(attendees[0], gamerTag='a2'), attendees[1], {'participant_id': 3, 'player_id': 30, 'gamerTag': 'c'}]
+        summary, writes = self.sync(attendees)
+        self.assertEqual(self.fetched, [[10, 30]])
+        self.assertEqual((summary['created'], summary['unchanged'], writes), (1, 2, 1))
+
+
+class PlayerSyncJobTests(TestCase):
+    def test_event_info_returns_job_and_status_reports_progress(self):
+        attendees = [{'participant_id': 1, 'player_id': 10}, {'participant_id': 2, 'player_id': None}]
+        details = {'success': True, 'details': {'name': 'T', 'attendees': attendees}}
+        with mock.patch.object(getTournamentDetails, 'get_event_summary', return_value={'tournament_id': 77}), \
+                mock.patch.object(getTournamentDetails, 'get_tournament_details', return_value=details), \
+                mock.patch.object(player_jobs, 'PLAYER_JOBS_BACKEND', 'inline'), \
+                mock.patch.object(getPlayerDetails, 'get_players_details_bulk', return_value={10: {'ID': 10}}), \
+                mock.patch.object(getPlayerDetails, '_update_or_create_player', return_value=(True, None)):
+            response = getTournamentDetails.get_event_info_view(
+                RequestFactory().get('/get-event-info/', {'event_id': 5, 'create_players': 1})
+            )
+        job = json.loads(response.content)['player_sync_job']
+        self.assertTrue(job['status_url'].endswith(f"?job_id={job['job_id']}"))
+
+        status = self.client.get('/api/player-sync-status/', {'job_id': job['job_id']}).json()
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual((status['total'], status['processed'], status['created'], status['skipped']), (2, 2, 1, 1))
+
+    def test_event_info_queues_job_without_paging_participants(self):
+        summary = {'tournament_id': 77, 'tournament_name': 'T', 'num_attendees': 2}
+        executor = mock.Mock()
+        with mock.patch.object(getTournamentDetails, 'get_event_summary', return_value=summary), \
+                mock.patch.object(startgg_client, 'execute') as execute, \
+                mock.patch.object(player_jobs, 'PLAYER_JOBS_BACKEND', 'thread'), \
+                mock.patch.object(player_jobs, '_get_executor', return_value=executor):
+            response = getTournamentDetails.get_event_info_view(
+                RequestFactory().get('/get-event-info/', {'event_id': 5, 'create_players': 1})
+            )
+        data = json.loads(response.content)
+        execute.assert_not_called()
+        self.assertNotIn('attendees_list', data)
+        job = data['player_sync_job']
+        self.assertEqual((job['status'], job['total']), ('queued', 0))
+        executor.submit.assert_called_once_with(player_jobs._run_in_thread, job['job_id'])
+
+        # el worker pagina los participantes y después hace los upserts
+        attendees = [{'participant_id': 1, 'player_id': 10}, {'participant_id': 2, 'player_id': None}]
+        details = {'success': True, 'details': {'attendees': attendees, 'failed_pages': []}}
+        with mock.patch.object(getTournamentDetails, 'get_tournament_details', return_value=details) as fetch, \
+                mock.patch.object(getPlayerDetails, 'get_players_details_bulk', return_value={10: {'ID': 10}}), \
+                mock.patch.object(getPlayerDetails, '_update_or_create_player', return_value=(True, None)):
+            player_jobs.run_player_sync_job(job['job_id'])
+        fetch.assert_called_once_with('77')
+        status = self.client.get('/api/player-sync-status/', {'job_id': job['job_id']}).json()
+        self.assertEqual((status['status'], status['total'], status['created'], status['skipped']), ('done', 2, 1, 1))
+
+
+class ReplayServerTests(SimpleTestCase):
+    def setUp(self):
+        self.recorded = tempfile.mkdtemp()
+        self.rerecorded = tempfile.mkdtemp()
+        rate_limiter.set_rate_limiter(rate_limiter.TokenBucket(limit=1000, window=1, burst=1000))
+        recorder = startgg_replay.FixtureRecorder(self.recorded)
+        for page, ids in ((1, [1, 2, 3]), (2, [4, 5])):
+            body = {'data': {'event': {'sets': {'pageInfo': {'total': 5, 'totalPages': 2}, 'nodes': [{'id': i} for i in ids]}}}}
+            recorder.record(setByTournament.EVENT_SETS_QUERY, {'eventId': 1, 'page': page, 'perPage': 3}, 200, json.dumps(body))
+
+    def tearDown(self):
+        startgg_client.set_base_url(None)
+        startgg_client.set_recorder(None)
+        startgg_client.reset_session()
+        rate_limiter.set_rate_limiter(None)
+        shutil.rmtree(self.recorded)
+        shutil.rmtree(self.rerecorded)
+
+    def test_replay_repages_with_page_size_and_records_again(self):
+        with startgg_replay.ReplayServer(self.recorded, page_size=2) as server:
+            startgg_client.set_base_url(server.url)
+            startgg_client.set_recorder(startgg_replay.FixtureRecorder(self.rerecorded))
+            pages = list(setByTournament.iter_event_sets_pages(1, concurrency=2))
+        # perPage 20 pedido, 2 servido: 3 páginas con pageInfo recalculado
+        self.assertEqual([[n['id'] for n in nodes] for nodes in pages], [[1, 2], [3, 4], [5]])
+        self.assertEqual((server.requests, server.misses), (3, 0))
+        self.assertEqual(len(os.listdir(self.rerecorded)), 3)
+
+
+class EventResultsTests(SimpleTestCase):
+    def fake_execute(self, query, variables=None, timeout=None, cache_ttl=None):
+        self.pages.append(variables['page'])
+        rows = {
+            1: [(1, 'a'), (2, 'b')],
+            2: [(2, 'b'), (3, 'c')],  # 'b' repetido al desplazarse la paginación
+            3: [(5, 'd'), (5, 'e')],  # empate en la 5a posición
+        }[variables['page']]
+        nodes = [{'placement': p, 'entrant': {'id': name, 'name': name}} for p, name in rows]
+        return {'data': {'event': {'state': 'COMPLETED', 'standings': {'pageInfo': {'total': 6, 'totalPages': 3}, 'nodes': nodes}}}}
+
+    def test_pages_from_standings_total_and_dedupe(self):
+        self.pages = []
+        with mock.patch.object(startgg_client, 'execute', side_effect=self.fake_execute):
+            results = getEventResults.get_event_results(1)
+        self.assertEqual(sorted(self.pages), [1, 2, 3])
+        self.assertEqual([(r['placement'], r['name']) for r in results], [(1, 'a'), (2, 'b'), (3, 'c'), (5, 'd'), (5, 'e')])
+
+
+class EventSummaryTests(SimpleTestCase):
+    summary_response = {'data': {'event': {
+        'id': 5, 'name': 'Singles', 'startAt': 1700000000, 'state': 'COMPLETED', 'numEntrants': 48,
+        'tournament': {'id': 77, 'name': 'Eje Smash', 'slug': 'tournament/eje', 'city': 'Pereira',
+                       'countryCode': 'CO', 'numAttendees': 52, 'participants': {'pageInfo': {'total': 52}}},
+        'standings': {'nodes': [{'placement': 1, 'entrant': {'name': 'SP | Ganador'}}]},
+    }}}
+
+    def test_event_info_costs_one_upstream_call_without_attendees(self):
+        with mock.patch.object(startgg_client, 'execute', return_value=self.summary_response) as execute, \
+                mock.patch.object(getTournamentDetails, 'get_tournament_details') as details:
+            response = getTournamentDetails.get_event_info_view(RequestFactory().get('/get-event-info/', {'event_id': 5}))
+            info = eventInfo.get_event_info(5)
+        data = json.loads(response.content)
+        self.assertEqual(execute.call_count, 2)  # una por llamada
+        details.assert_not_called()
+        self.assertNotIn('attendees_list', data)
+        self.assertEqual((data['attendees'], data['num_entrants'], data['department']), (52, 48, 'Risaralda'))
+        self.assertEqual((info['attendees'], info['winner'], info['start_date']), (52, 'Ganador', '2023-11-14'))
+
+
+class TournamentCrawlerTests(TestCase):
+    """Rastreo por ventanas de fechas contra un start.gg de mentira, con upsert y reanudación."""
+
+    def setUp(self):
+        rate_limiter.set_rate_limiter(rate_limiter.TokenBucket(limit=1000, window=1, burst=1000))
+        self.requests = []
+
+    def tearDown(self):
+        rate_limiter.set_rate_limiter(None)
+
+    def day(self, ts):
+        return datetime.fromtimestamp(ts, tz=dt_timezone.utc).date()
+
+    def node(self, tid, day):
+        return {
+            'id': tid, 'name': f'Torneo {tid}', 'slug': f'tournament/t-{tid}', 'city': None, 'countryCode': 'CO',
+            'startAt': tournament_crawler._timestamp(day) + 3600, 'numAttendees': 30,
+            'events': [
+                {'slug': f'tournament/t-{tid}/event/dobles', 'numEntrants': 8, 'standings': {'nodes': []}},
+                {'slug': f'tournament/t-{tid}/event/singles', 'numEntrants': 24,
+                 'standings': {'nodes': [{'entrant': {'name': 'SPN | Ganador'}}]}},
+            ],
+        }
+
+    def handler(self, request):
+        v = json.loads(request.content)['variables']
+        self.requests.append((v['afterDate'], v['page']))
+        start = self.day(v['afterDate'])
+        if start == self.broken:
+            return httpx.Response(200, json={'errors': [{'message': 'boom'}]})
+        # dos torneos por ventana, uno por página
+        base = int(start.strftime('%Y%m%d')) * 10
+        nodes = [self.node(base + v['page'], start)]
+        return httpx.Response(200, json={'data': {'tournaments': {
+            'pageInfo': {'total': 2, 'totalPages': 2}, 'nodes': nodes,
+        }}})
+
+    def crawl(self, **kwargs):
+        return tournament_crawler.crawl_country(
+            'CO', date(2024, 1, 1), date(2024, 1, 30), window_days=10, concurrency=2,
+            transport=httpx.MockTransport(self.handler), **kwargs
+        )
+
+    def test_windows_are_split_inclusively(self):
+        windows = tournament_crawler.date_windows(date(2024, 1, 1), date(2024, 1, 25), 10)
+        self.assertEqual(windows, [
+            (date(2024, 1, 1), date(2024, 1, 10)),
+            (date(2024, 1, 11), date(2024, 1, 20)),
+            (date(2024, 1, 21), date(2024, 1, 25)),
+        ])
+
+    def test_crawl_upserts_and_resumes_from_checkpoint(self):
+        Tournament.objects.create(id=202401011, tournament_name='Viejo', tier='S', winner='Manual')
+        self.broken = date(2024, 1, 21)
+        summary = self.crawl()
+        self.assertEqual(summary['crawled_windows'], 2)
+        self.assertEqual((summary['created'], summary['updated']), (3, 1))
+        self.assertEqual(len(summary['errors']), 1)
+
+        updated = Tournament.objects.get(id=202401011)
+        self.assertEqual(updated.tournament_name, 'Torneo 202401011')
+        self.assertEqual(updated.tier, 'S')
+        # el ganador y la URL salen del evento con más participantes
+        self.assertEqual(updated.winner, 'Ganador')
+        self.assertEqual(updated.attendees, 24)
+        self.assertEqual(updated.url, 'https://www.start.gg/tournament/t-202401011/event/singles')
+        self.assertEqual(updated.date, date(2024, 1, 1))
+
+        # segunda ejecución: sólo se pide la ventana que falló
+        self.broken = None
+        self.requests = []
+        summary = self.crawl()
+        self.assertEqual(summary['skipped_windows'], 2)
+        self.assertEqual({self.day(ts) for ts, _ in self.requests}, {date(2024, 1, 21)})
+        self.assertEqual(Tournament.objects.count(), 6)
+
+        summary = self.crawl(resume=False)
+        self.assertEqual((summary['created'], summary['updated']), (0, 6))
+
+
+class UpstreamResilienceTests(SimpleTestCase):
+    """Peticiones idénticas agrupadas y circuit breaker delante de start.gg."""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.clock = FakeClock()
+        self.cache = response_cache.ResponseCache(path=self.path, clock=self.clock)
+        response_cache.set_response_cache(self.cache)
+        rate_limiter.set_rate_limiter(rate_limiter.TokenBucket(limit=1000, window=1, burst=1000))
+        self.breaker = circuit_breaker.CircuitBreaker(window=4, min_calls=4, error_rate=0.5, open_seconds=30, clock=self.clock)
+        circuit_breaker.set_circuit_breaker(self.breaker)
+        single_flight.set_single_flight(None)
+
+    def tearDown(self):
+        response_cache.set_response_cache(None)
+        rate_limiter.set_rate_limiter(None)
+        circuit_breaker.set_circuit_breaker(None)
+        single_flight.set_single_flight(None)
+        startgg_client.reset_session()
+        os.remove(self.path)
+
+    def test_concurrent_identical_queries_share_one_request(self):
+        release = threading.Event()
+        ok = mock.Mock(status_code=200, headers={})
+        ok.json.return_value = {'data': {'event': {'id': 7}}}
+
+        def slow_post(*args, **kwargs):
+            release.wait(5)
+            return ok
+
+        results = []
+        with mock.patch.object(requests.Session, 'post', side_effect=slow_post) as post:
+            threads = [
+                threading.Thread(target=lambda: results.append(startgg_client.execute('query E { event { id } }', {'id': 7})))
+                for _ in range(5)
+            ]
+            for t in threads:
+                t.start()
+            while single_flight.get_single_flight().stats()['coalesced'] < 4:
+                time.sleep(0.01)
+            release.set()
+            for t in threads:
+                t.join()
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(results, [{'data': {'event': {'id': 7}}}] * 5)
+
+    def test_breaker_opens_on_errors_and_recovers(self):
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, circuit_breaker.OPEN)
+        with mock.patch.object(requests.Session, 'post') as post:
+            with self.assertRaises(circuit_breaker.CircuitOpenError):
+                startgg_client.post('query E { event { id } }')
+            post.assert_not_called()
+
+        # tras la espera se deja pasar una sola llamada de prueba
+        self.clock.now += 30
+        self.breaker.before_call()
+        with self.assertRaises(circuit_breaker.CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.stats()['state'], circuit_breaker.CLOSED)
+
+    def open_until_trial(self):
+        for _ in range(4):
+            self.breaker.record_failure()
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, circuit_breaker.HALF_OPEN)
+
+    def test_trial_released_when_limiter_raises(self):
+        self.open_until_trial()
+        ok = mock.Mock(status_code=200, headers={}, content=b'{}', text='{}')
+        limiter = rate_limiter.get_rate_limiter()
+        with mock.patch.object(limiter, 'acquire', side_effect=sqlite3.OperationalError('database is locked')):
+            with self.assertRaises(sqlite3.OperationalError):
+                startgg_client.post('query E { event { id } }')
+        self.assertEqual(self.breaker.state, circuit_breaker.HALF_OPEN)
+
+        # la siguiente llamada vuelve a ser la prueba y cierra el circuito
+        with mock.patch.object(requests.Session, 'post', return_value=ok) as post:
+            startgg_client.post('query E { event { id } }')
+        post.assert_called_once()
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+
+    def test_trial_released_when_async_call_is_cancelled(self):
+        self.open_until_trial()
+        started = asyncio.Event()
+
+        async def hang(request):
+            started.set()
+            await asyncio.sleep(60)
+
+        async def run():
+            async with async_ingest.AsyncStartggClient(transport=httpx.MockTransport(hang)) as client:
+                task = asyncio.create_task(client.post('query E { event { id } }'))
+                await started.wait()
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+
+        asyncio.run(run())
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+
+    def test_open_circuit_serves_stale_cache(self):
+        query = 'query E { event { id } }'
+        self.cache.set(self.cache.make_key(query, {'id': 7}), {'data': {'event': {'id': 7}}}, ttl=10)
+        self.clock.now += 60
+        with mock.patch.object(requests.Session, 'post', side_effect=requests.exceptions.ReadTimeout('lento')):
+            for _ in range(4):
+                with self.assertRaises(requests.exceptions.ReadTimeout):
+                    startgg_client.execute(query, {'id': 7}, cache_ttl=10)
+            self.assertEqual(self.breaker.state, circuit_breaker.OPEN)
+            self.assertEqual(startgg_client.execute(query, {'id': 7}, cache_ttl=10), {'data': {'event': {'id': 7}}})
+            with self.assertRaises(circuit_breaker.CircuitOpenError):
+                startgg_client.execute(query, {'id': 8}, cache_ttl=10)
+        self.assertEqual(self.breaker.stats()['stale_served'], 1)
+
+        response = views.api_upstream_status(RequestFactory().get('/api/upstream-status/'))
+        self.assertEqual(json.loads(response.content)['circuit_breaker']['state'], circuit_breaker.OPEN)
+
+
+class UpstreamMetricsTests(SimpleTestCase):
+    """Cada llamada a start.gg queda contada por operación y se exporta en /metrics."""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.clock = FakeClock()
+        response_cache.set_response_cache(response_cache.ResponseCache(path=self.path))
+        rate_limiter.set_rate_limiter(rate_limiter.TokenBucket(limit=100, window=1, clock=self.clock, sleep=self.clock.sleep))
+        upstream_metrics.reset()
+
+    def tearDown(self):
+        response_cache.set_response_cache(None)
+        rate_limiter.set_rate_limiter(None)
+        startgg_client.reset_session()
+        upstream_metrics.reset()
+        os.remove(self.path)
+
+    def test_retries_bytes_and_cache_are_recorded(self):
+        throttled = mock.Mock(status_code=429, headers={'Retry-After': '2'}, content=b'{}')
+        ok = mock.Mock(status_code=200, headers={}, content=b'{"data": {"event": {"id": 3}}}')
+        ok.json.return_value = {'data': {'event': {'id': 3}}}
+        with mock.patch.object(requests.Session, 'post', side_effect=[throttled, ok]), \
+                mock.patch('builtins.print') as printed:
+            startgg_client.execute('query EventQ { event { id } }', {'id': 3}, cache_ttl=60)
+            startgg_client.execute('query EventQ { event { id } }', {'id': 3}, cache_ttl=60)
+
+        self.assertEqual(upstream_metrics.REQUESTS.value('EventQ', '429'), 1)
+        self.assertEqual(upstream_metrics.REQUESTS.value('EventQ', '200'), 1)
+        self.assertEqual(upstream_metrics.RETRIES.value('EventQ'), 1)
+        self.assertEqual(upstream_metrics.RESPONSE_BYTES.value('EventQ'), 2 + len(ok.content))
+        self.assertEqual(upstream_metrics.RATE_LIMIT_WAIT.value('EventQ'), 2.0)
+        self.assertEqual(upstream_metrics.CACHE.value('EventQ', 'miss'), 1)
+        self.assertEqual(upstream_metrics.CACHE.value('EventQ', 'hit'), 1)
+        self.assertEqual(upstream_metrics.LATENCY.count('EventQ'), 2)
+
+        logs = [json.loads(c.args[0]) for c in printed.call_args_list if c.args and str(c.args[0]).startswith('{')]
+        self.assertEqual([(l['operation'], l['retries'], l['cache']) for l in logs], [('EventQ', 1, 'miss'), ('EventQ', 0, 'hit')])
+
+    def test_metrics_endpoint_renders_prometheus_text(self):
+        upstream_metrics.REQUESTS.inc('EventQ', '200')
+        upstream_metrics.LATENCY.observe(0.2, 'EventQ')
+        response = views.metrics_view(RequestFactory().get('/metrics'))
+        body = response.content.decode()
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('# TYPE startgg_requests_total counter', body)
+        self.assertIn('startgg_requests_total{operation="EventQ",status="200"} 1', body)
+        self.assertIn('startgg_request_duration_seconds_bucket{operation="EventQ",le="0.25"} 1', body)
+        self.assertIn('startgg_request_duration_seconds_bucket{operation="EventQ",le="0.1"} 0', body)
+        self.assertIn('startgg_circuit_state{state="closed"} 1', body)
+
+
+def _xlsx_upload(df, name='datos.xlsx'):
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class TournamentUploadTests(TestCase):
+    """Carga masiva de torneos: conversión por columnas, executemany y resumen."""
+
+    def frame(self, n, start=1):
+        return pd.DataFrame({
+            'Nombre del Torneo': [f'Torneo {i}' for i in range(start, start + n)],
+            'Ganador': ['Alguien'] * n,
+            'Asistentes': [16] * n,
+            'Fecha': ['2024-03-0%d' % (1 + i % 9) for i in range(n)],
+            'ID': list(range(start, start + n)),
+        })
+
+    def upload(self, df, **data):
+        request = RequestFactory().post('/upload/', dict(data, file=_xlsx_upload(df)))
+        with mock.patch.object(views_uploads, 'render', side_effect=lambda req, tpl, ctx=None: ctx) as render:
+            views_uploads.upload_excel(request)
+        return render.call_args.args[2]['summary']
+
+    def test_bulk_insert_reports_conflicts_and_invalid_rows(self):
+        Tournament.objects.create(id=2, tournament_name='Guardado', tier='A')
+        df = self.frame(3000)
+        df['ID'] = df['ID'].astype(object)
+        df.loc[10, 'ID'] = 'x'
+        df = pd.concat([df, self.frame(1, start=5)])
+        summary = self.upload(df)
+        self.assertEqual(summary['rows'], 3001)
+        self.assertEqual(summary['invalid'], 1)
+        self.assertEqual(summary['errors'], [{'row': 12, 'error': 'ID vacío o no numérico'}])
+        self.assertEqual(summary['duplicates'], 1)
+        self.assertEqual((summary['inserted'], summary['conflicts'], summary['updated']), (2998, 1, 0))
+        self.assertEqual(Tournament.objects.count(), 2999)
+        self.assertEqual(Tournament.objects.get(id=2).tournament_name, 'Guardado')
+        saved = Tournament.objects.get(id=3)
+        self.assertEqual((saved.attendees, str(saved.date)), (16, '2024-03-03'))
+
+    def test_update_existing_overwrites_but_keeps_missing_values(self):
+        Tournament.objects.create(id=2, tournament_name='Guardado', tier='A', ciudad='Medellín')
+        summary = self.upload(self.frame(3), update_existing='1')
+        self.assertEqual((summary['inserted'], summary['updated']), (2, 1))
+        saved = Tournament.objects.get(id=2)
+        self.assertEqual((saved.tournament_name, saved.tier, saved.ciudad), ('Torneo 2', 'A', 'Medellín'))
+
+
+PRODUCTION_SETS_TABLE = """
+CREATE TABLE IF NOT EXISTS "Colombia_Sets" (
+    "id_torneo" varchar(100) NOT NULL,
+    "id_set" INTEGER,
+    "id_player_1" INTEGER,
+    "player_1" varchar(100) NOT NULL,
+    "player_1_score" INTEGER NOT NULL,
+    "id_player_2" INTEGER,
+    "player_2" varchar(100) NOT NULL,
+    "player_2_score" INTEGER NOT NULL,
+    "phase" varchar(100) NOT NULL,
+    "event_name" varchar(100) NOT NULL,
+    "tournament_name" varchar(100) NOT NULL,
+    "player_1_characters" varchar(255) NOT NULL,
+    "player_2_characters" varchar(255) NOT NULL,
+    PRIMARY KEY("id_set")
+)
+"""
+
+
+def _pending_operations(model_name):
+    """Operaciones que makemigrations generaría para el modelo `model_name`."""
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    autodetector = MigrationAutodetector(loader.project_state(), ProjectState.from_apps(apps))
+    changes = autodetector.changes(graph=loader.graph)
+    return [
+        op for migration in changes.get('Consultas', []) for op in migration.operations
+        if getattr(op, 'model_name', getattr(op, 'name', '')).lower() == model_name
+    ]
+
+
+class SetUploadTests(TestCase):
+    """Carga de sets idempotente: upsert sobre (id_torneo, id_set) y errores por fila."""
+
+    def frame(self):
+        return pd.DataFrame({
+            'ID Torneo': [1403856, 1403856, 1403856, 1403856, 1403856],
+            'ID Set': [1, 2, 3, 2, 'x'],
+            'Jugador 1': ['A', 'B', 'C', 'B2', 'D'],
+            'Puntuación Jugador 1': [2, 2, None, 3, 2],
+            'Jugador 2': ['E', 'F', 'G', 'F', 'H'],
+            'Puntuación Jugador 2': [0, 1, 1, 1, 0],
+            'Ronda': ['Pools'] * 5,
+        })
+
+    def test_natural_key_is_recorded_in_migration_state(self):
+        pending = [type(op).__name__ for op in _pending_operations('set')]
+        self.assertNotIn('AlterUniqueTogether', pending)
+        self.assertNotIn('AddField', pending)
+
+    def upload(self, df):
+        request = RequestFactory().post('/upload/', {'file': _xlsx_upload(df)})
+        with mock.patch.object(views_uploads, 'render', side_effect=lambda req, tpl, ctx=None: ctx) as render:
+            views_uploads.upload_excelsets(request)
+        return render.call_args.args[2]['summary']
+
+    def test_reupload_is_idempotent_and_reports_rows(self):
+        summary = self.upload(self.frame())
+        self.assertEqual((summary['inserted'], summary['updated'], summary['duplicates']), (2, 0, 1))
+        self.assertEqual(summary['errors'], [
+            {'row': 4, 'error': 'Puntuación vacía o no numérica'},
+            {'row': 6, 'error': 'ID Set vacío o no numérico'},
+        ])
+        # la última fila repetida del archivo es la que queda
+        self.assertEqual(Set.objects.get(id_torneo='1403856', id_set=2).player_1, 'B2')
+
+        summary = self.upload(self.frame())
+        self.assertEqual((summary['inserted'], summary['updated']), (0, 2))
+        self.assertEqual(Set.objects.count(), 2)
+
+    def test_upload_into_handmade_production_table(self):
+        # esquema real de db/CSDB.db: id_set es el INTEGER PRIMARY KEY y no hay columna id
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE "Colombia_Sets"')
+            cursor.execute(PRODUCTION_SETS_TABLE)
+        sets_natural_key = importlib.import_module('Consultas.migrations.0006_sets_natural_key')
+        sets_natural_key.add_sets_unique_index(None, types.SimpleNamespace(connection=connection))
+
+        df = self.frame().iloc[[0, 1]].assign(**{
+            'ID Jugador 1': [1, 2], 'ID Jugador 2': [3, 4], 'Phase': 'Pools', 'Event Name': 'Singles',
+            'Tournament Name': 'T', 'Player 1 Characters': 'Fox', 'Player 2 Characters': 'Falco',
+        })
+        summary = self.upload(df)
+        self.assertEqual((summary['inserted'], summary['updated'], summary['errors']), (2, 0, []))
+        summary = self.upload(df.assign(**{'Jugador 1': ['A2', 'B2']}))
+        self.assertEqual((summary['inserted'], summary['updated'], summary['errors']), (0, 2, []))
+        self.assertEqual(list(Set.objects.order_by('id_set').values_list('id_set', 'player_1')), [(1, 'A2'), (2, 'B2')])
+
+
+class ExcelChunkTests(TestCase):
+    """Lectura por bloques del XLSX: numeración de filas y rondas finales entre bloques."""
+
+    def frame(self):
+        df = pd.DataFrame({
+            'ID Torneo': [7] * 9 + [None, None],
+            'ID Set': [1, 2, None, 4, 5, 'x', 7, 8, 9, None, None],
+            'Jugador 1': ['A'] * 9 + [None, None],
+            'Puntuación Jugador 1': [2] * 9 + [None, None],
+            'Jugador 2': ['B'] * 9 + [None, None],
+            'Puntuación Jugador 2': [1] * 9 + [None, None],
+        })
+        # fila 4 vacía en medio del archivo, dos vacías al final
+        df.loc[2] = None
+        return df
+
+    def test_chunks_keep_row_numbers_and_final_rounds(self):
+        chunks = list(upload_ingest.read_excel_chunks(_xlsx_upload(self.frame()), chunk_size=3))
+        # las filas vacías no se entregan, pero cuentan en '_row'
+        self.assertEqual([list(c['_row']) for c in chunks], [[2, 3, 5], [6, 7, 8], [9, 10]])
+        self.assertEqual(list(chunks[0].columns)[:2], ['ID Torneo', 'ID Set'])
+
+        summary = upload_ingest.import_sets(iter(chunks))
+        self.assertEqual((summary['rows'], summary['inserted']), (8, 7))
+        self.assertEqual(summary['errors'], [{'row': 7, 'error': 'ID Set vacío o no numérico'}])
+        rondas = dict(Set.objects.values_list('id_set', 'ronda'))
+        # los 7 últimos sets válidos abarcan los tres bloques
+        self.assertEqual((rondas[9], rondas[4], rondas[2], rondas[1]),
+                         ('Grand Final', 'Losers Semifinal', 'Winners Quarterfinal', 'Losers Quarterfinal'))
+
+
+class TextUploadTests(TestCase):
+    """Subidas en CSV y NDJSON: mismas columnas y validación que el Excel."""
+
+    def upload(self, view, name, content):
+        request = RequestFactory().post('/upload/', {'file': SimpleUploadedFile(name, content.encode('utf-8'))})
+        with mock.patch.object(views_uploads, 'render', side_effect=lambda req, tpl, ctx=None: ctx):
+            return view(request)
+
+    def test_csv_tournaments(self):
+        content = (
+            '\ufeffNombre del Torneo;Ganador;Asistentes;Fecha;ID\r\n'
+            'Copa;Ana;32;2024-03-01;10\r\n'
+            ';;;;\r\n'
+            '"Liga; Final";Luis;;2024-03-02;x\r\n'
+            'Abierto;;16;;11\r\n'
+            '\r\n'
+        )
+        summary = self.upload(views_uploads.upload_excel, 'torneos.csv', content)['summary']
+        self.assertEqual((summary['rows'], summary['inserted']), (3, 2))
+        self.assertEqual(summary['errors'], [{'row': 4, 'error': 'ID vacío o no numérico'}])
+        self.assertEqual(
+            list(Tournament.objects.order_by('id').values_list('tournament_name', 'attendees', 'date')),
+            [('Copa', 32, date(2024, 3, 1)), ('Abierto', 16, None)],
+        )
+
+    def test_ndjson_sets_and_bad_line(self):
+        lines = [
+            {'ID Torneo': '99', 'ID Set': 1, 'Jugador 1': 'A', 'Puntuación Jugador 1': 2,
+             'Jugador 2': 'B', 'Puntuación Jugador 2': 0, 'Ronda': 'Pools'},
+            {'ID Torneo': 99, 'ID Set': 2, 'Puntuación Jugador 1': 'dq', 'Puntuación Jugador 2': 0, 'Ronda': 'Pools'},
+        ]
+        # línea en blanco en medio y salto de línea final
+        content = '\n\n'.join(json.dumps(line) for line in lines) + '\n'
+        summary = self.upload(views_uploads.upload_excelsets, 'sets.ndjson', content)['summary']
+        self.assertEqual((summary['rows'], summary['inserted']), (2, 1))
+        # en NDJSON la fila es el número de línea
+        self.assertEqual(summary['errors'], [{'row': 3, 'error': 'Puntuación vacía o no numérica'}])
+
+        response = self.upload(views_uploads.upload_excelsets, 'sets.ndjson', content + '{"ID Torneo": \n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Línea 4', response.content.decode('utf-8'))
+
+    def test_unsupported_extension(self):
+        response = self.upload(views_uploads.upload_excelsets, 'sets.txt', 'x')
+        self.assertEqual(response.status_code, 400)
+
+
+class HotColumnIndexTests(TestCase):
+    """Índices de la migración 0008 sobre Colombia_Sets y Colombia_Players."""
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    def test_indexes_exist_and_are_used(self):
+        with connection.cursor() as cursor:
+            indexes = set(connection.introspection.get_constraints(cursor, 'Colombia_Sets'))
+            indexes |= set(connection.introspection.get_constraints(cursor, 'Colombia_Players'))
+        for name in ('colombia_sets_p1_p2_idx', 'colombia_sets_p2_p1_idx', 'colombia_sets_tourn_name_idx',
+                     'colombia_sets_event_name_idx', 'colombia_players_tag_nocase'):
+            self.assertIn(name, indexes)
+
+        head_to_head = Set.objects.filter(Q(id_player_1=1, id_player_2=2) | Q(id_player_1=2, id_player_2=1))
+        self.assertNotIn('SCAN', self.plan(head_to_head))
+        self.assertIn('colombia_sets_tourn_name_idx', self.plan(Set.objects.filter(tournament_name='Copa')))
+        self.assertIn('colombia_players_tag_nocase',
+                      self.plan(Player.objects.filter(gamertag__istartswith='ab').values('id')))
+
+    def test_indexes_are_recorded_in_migration_state(self):
+        for model_name in ('set', 'player', 'tournament'):
+            pending = [type(op).__name__ for op in _pending_operations(model_name)]
+            self.assertNotIn('AddIndex', pending, model_name)
+
+
+class ListingTests(TestCase):
+    """Listados JSON con paginación por cursor y filtros."""
+
+    def setUp(self):
+        Tournament.objects.bulk_create([
+            Tournament(id=1, tournament_name='A', pais='CO', region='Andina', tier='C', date=date(2024, 1, 5)),
+            Tournament(id=2, tournament_name='B', pais='CO', region='Caribe', tier='B', date=date(2024, 3, 1)),
+            Tournament(id=3, tournament_name='C', pais='CO', region='Andina', tier='B', date=date(2024, 3, 1)),
+            Tournament(id=4, tournament_name='D', pais='MX', region='Norte', tier='A', date=None),
+            Tournament(id=5, tournament_name='E', pais='co', region='Andina', tier='B', date=date(2023, 12, 1)),
+        ])
+        upload_ingest.import_sets([pd.DataFrame({
+            'ID Torneo': [3, 3, 2, 10], 'ID Set': [2, 1, 7, 1],
+            'ID Jugador 1': [100, 101, 100, 102], 'Jugador 1': ['a', 'b', 'a', 'c'], 'Puntuación Jugador 1': [2, 2, 2, 2],
+            'ID Jugador 2': [101, 100, 102, 100], 'Jugador 2': ['b', 'a', 'c', 'a'], 'Puntuación Jugador 2': [0, 1, 0, 1],
+            'Ronda': ['Pools'] * 4,
+        })])
+
+    def walk(self, view, **params):
+        pages = []
+        while True:
+            response = view(RequestFactory().get('/', params))
+            self.assertEqual(response.status_code, 200)
+            body = json.loads(response.content)
+            pages.append(body['results'])
+            if not body['has_more']:
+                return pages
+            params['cursor'] = body['next_cursor']
+
+    def test_tournaments_by_date_with_null_dates_last(self):
+        pages = self.walk(listings.list_tournaments_view, per_page=2)
+        self.assertEqual([[t['id'] for t in page] for page in pages], [[3, 2], [1, 5], [4]])
+        self.assertEqual(pages[0][0]['date'], '2024-03-01')
+
+        pages = self.walk(listings.list_tournaments_view, per_page=1, country='co', tier='b', order='id')
+        self.assertEqual([t['id'] for page in pages for t in page], [2, 3, 5])
+
+    def test_sets_keyset_and_filters(self):
+        pages = self.walk(listings.list_sets_view, per_page=3)
+        self.assertEqual([(s['id_torneo'], s['id_set']) for page in pages for s in page],
+                         [('10', 1), ('2', 7), ('3', 1), ('3', 2)])
+        pages = self.walk(listings.list_sets_view, per_page=1, region='andina', player_id=101)
+        self.assertEqual([(s['id_torneo'], s['id_set']) for page in pages for s in page], [('3', 1), ('3', 2)])
+
+    def test_players_and_bad_parameters(self):
+        with connection.cursor() as cursor:
+            for player_id, pais in [(7, 'Colombia'), (3, 'Colombia'), (5, 'Peru')]:
+                cursor.execute(
+                    'INSERT INTO Colombia_Players (ID, Gamertag, Slug, Prefijo, Nombre, Pais, Departamento, Region, Ciudad) '
+                    "VALUES (%s, 'x', 's', 'p', 'n', %s, 'd', 'r', 'c')", [player_id, pais]
+                )
+        pages = self.walk(listings.list_players_view, per_page=1, country='colombia')
+        self.assertEqual([p['id'] for page in pages for p in page], [3, 7])
+
+        for params in ({'cursor': 'nope'}, {'per_page': 'x'}, {'order': 'name'}):
+            response = listings.list_tournaments_view(RequestFactory().get('/', params))
+            self.assertEqual(response.status_code, 400)
+
+    def test_date_page_uses_index_without_sorting(self):
+        queryset = Tournament.objects.order_by('-date', '-id').values('id')[:10]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('colombia_tournament_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class PlayerUploadTests(TestCase):
+    """Subida de jugadores: start.gg en lotes concurrentes, un solo upsert y progreso en el trabajo."""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        response_cache.set_response_cache(response_cache.ResponseCache(path=self.path))
+        self.threads = set()
+        self.progress = []
+
+    def tearDown(self):
+        response_cache.set_response_cache(None)
+        os.remove(self.path)
+
+    def fake_execute(self, query, variables=None, timeout=None, cache_ttl=None):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        return {'data': {alias: _player_node(pid) for alias, pid in variables.items()}}
+
+    def frame(self):
+        ids = [10, 11, 12, 13, 14, 15, None, None]
+        return pd.DataFrame({
+            'ID': ids,
+            'GamerTag': ['x10', 'x11', 'x12', 'x13', 'x14', 'x15', 'EXISTENTE', 'nadie'],
+            'Slug': ['s'] * 8, 'Prefijo': ['p'] * 8, 'Nombre': ['n'] * 8, 'Pais': ['CO'] * 8,
+            'Departamento': ['Antioquia'] * 8, 'Region': ['Andina'] * 8, 'Ciudad': ['Medellín'] * 8,
+        })
+
+    def read_chunks(self, file, chunk_size):
+        chunks, first_row = upload_ingest.read_upload_chunks(file, chunk_size=chunk_size)
+
+        def counted():
+            for df in chunks:
+                # jugadores ya guardados cuando se entrega cada bloque
+                self.saved_before_chunk.append(Player.objects.count())
+                yield df
+        return counted(), first_row
+
+    def upload(self, df, chunk_size=upload_ingest.UPLOAD_CHUNK_ROWS):
+        request = RequestFactory().post('/upload/', {'excel_file': _xlsx_upload(df, 'jugadores.xlsx')})
+        self.saved_before_chunk = []
+        with mock.patch.object(player_jobs, 'PLAYER_JOBS_BACKEND', 'inline'), \
+                mock.patch.object(views_uploads, 'read_upload_chunks', functools.partial(self.read_chunks, chunk_size=chunk_size)), \
+                mock.patch.object(player_jobs, '_save_progress', side_effect=lambda job: self.progress.append(job.processed)), \
+                mock.patch.object(getPlayerDetails, 'get_players_details_bulk',
+                                  functools.partial(getPlayerDetails.get_players_details_bulk, batch_size=2, workers=3)), \
+                mock.patch.object(startgg_client, 'execute', side_effect=self.fake_execute), \
+                mock.patch.object(views_uploads, 'render', side_effect=lambda req, tpl, ctx=None: ctx) as render:
+            views_uploads.upload_exceljugadores(request)
+        return render.call_args.args[2]['job']
+
+    def test_enrichment_runs_in_parallel_batches_with_single_upsert(self):
+        # la tabla de test no tiene todas las columnas del modelo: insertar sólo las necesarias
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO Colombia_Players (ID, Gamertag, Slug, Prefijo, Nombre, Pais, Departamento, Region, Ciudad) '
+                "VALUES (99, 'existente', 's', 'p', 'n', 'CO', 'Antioquia', 'Andina', 'Medellín')"
+            )
+        job = self.upload(self.frame())
+
+        self.assertEqual(job['kind'], 'upload')
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual((job['total'], job['processed'], job['created'], job['updated']), (8, 8, 6, 1))
+        self.assertEqual(job['errors'], [{'row': 9, 'error': "Sin ID y no existe un jugador con GamerTag 'nadie'"}])
+        # 6 IDs en lotes de 2 repartidos entre varios hilos
+        self.assertGreater(len(self.threads), 1)
+        self.assertEqual(self.progress[-1], 8)
+        self.assertEqual(self.progress, sorted(self.progress))
+        # start.gg prevalece sobre el Excel; lo que no trae se conserva del archivo
+        players = Player.objects.values_list('id', 'gamertag', 'slug', 'twitter', 'nombre')
+        self.assertEqual(players.get(id=12), (12, 'tag12', 'user/12', 'tw12', 'n'))
+        self.assertEqual(players.get(id=99)[1], 'EXISTENTE')
+
+    def test_each_chunk_is_a_job_written_before_the_next_is_read(self):
+        job = self.upload(self.frame(), chunk_size=3)
+
+        self.assertEqual((job['status'], job['chunks']), ('done', 3))
+        self.assertEqual((job['total'], job['processed'], job['created']), (8, 8, 6))
+        self.assertEqual(job['errors'], [
+            {'row': 8, 'error': "Sin ID y no existe un jugador con GamerTag 'EXISTENTE'"},
+            {'row': 9, 'error': "Sin ID y no existe un jugador con GamerTag 'nadie'"},
+        ])
+        self.assertEqual(self.saved_before_chunk, [0, 3, 6])
+        # el archivo no se guarda entero: cada bloque lleva sólo sus filas
+        self.assertEqual(PlayerSyncJob.objects.get(pk=job['job_id']).attendees, [])
+        chunks = PlayerSyncJob.objects.filter(parent_id=job['job_id']).order_by('created_at')
+        self.assertEqual([[r['_row'] for r in c.attendees] for c in chunks], [[2, 3, 4], [5, 6, 7], [8, 9]])
+
+
+class PlayerIndexTests(TestCase):
+    """Autocompletado desde el índice en memoria: tildes, orden por tipo de coincidencia y actividad."""
+
+    def setUp(self):
+        player_index.set_player_index(None)
+        patcher = mock.patch.object(player_index, 'PLAYER_INDEX_BACKGROUND_REBUILD', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(player_index.set_player_index, None)
+        self.insert([
+            (1, 'Ark', 'TSM', 'Ana Ruiz'),
+            (2, 'Arkadia', '', 'Luis Pérez'),
+            (3, 'Dark', '', 'Juan Gómez'),
+            (4, 'Mega Arkano', '', ''),
+            (5, 'Parka', 'ARK', ''),
+            (6, 'Árbol', '', ''),
+        ])
+        upload_ingest.import_sets([pd.DataFrame({
+            'ID Torneo': [1, 1, 1], 'ID Set': [1, 2, 3],
+            'ID Jugador 1': [6, 6, 6], 'Jugador 1': ['Árbol'] * 3, 'Puntuación Jugador 1': [2, 2, 2],
+            'ID Jugador 2': [4, 4, 4], 'Jugador 2': ['Mega Arkano'] * 3, 'Puntuación Jugador 2': [0, 0, 0],
+            'Ronda': ['Pools'] * 3,
+        })])
+
+    def insert(self, players):
+        with connection.cursor() as cursor:
+            for player_id, gamertag, prefijo, nombre in players:
+                cursor.execute(
+                    'INSERT INTO Colombia_Players (ID, Gamertag, Slug, Prefijo, Nombre, Pais, Departamento, Region, Ciudad) '
+                    "VALUES (%s, %s, 's', %s, %s, 'CO', 'd', 'r', 'c')", [player_id, gamertag, prefijo, nombre]
+                )
+
+    def search(self, query):
+        response = views.autocomplete_players(RequestFactory().get('/autocomplete-players/', {'q': query}))
+        return [p['id'] for p in json.loads(response.content)]
+
+    def test_ranking_and_accents(self):
+        # exacto, gamertag que empieza, palabra (gamertag y prefijo) y texto contenido
+        self.assertEqual(self.search('ark'), [1, 2, 4, 5, 3])
+        # con 1 y 2 letras (precalculadas) pesa la actividad: 6 y 4 juegan sets
+        self.assertEqual(self.search('ar'), [6, 1, 2, 4, 5, 3])
+        self.assertEqual(self.search('ÁRBOL'), [6])
+        self.assertEqual(self.search('perez'), [2])
+        self.assertEqual(self.search('gome'), [3])
+        self.assertEqual(self.search('zzz'), [])
+
+    def test_served_from_memory_and_rebuilt_after_writes(self):
+        self.search('ark')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search('dar'), [3])
+
+        self.insert([(7, 'Darko', '', '')])
+        self.assertEqual(self.search('dar'), [3])
+        player_index.mark_player_index_stale()
+        self.assertEqual(self.search('dar'), [3, 7])
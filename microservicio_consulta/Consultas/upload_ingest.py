@@ -0,0 +1,608 @@
+"""
+Ingesta por lotes de los archivos subidos en views_uploads.
+
+Las columnas se convierten de una vez sobre el DataFrame (pandas) y las filas
+válidas se escriben con executemany en lotes de UPLOAD_BATCH_SIZE dentro de
+una sola transacción, con INSERT ... ON CONFLICT sobre la clave de la tabla.
+Cada importación devuelve un resumen con las filas insertadas, las que ya
+existían (actualizadas o saltadas) y las inválidas con su número de fila.
+Si la base de datos rechaza un lote, ese lote se reintenta fila a fila (cada
+una en su savepoint) para informar exactamente qué filas fallaron.
+
+Los archivos se leen por bloques de UPLOAD_CHUNK_ROWS filas (read_upload_chunks):
+XLSX con openpyxl en modo read_only, CSV con el módulo csv y NDJSON (un objeto
+JSON por línea) línea a línea. Así la memoria no crece con el tamaño del
+archivo y cada bloque se escribe antes de leer el siguiente.
+"""
+import csv
+import io
+import json
+import os
+import time
+from collections import deque
+
+import pandas as pd
+from django.db import DatabaseError, connection, transaction
+
+UPLOAD_BATCH_SIZE = 500
+UPLOAD_CHUNK_ROWS = 5000
+# extensiones aceptadas -> fila del archivo en la que empiezan los datos
+UPLOAD_FORMATS = {'.xlsx': 2, '.csv': 2, '.ndjson': 1, '.jsonl': 1}
+
+# encabezados del Excel -> nombres internos (mismos que usaba upload_excel)
+TOURNAMENT_COLUMNS = {
+    'Nombre del Torneo': 'Tournament_Name',
+    'Ganador': 'Winner',
+    'Asistentes': 'Attendees',
+    'Region': 'Region',
+    'País': 'Pais',
+    'Departamento': 'Departamento',
+    'Ciudad': 'Ciudad',
+    'Fecha': 'Date',
+    'ID': 'ID',
+    'URL del Torneo': 'URL',
+}
+# nombre interno -> campo del modelo Tournament
+TOURNAMENT_FIELDS = {
+    'ID': 'id',
+    'Tournament_Name': 'tournament_name',
+    'Winner': 'winner',
+    'Attendees': 'attendees',
+    'Region': 'region',
+    'Pais': 'pais',
+    'Departamento': 'departamento',
+    'Ciudad': 'ciudad',
+    'Date': 'date',
+    'URL': 'url',
+    'Tier': 'tier',
+}
+
+# encabezados del Excel de sets -> columnas de Colombia_Sets
+SET_COLUMNS = {
+    'ID Torneo': 'id_torneo',
+    'ID Set': 'id_set',
+    'ID Jugador 1': 'id_player_1',
+    'Jugador 1': 'player_1',
+    'Puntuación Jugador 1': 'player_1_score',
+    'ID Jugador 2': 'id_player_2',
+    'Jugador 2': 'player_2',
+    'Puntuación Jugador 2': 'player_2_score',
+    'Phase': 'phase',
+    'Event Name': 'event_name',
+    'Tournament Name': 'tournament_name',
+    'Player 1 Characters': 'player_1_characters',
+    'Player 2 Characters': 'player_2_characters',
+    'Ronda': 'ronda',
+}
+SET_FIELDS = [
+    'id_torneo', 'id_set', 'id_player_1', 'player_1', 'player_1_score', 'id_player_2', 'player_2',
+    'player_2_score', 'phase', 'event_name', 'tournament_name', 'player_1_characters', 'player_2_characters', 'ronda',
+]
+SET_KEY = ['id_torneo', 'id_set']
+# rondas asignadas a los últimos sets del archivo cuando no trae columna 'Ronda'
+FINAL_ROUNDS = [
+    'Grand Final', 'Winners Final', 'Losers Final', 'Winners Semifinal', 'Losers Semifinal',
+    'Winners Quarterfinal', 'Losers Quarterfinal'
+]
+
+# columnas del Excel de jugadores -> campo del modelo Player
+PLAYER_FIELDS = {
+    'ID': 'id',
+    'GamerTag': 'gamertag',
+    'Slug': 'slug',
+    'Prefijo': 'prefijo',
+    'Nombre': 'nombre',
+    'Pais': 'pais',
+    'Departamento': 'departamento',
+    'Region': 'region',
+    'Ciudad': 'ciudad',
+    'Twitter': 'twitter',
+    'Discord': 'discord',
+    'Twitch': 'twitch',
+}
+
+
+def _is_blank(values):
+    return all(v is None or (isinstance(v, str) and not v.strip()) for v in values)
+
+
+def _frame(chunk, numbers, columns):
+    df = pd.DataFrame.from_records(chunk, columns=columns)
+    df['_row'] = numbers
+    return df
+
+
+def _chunked(rows, columns, chunk_size, first_row):
+    """
+    Agrupa filas (tuplas, o dicts si columns es None) en DataFrames de
+    chunk_size filas. Las filas vacías no se entregan, pero sí cuentan: cada
+    DataFrame trae en '_row' el número de fila de cada registro en el
+    archivo, para que los errores del resumen coincidan con él.
+    """
+    chunk = []
+    numbers = []
+    for number, row in enumerate(rows, start=first_row):
+        if _is_blank(row.values() if isinstance(row, dict) else row):
+            continue
+        chunk.append(row)
+        numbers.append(number)
+        if len(chunk) >= chunk_size:
+            yield _frame(chunk, numbers, columns)
+            chunk = []
+            numbers = []
+    if chunk:
+        yield _frame(chunk, numbers, columns)
+
+
+def _row_numbers(df, first_row):
+    """Números de fila en el archivo: '_row' de los lectores por bloques o consecutivos desde first_row."""
+    if '_row' in df.columns:
+        return df['_row'].reset_index(drop=True).astype(int)
+    return pd.Series(range(first_row, first_row + len(df)))
+
+
+def _text_stream(file):
+    """Texto UTF-8 (con o sin BOM) sobre el archivo subido, sin cargarlo entero."""
+    stream = getattr(file, 'file', file)
+    stream.seek(0)
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def read_excel_chunks(file, chunk_size=UPLOAD_CHUNK_ROWS):
+    """
+    Lee la primera hoja de un XLSX por bloques: genera DataFrames de hasta
+    chunk_size filas con la primera fila como encabezados (como pd.read_excel).
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(h).strip() if h is not None else f'Unnamed: {i}' for i, h in enumerate(header)]
+        width = len(columns)
+        yield from _chunked(((tuple(row) + (None,) * width)[:width] for row in rows), columns, chunk_size, 2)
+    finally:
+        workbook.close()
+
+
+def read_csv_chunks(file, chunk_size=UPLOAD_CHUNK_ROWS):
+    """
+    Lee un CSV (separado por comas, punto y coma o tabuladores) por bloques
+    como read_excel_chunks. Los valores llegan como texto; prepare_* los convierten.
+    """
+    text = _text_stream(file)
+    try:
+        first_line = text.readline()
+        if not first_line.strip():
+            return
+        try:
+            dialect = csv.Sniffer().sniff(first_line, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        header = next(csv.reader([first_line], dialect))
+        columns = [h.strip() or f'Unnamed: {i}' for i, h in enumerate(header)]
+        width = len(columns)
+        rows = (
+            tuple(v if v != '' else None for v in (row + [None] * width)[:width])
+            for row in csv.reader(text, dialect)
+        )
+        yield from _chunked(rows, columns, chunk_size, 2)
+    finally:
+        text.detach()
+
+
+def read_ndjson_chunks(file, chunk_size=UPLOAD_CHUNK_ROWS):
+    """
+    Lee un archivo NDJSON (un objeto JSON por línea, con los mismos nombres de
+    columna que el Excel) por bloques como read_excel_chunks.
+    """
+    text = _text_stream(file)
+
+    def records():
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                # se descarta en _chunked, pero cuenta para el número de línea
+                yield {}
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Línea {line_number}: JSON no válido ({e})")
+            if not isinstance(record, dict):
+                raise ValueError(f"Línea {line_number}: se esperaba un objeto JSON")
+            yield record
+
+    try:
+        yield from _chunked(records(), None, chunk_size, 1)
+    finally:
+        text.detach()
+
+
+def read_upload_chunks(file, chunk_size=UPLOAD_CHUNK_ROWS):
+    """
+    Devuelve (bloques, primera_fila) según la extensión del archivo subido
+    (UPLOAD_FORMATS). Lanza ValueError si el formato no está soportado.
+    """
+    extension = os.path.splitext(file.name)[1].lower()
+    if extension not in UPLOAD_FORMATS:
+        raise ValueError("Formato de archivo no soportado")
+    if extension == '.xlsx':
+        chunks = read_excel_chunks(file, chunk_size)
+    elif extension == '.csv':
+        chunks = read_csv_chunks(file, chunk_size)
+    else:
+        chunks = read_ndjson_chunks(file, chunk_size)
+    return chunks, UPLOAD_FORMATS[extension]
+
+
+def new_summary():
+    return {
+        'rows': 0, 'inserted': 0, 'updated': 0, 'conflicts': 0,
+        'duplicates': 0, 'invalid': 0, 'errors': [], 'elapsed': 0.0,
+    }
+
+
+def _to_records(df, columns):
+    """Filas del DataFrame como tuplas en el orden de `columns`, con None en lugar de NaN/NaT."""
+    df = df[columns].astype(object)
+    df = df.where(pd.notna(df), None)
+    return list(df.itertuples(index=False, name=None))
+
+
+def _text_column(series):
+    """Texto sin espacios alrededor; vacíos y 'N/A' quedan como None."""
+    values = series.astype(object)
+    is_text = values.map(lambda v: isinstance(v, str))
+    values = values.where(~is_text, values.astype(str).str.strip())
+    return values.where(pd.notna(values) & ~values.isin(['', 'N/A']), None)
+
+
+def _int_column(series):
+    """Convierte a entero; lo que no sea un entero válido queda como NA."""
+    numbers = pd.to_numeric(series, errors='coerce')
+    numbers = numbers.where(numbers.isna() | (numbers % 1 == 0))
+    return numbers.astype('Int64')
+
+
+def prepare_tournaments(df, first_row=2):
+    """
+    Normaliza un DataFrame de torneos. Devuelve (filas, inválidas, duplicadas):
+    filas en el orden de TOURNAMENT_FIELDS, inválidas como [{'row', 'error'}]
+    (row = número de fila en el archivo) y cuántas filas repetían un ID del
+    mismo archivo (se conserva la última).
+    """
+    df = df.rename(columns=TOURNAMENT_COLUMNS)
+    df = df.reset_index(drop=True)
+    for col in TOURNAMENT_FIELDS:
+        if col not in df.columns:
+            df[col] = None
+    rows_in_file = _row_numbers(df, first_row)
+
+    df['ID'] = _int_column(df['ID'])
+    df['Attendees'] = _int_column(df['Attendees'])
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce').dt.strftime('%Y-%m-%d')
+    for col in TOURNAMENT_FIELDS:
+        if col not in ('ID', 'Attendees', 'Date'):
+            df[col] = _text_column(df[col])
+    df['_row'] = rows_in_file
+
+    bad_id = df['ID'].isna()
+    invalid = [{'row': int(r), 'error': 'ID vacío o no numérico'} for r in df.loc[bad_id, '_row']]
+    df = df[~bad_id]
+    before = len(df)
+    df = df.drop_duplicates(subset='ID', keep='last')
+    return _to_records(df, list(TOURNAMENT_FIELDS) + ['_row']), invalid, before - len(df)
+
+
+def _tournament_key_column(series):
+    """ID de torneo como texto ('1403856'), también si el Excel lo trae como número."""
+    numbers = _int_column(series)
+    return _text_column(series).where(numbers.isna(), numbers.astype(object).map(str))
+
+
+def prepare_sets(df, first_row=2, final_rounds=True):
+    """
+    Normaliza un DataFrame de sets. Devuelve (filas, inválidas, duplicadas)
+    como prepare_tournaments; la clave natural es (id_torneo, id_set) y ante
+    repetidos en el archivo se conserva la última fila. Sin columna 'Ronda'
+    y con final_rounds=False todas las filas quedan como 'Bracket' (import_sets
+    asigna las rondas finales al terminar el archivo).
+    """
+    df = df.rename(columns=SET_COLUMNS)
+    df = df.reset_index(drop=True)
+    has_ronda = 'ronda' in df.columns
+    for col in SET_FIELDS:
+        if col not in df.columns:
+            df[col] = None
+    df['_row'] = _row_numbers(df, first_row)
+
+    df['id_torneo'] = _tournament_key_column(df['id_torneo'])
+    for col in ('id_set', 'id_player_1', 'id_player_2', 'player_1_score', 'player_2_score'):
+        df[col] = _int_column(df[col])
+    for col in SET_FIELDS:
+        if df[col].dtype == object:
+            df[col] = _text_column(df[col])
+    for col in ('player_1_characters', 'player_2_characters'):
+        df[col] = df[col].where(df[col].notna(), '')
+
+    checks = [
+        (df['id_torneo'].isna(), 'ID Torneo vacío'),
+        (df['id_set'].isna(), 'ID Set vacío o no numérico'),
+        (df['player_1_score'].isna() | df['player_2_score'].isna(), 'Puntuación vacía o no numérica'),
+    ]
+    bad = pd.Series(False, index=df.index)
+    errors = pd.Series(None, index=df.index, dtype=object)
+    for mask, message in checks:
+        errors = errors.where(~mask | bad, message)
+        bad |= mask
+    invalid = [{'row': int(r), 'error': e} for r, e in zip(df.loc[bad, '_row'], errors[bad])]
+    df = df[~bad].reset_index(drop=True)
+
+    if not has_ronda:
+        # heurística original: los últimos sets del archivo son las rondas finales
+        n = len(df)
+        ronda = ['Bracket'] * n
+        for i, round_name in enumerate(FINAL_ROUNDS if final_rounds else []):
+            if n - 1 - i >= 0:
+                ronda[n - 1 - i] = round_name
+        df['ronda'] = ronda
+
+    before = len(df)
+    df = df.drop_duplicates(subset=SET_KEY, keep='last')
+    return _to_records(df, SET_FIELDS + ['_row']), invalid, before - len(df)
+
+
+def _existing_keys(cursor, table, key_columns, rows, key_index):
+    """Claves de `rows` que ya están en la tabla (consulta por lotes sobre la primera columna de la clave)."""
+    qn = connection.ops.quote_name
+    first_values = sorted({row[key_index[0]] for row in rows}, key=str)
+    existing = set()
+    for i in range(0, len(first_values), UPLOAD_BATCH_SIZE):
+        chunk = first_values[i:i + UPLOAD_BATCH_SIZE]
+        cursor.execute(
+            f"SELECT {', '.join(qn(c) for c in key_columns)} FROM {qn(table)} "
+            f"WHERE {qn(key_columns[0])} IN ({', '.join(['%s'] * len(chunk))})",
+            chunk
+        )
+        existing.update(tuple(r) for r in cursor.fetchall())
+    return existing
+
+
+def _row_error(row_number, error):
+    return {'row': row_number, 'error': str(error).strip() or error.__class__.__name__}
+
+
+def bulk_upsert(table, columns, key_columns, rows, update_existing=False, batch_size=UPLOAD_BATCH_SIZE):
+    """
+    Inserta `rows` con executemany por lotes. Cada fila es una tupla en el
+    orden de `columns` seguida del número de fila del archivo (para el reporte).
+    Con update_existing las filas cuya clave ya existe se actualizan (los
+    valores vacíos del archivo no borran los guardados); si no, se saltan.
+    Debe llamarse dentro de una transacción.
+    Devuelve (insertadas, existentes, errores) con errores = [{'row', 'error'}].
+    """
+    if not rows:
+        return 0, 0, []
+    qn = connection.ops.quote_name
+    key_index = [columns.index(c) for c in key_columns]
+    conflict = ', '.join(qn(c) for c in key_columns)
+    if update_existing:
+        assignments = ', '.join(
+            f"{qn(c)} = COALESCE(excluded.{qn(c)}, {qn(table)}.{qn(c)})" for c in columns if c not in key_columns
+        )
+        on_conflict = f"ON CONFLICT ({conflict}) DO UPDATE SET {assignments}"
+    else:
+        on_conflict = f"ON CONFLICT ({conflict}) DO NOTHING"
+    sql = (
+        f"INSERT INTO {qn(table)} ({', '.join(qn(c) for c in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) {on_conflict}"
+    )
+
+    errors = []
+    failed = set()
+    width = len(columns)
+    with connection.cursor() as cursor:
+        existing = _existing_keys(cursor, table, key_columns, rows, key_index)
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            try:
+                with transaction.atomic():
+                    cursor.executemany(sql, [row[:width] for row in batch])
+            except DatabaseError:
+                # localizar las filas que fallan sin perder el resto del lote
+                for row in batch:
+                    try:
+                        with transaction.atomic():
+                            cursor.execute(sql, row[:width])
+                    except DatabaseError as e:
+                        failed.add(row[width])
+                        errors.append(_row_error(row[width], e))
+    conflicts = sum(
+        1 for row in rows
+        if row[width] not in failed and tuple(row[i] for i in key_index) in existing
+    )
+    return len(rows) - len(failed) - conflicts, conflicts, errors
+
+
+def import_tournaments(frames, update_existing=False, first_row=2):
+    """
+    Importa uno o varios DataFrames de torneos en Colombia_Tournament en una
+    sola transacción. Devuelve el resumen (ver new_summary). Un ID repetido en
+    bloques distintos cuenta como ya existente en el segundo bloque.
+    """
+    from .models import Tournament
+
+    started = time.monotonic()
+    summary = new_summary()
+    fields = {f.name: f.column for f in Tournament._meta.fields}
+    columns = [fields[name] for name in TOURNAMENT_FIELDS.values()]
+    with transaction.atomic():
+        for df in frames:
+            rows, invalid, duplicates = prepare_tournaments(df, first_row=first_row)
+            first_row += len(df)
+            inserted, conflicts, failed = bulk_upsert(
+                Tournament._meta.db_table, columns, [fields['id']], rows, update_existing=update_existing
+            )
+            _add_to_summary(summary, len(df), inserted, conflicts, update_existing, duplicates, invalid + failed)
+    summary['elapsed'] = round(time.monotonic() - started, 3)
+    return summary
+
+
+def _add_to_summary(summary, rows, inserted, conflicts, update_existing, duplicates, errors):
+    summary['rows'] += rows
+    summary['inserted'] += inserted
+    summary['conflicts'] += conflicts
+    summary['updated'] += conflicts if update_existing else 0
+    summary['duplicates'] += duplicates
+    summary['invalid'] += len(errors)
+    summary['errors'] += sorted(errors, key=lambda e: e['row'])
+
+
+def _set_conflict_key(table):
+    """
+    Columnas del ON CONFLICT de Colombia_Sets. En la tabla creada a mano id_set
+    es el INTEGER PRIMARY KEY y SQLite no acepta (id_torneo, id_set) como
+    destino aunque exista el índice único: ahí la clave es sólo id_set.
+    """
+    with connection.cursor() as cursor:
+        try:
+            primary_key = connection.introspection.get_primary_key_columns(cursor, table)
+        except Exception as e:
+            print(f"No se pudo leer la clave primaria de {table}: {e}")
+            primary_key = None
+    return ['id_set'] if primary_key == ['id_set'] else SET_KEY
+
+
+def import_sets(frames, first_row=2):
+    """
+    Importa sets en Colombia_Sets con upsert sobre (id_torneo, id_set) (o sólo
+    id_set, ver _set_conflict_key) en una sola transacción: volver a subir el mismo archivo no duplica filas.
+    """
+    from .models import Set
+
+    started = time.monotonic()
+    summary = new_summary()
+    key = _set_conflict_key(Set._meta.db_table)
+    # claves de los últimos sets válidos: sin columna 'Ronda' reciben FINAL_ROUNDS al final
+    tail = deque(maxlen=len(FINAL_ROUNDS))
+    has_ronda = True
+    with transaction.atomic():
+        for df in frames:
+            has_ronda = 'Ronda' in df.columns or 'ronda' in df.columns
+            rows, invalid, duplicates = prepare_sets(df, first_row=first_row, final_rounds=False)
+            first_row += len(df)
+            inserted, conflicts, failed = bulk_upsert(
+                Set._meta.db_table, SET_FIELDS, key, rows, update_existing=True
+            )
+            _add_to_summary(summary, len(df), inserted, conflicts, True, duplicates, invalid + failed)
+            tail.extend((row[0], row[1]) for row in rows)
+        if not has_ronda and tail:
+            qn = connection.ops.quote_name
+            sql = (f"UPDATE {qn(Set._meta.db_table)} SET {qn('ronda')} = %s "
+                   f"WHERE {qn('id_torneo')} = %s AND {qn('id_set')} = %s")
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, [(name,) + key for name, key in zip(FINAL_ROUNDS, reversed(tail))])
+    summary['elapsed'] = round(time.monotonic() - started, 3)
+    return summary
+
+
+def prepare_players(df, first_row=2):
+    """
+    Normaliza un DataFrame de jugadores. Devuelve (registros, inválidos):
+    registros como dicts con las columnas de PLAYER_FIELDS más '_row'; son
+    inválidas las filas sin ID numérico ni GamerTag.
+    """
+    df = df.rename(columns={'Gamertag': 'GamerTag'})
+    df = df.reset_index(drop=True)
+    for col in PLAYER_FIELDS:
+        if col not in df.columns:
+            df[col] = None
+    df['_row'] = _row_numbers(df, first_row)
+    df['ID'] = _int_column(df['ID'])
+    for col in PLAYER_FIELDS:
+        if col != 'ID':
+            df[col] = _text_column(df[col])
+
+    bad = df['ID'].isna() & df['GamerTag'].isna()
+    invalid = [{'row': int(r), 'error': 'Fila sin ID ni GamerTag'} for r in df.loc[bad, '_row']]
+    columns = list(PLAYER_FIELDS) + ['_row']
+    records = [dict(zip(columns, row)) for row in _to_records(df[~bad], columns)]
+    # enteros de Python: los registros se guardan como JSON en el PlayerSyncJob
+    for record in records:
+        record['_row'] = int(record['_row'])
+        if record['ID'] is not None:
+            record['ID'] = int(record['ID'])
+    return records, invalid
+
+
+def _clean(value):
+    return None if value in ('', 'N/A') else value
+
+
+def import_players(records, progress=None):
+    """
+    Importa jugadores en Colombia_Players. Los detalles de start.gg de todos
+    los IDs se piden en lotes concurrentes (get_players_details_bulk) y
+    prevalecen sobre los valores del archivo; las filas sin ID se asocian por
+    GamerTag a un jugador existente. Después se hace un único upsert por lotes.
+    progress(procesados, total) se llama durante la consulta a start.gg.
+    Devuelve el resumen (ver new_summary).
+    """
+    from .api.getPlayerDetails import get_players_details_bulk
+    from .api.player_index import mark_player_index_stale
+    from .models import Player
+
+    started = time.monotonic()
+    summary = new_summary()
+    summary['rows'] = len(records)
+    errors = []
+
+    ids = [r['ID'] for r in records if r.get('ID') is not None]
+    details_by_id = {}
+    if ids:
+        try:
+            details_by_id = get_players_details_bulk(ids, progress=progress)
+        except Exception as e:
+            errors.append({'row': None, 'error': f"Error fetching from upstream: {e}"})
+
+    # filas sin ID: buscar el jugador por gamertag (sin distinguir mayúsculas)
+    tags = {r['GamerTag'].lower() for r in records if r.get('ID') is None and r.get('GamerTag')}
+    ids_by_tag = {}
+    if tags:
+        for player_id, tag in Player.objects.filter(gamertag__isnull=False).values_list('id', 'gamertag'):
+            if tag.lower() in tags:
+                ids_by_tag.setdefault(tag.lower(), player_id)
+
+    rows = []
+    for record in records:
+        player_id = record.get('ID')
+        if player_id is None:
+            player_id = ids_by_tag.get((record.get('GamerTag') or '').lower())
+            if player_id is None:
+                errors.append({'row': record['_row'], 'error': f"Sin ID y no existe un jugador con GamerTag '{record.get('GamerTag')}'"})
+                continue
+        merged = {k: record.get(k) for k in PLAYER_FIELDS}
+        details = details_by_id.get(player_id)
+        if isinstance(details, dict) and not details.get('error'):
+            merged.update({k: _clean(details.get(k)) for k in PLAYER_FIELDS if _clean(details.get(k)) is not None})
+        merged['ID'] = int(player_id)
+        rows.append(tuple(merged[k] for k in PLAYER_FIELDS) + (record['_row'],))
+
+    fields = {f.name: f.column for f in Player._meta.fields}
+    columns = [fields[name] for name in PLAYER_FIELDS.values()]
+    before = len(rows)
+    rows = list({row[0]: row for row in rows}.values())
+    with transaction.atomic():
+        inserted, conflicts, failed = bulk_upsert(
+            Player._meta.db_table, columns, [fields['id']], rows, update_existing=True
+        )
+    # el upsert es SQL directo: no dispara post_save
+    mark_player_index_stale()
+    _add_to_summary(summary, 0, inserted, conflicts, True, before - len(rows), failed)
+    summary['invalid'] += len(errors)
+    summary['errors'] = sorted(errors + summary['errors'], key=lambda e: e['row'] or 0)
+    summary['elapsed'] = round(time.monotonic() - started, 3)
+    return summary
@@ -1,4 +1,5 @@
 import csv
+import json
 import os
 import logging
 import pandas as pd
@@ -6,7 +7,7 @@ import requests
 import openpyxl
 from openpyxl.styles import Font
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.db import connection
 from django.core.files.storage import FileSystemStorage
@@ -19,8 +20,8 @@ from .models import Tournament, Player, Set  # Elimina MatchCharacter de la impo
 MatchCharacter = None
 from .forms import UploadFileForm, PlayerForm, TournamentForm, SetForm
 
-from .api.setByTournament import get_sets_by_event
-from .api.eventInfo import get_event_info, get_tournaments_by_country
+from .api.setByTournament import get_sets_by_event, iter_sets_by_event
+from .api.eventInfo import get_event_info, get_event_summary, get_tournaments_by_country
 from django.views.decorators.http import require_GET
 
 # Importa las vistas separadas
@@ -30,18 +31,13 @@ from .views_sets import *
 
 from .api.location_mapping import get_department_by_city, get_region_by_department
 from .api.getTournamentDetails import get_tournament_details
+from .api import startgg_client
+from .api.player_index import get_player_index
 
 import re
 
 logger = logging.getLogger(__name__)
 
-# Constantes
-STARTGG_URL = "https://api.start.gg/gql/alpha"
-STARTGG_KEY = "204bdde1bb958e691497fa76febad15d"
-
-if not STARTGG_KEY:
-    raise EnvironmentError("La variable de entorno 'REACT_APP_STARTGG_API_KEY' no está configurada.")
-
 # --- Home Views ---
 def home_page(request):
     return render(request, 'index.html')
@@ -127,12 +123,6 @@ def get_event_id_view(request):
 
         event_slug = f"tournament/{tournament_name}/event/{event_name}"
         
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Authorization': f'Bearer {STARTGG_KEY}'
-        }
-        
         query = """
         query EventQuery($slug: String) {
             event(slug: $slug) {
@@ -147,15 +137,7 @@ def get_event_id_view(request):
         }
         
         try:
-            response = requests.post(
-                STARTGG_URL,
-                headers=headers,
-                json={'query': query, 'variables': variables}
-            )
-            
-            response.raise_for_status()
-            
-            data = response.json()
+            data = startgg_client.execute(query, variables)
             print('API response:', data)
 
             if 'errors' in data:
@@ -175,12 +157,29 @@ def get_event_id_view(request):
     
     return JsonResponse({'error': 'Invalid method'}, status=405)
 
+def _ndjson_sets(event_id, concurrency):
+    """Una línea JSON por set; si algo falla a mitad, la última línea es {"error": ...}."""
+    try:
+        for set_data in iter_sets_by_event(event_id, concurrency=concurrency, prefetch_entrants=False):
+            yield json.dumps(set_data) + "\n"
+    except Exception as e:
+        print(f"Error transmitiendo sets del evento {event_id}: {e}")
+        yield json.dumps({'error': str(e)}) + "\n"
+
 @csrf_exempt
 def get_sets_by_tournament_view(request):
     if request.method == 'POST':
         event_id = request.POST.get('event_id')
+        # modo streaming: stream=1 o Accept: application/x-ndjson
+        stream = str(request.POST.get('stream') or request.GET.get('stream') or '').lower() in ['1', 'true', 'yes'] \
+            or 'application/x-ndjson' in request.headers.get('Accept', '')
         try:
-            sets = get_sets_by_event(event_id)
+            concurrency = int(request.POST.get('concurrency')) if request.POST.get('concurrency') else None
+            if stream:
+                response = StreamingHttpResponse(_ndjson_sets(event_id, concurrency), content_type='application/x-ndjson')
+                response['X-Accel-Buffering'] = 'no'  # que nginx no acumule la respuesta
+                return response
+            sets = get_sets_by_event(event_id, concurrency=concurrency)
             return JsonResponse(sets, safe=False)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
@@ -229,12 +228,7 @@ def get_sets_by_tournament(event_id, limit):
             'page': page_number,
             'perPage': limit
         }
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {STARTGG_KEY}'
-        }
-        response = requests.post(STARTGG_URL, json={'query': query, 'variables': variables}, headers=headers)
-        data = response.json()
+        data = startgg_client.post(query, variables).json()
 
         if 'errors' in data:
             raise Exception(', '.join(error['message'] for error in data['errors']))
@@ -266,47 +260,17 @@ def get_event_info(request):
     if not event_id:
         return JsonResponse({'error': 'Event ID is required'}, status=400)
 
-    query = """
-    query EventInfo($eventId: ID!) {
-        event(id: $eventId) {
-            id
-            name
-            tournament {
-                name
-            }
-            standings(query: {perPage: 1}) {
-                nodes {
-                    placement
-                    entrant {
-                        name
-                    }
-                }
-            }
-        }
-    }
-    """
-    variables = {'eventId': event_id}
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {STARTGG_KEY}'
-    }
-
-    response = requests.post(STARTGG_URL, json={'query': query, 'variables': variables}, headers=headers)
-    data = response.json()
-
-    if 'errors' in data:
+    try:
+        summary = get_event_summary(event_id)
+    except Exception:
         return JsonResponse({'error': 'Error fetching event info'}, status=500)
-
-    event = data['data']['event']
-    winner_full_name = event['standings']['nodes'][0]['entrant']['name'] if event['standings']['nodes'] else 'N/A'
-    
-    # Extraer solo el nombre del jugador sin el sponsor
-    winner_name = winner_full_name.split('|')[-1].strip() if '|' in winner_full_name else winner_full_name
+    if summary is None:
+        return JsonResponse({'error': 'Event not found'}, status=404)
 
     info = {
-        'name': event['name'],
-        'tournament_name': event['tournament']['name'],
-        'winner': winner_name
+        'name': summary['name'],
+        'tournament_name': summary['tournament_name'],
+        'winner': summary['winner']
     }
     return JsonResponse(info)
 
@@ -315,99 +279,43 @@ def get_event_info_page(request):
 
 @require_GET
 def get_event_info_view(request):
+    """
+    Resumen del evento con una sola consulta a start.gg (get_event_summary).
+    La lista de asistentes sólo se pide con include_attendees=1.
+    """
     event_id = request.GET.get('event_id')
     if not event_id:
         return JsonResponse({'error': 'No event_id provided'}, status=400)
 
-    # Consulta a la API de Start.gg para obtener detalles del evento y torneo
-    query = """
-    query EventAndTournamentInfo($eventId: ID!) {
-        event(id: $eventId) {
-            id
-            name
-            startAt
-            tournament {
-                id
-                name
-                city
-                countryCode
-                state
-                slug
-            }
-            standings(query: {perPage: 1}) {
-                nodes {
-                    placement
-                    entrant {
-                        name
-                    }
-                }
-            }
-            numEntrants
-        }
-    }
-    """
-    variables = {'eventId': event_id}
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {STARTGG_KEY}'
-    }
-
     try:
-        response = requests.post(STARTGG_URL, json={'query': query, 'variables': variables}, headers=headers)
-        response.raise_for_status()
-        data = response.json()
+        summary = get_event_summary(event_id)
     except Exception as e:
         return JsonResponse({'error': f'Error fetching event info: {str(e)}'}, status=500)
-
-    if 'errors' in data:
-        return JsonResponse({'error': 'Error fetching event info'}, status=500)
-
-    event = data['data']['event']
-    if not event:
+    if summary is None:
         return JsonResponse({'error': 'Event not found'}, status=404)
 
-    # Ganador
-    winner_full_name = event['standings']['nodes'][0]['entrant']['name'] if event['standings']['nodes'] else 'N/A'
-    winner_name = winner_full_name.split('|')[-1].strip() if '|' in winner_full_name else winner_full_name
-
-    # Fecha
-    import datetime
-    start_date = 'N/A'
-    if event.get('startAt'):
-        try:
-            start_date = datetime.datetime.utcfromtimestamp(event['startAt']).strftime('%Y-%m-%d')
-        except Exception:
-            start_date = str(event['startAt'])
-
     # Construir la URL del torneo
-    tournament_url = f"https://www.start.gg/{event['tournament']['slug']}" if event['tournament'].get('slug') else ''
-
-    # Mapear zona y departamento usando las funciones de mapeo
-    city = event['tournament'].get('city', 'N/A') if event.get('tournament') else 'N/A'
-    department = get_department_by_city(city)
-    region = get_region_by_department(department)
-
-    # Obtener asistentes del torneo
-    tournament_id = event['tournament'].get('id') if event.get('tournament') else None
-    attendees = []
-    if tournament_id:
-        tournament_details = get_tournament_details(tournament_id)
-        attendees = tournament_details.get('attendees', [])
+    tournament_url = f"https://www.start.gg/{summary['tournament_slug']}" if summary.get('tournament_slug') else ''
 
     # Responder con todos los campos requeridos por el frontend
     info = {
-        'tournament_name': event['tournament']['name'] if event.get('tournament') else 'N/A',
-        'winner': winner_name,
-        'attendees': event.get('numEntrants', 'N/A'),
-        'region': region,
-        'country': event['tournament'].get('countryCode', 'N/A') if event.get('tournament') else 'N/A',
-        'department': department,
-        'city': city,
-        'start_date': start_date,
-        'id': event.get('id', event_id),
+        'tournament_name': summary.get('tournament_name') or 'N/A',
+        'winner': summary['winner'],
+        'attendees': summary['num_entrants'] if summary.get('num_entrants') is not None else 'N/A',
+        'region': summary.get('region'),
+        'country': summary.get('country_code') or 'N/A',
+        'department': summary.get('department'),
+        'city': summary.get('city') or 'N/A',
+        'start_date': summary.get('start_date') or 'N/A',
+        'id': summary.get('event_id', event_id),
         'tournament_url': tournament_url,
-        'attendees_list': attendees  # Nueva clave para la lista de asistentes
     }
+
+    # Obtener asistentes del torneo sólo si se piden explícitamente (pagina todos los participantes)
+    include_attendees = str(request.GET.get('include_attendees') or '').lower() in ['1', 'true', 'yes']
+    if include_attendees and summary.get('tournament_id'):
+        tournament_details = get_tournament_details(summary['tournament_id'])
+        info['attendees_list'] = (tournament_details.get('details') or {}).get('attendees', [])
     return JsonResponse(info)
 
 @require_GET
@@ -627,11 +535,16 @@ def consultas_home(request):
     return render(request, 'consultas/consultas-api/consultas_home.html')
 
 def autocomplete_players(request):
+    """Jugadores cuyo gamertag, prefijo o nombre coincide con ?q= (índice en memoria, ver api/player_index)."""
     query = request.GET.get('q', '')
     results = []
     if query:
-        players = Player.objects.filter(gamertag__icontains=query)[:10]
-        results = [{'id': p.id, 'gamertag': p.gamertag} for p in players]
+        try:
+            results = get_player_index().search(query, limit=10)
+        except Exception as e:
+            print(f"Índice de jugadores no disponible, se consulta la BD: {e}")
+            players = Player.objects.filter(gamertag__icontains=query).values('id', 'gamertag')[:10]
+            results = list(players)
     return JsonResponse(results, safe=False)
 
 def get_set_info_view(request):
@@ -656,4 +569,52 @@ def api_health(request):
     return JsonResponse({'status': 'ok', 'service': 'consultas-api'})
 
 
+def api_upstream_status(request):
+    """Estado de la conexión con start.gg en este proceso: circuit breaker, peticiones agrupadas y caché."""
+    from .api.circuit_breaker import get_circuit_breaker
+    from .api.single_flight import get_single_flight
+    from .api.response_cache import get_response_cache
+
+    breaker = get_circuit_breaker()
+    cache = get_response_cache()
+    try:
+        cache_stats = cache.stats() if cache is not None else None
+    except Exception as e:
+        cache_stats = {'error': str(e)}
+    return JsonResponse({
+        'circuit_breaker': breaker.stats() if breaker is not None else {'state': 'disabled'},
+        'single_flight': get_single_flight().stats(),
+        'cache': cache_stats,
+    })
+
+
+def metrics_view(request):
+    """Métricas de las llamadas a start.gg en formato de texto de Prometheus (por proceso)."""
+    from .api import upstream_metrics
+    from .api.circuit_breaker import get_circuit_breaker, CLOSED, HALF_OPEN, OPEN
+    from .api.single_flight import get_single_flight
+    from .api.response_cache import get_response_cache
+
+    extra = []
+    breaker = get_circuit_breaker()
+    if breaker is not None:
+        state = breaker.state
+        extra += ['# HELP startgg_circuit_state Estado del circuit breaker (1 = estado actual)',
+                  '# TYPE startgg_circuit_state gauge']
+        extra += [f'startgg_circuit_state{{state="{s}"}} {int(s == state)}' for s in (CLOSED, HALF_OPEN, OPEN)]
+    extra += ['# HELP startgg_in_flight Consultas distintas en curso hacia start.gg',
+              '# TYPE startgg_in_flight gauge',
+              f"startgg_in_flight {get_single_flight().stats()['in_flight']}"]
+    cache = get_response_cache()
+    if cache is not None:
+        try:
+            entries = cache.stats()['entries']
+            extra += ['# HELP startgg_cache_entries Entradas en la caché de respuestas',
+                      '# TYPE startgg_cache_entries gauge',
+                      f'startgg_cache_entries {entries}']
+        except Exception as e:
+            print(f"No se pudo leer la caché para /metrics: {e}")
+    return HttpResponse(upstream_metrics.render(extra), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 